@@ -0,0 +1,107 @@
+import logging
+import threading
+from typing import Any, Dict, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+DEFAULT_ADAPTIVE_TOP_K_CONFIG = {
+    "enabled": True,
+    "min_k": 4,
+    "max_k": 20,
+    # Cosine similarity below which dense results are dropped; in hybrid mode, before rank fusion
+    "min_score": 0.2,
+    # Cut dense results at the largest drop between consecutive scores when it is at least this share of the score range
+    "min_gap_ratio": 0.3,
+}
+
+
+def get_adaptive_top_k_config(config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Merge an "adaptive_top_k" configuration section over the defaults."""
+    merged = dict(DEFAULT_ADAPTIVE_TOP_K_CONFIG, **(config or {}))
+    if merged["min_k"] < 1 or merged["max_k"] < merged["min_k"]:
+        raise ValueError(f"adaptive_top_k needs 1 <= min_k <= max_k, got {merged['min_k']} and {merged['max_k']}")
+    return merged
+
+
+def adaptive_cutoff(
+    scores: Sequence[float],
+    min_k: int,
+    max_k: int,
+    min_score: Optional[float] = None,
+    min_gap_ratio: Optional[float] = None,
+) -> Tuple[int, str]:
+    """
+    Decide how many of a ranked list of results to keep.
+
+    Results scoring below min_score are dropped first. Of the rest, the list is cut at the
+    largest drop between consecutive scores if that drop is at least min_gap_ratio of the
+    range between the best and the last kept score, the point where relevant chunks give way
+    to weak matches. The count never goes below min_k or above max_k.
+
+    Args:
+        scores: Scores of the results, best first
+        min_k: Minimum number of results to keep
+        max_k: Maximum number of results to keep
+        min_score: Optional absolute score threshold
+        min_gap_ratio: Optional share of the score range a drop must reach to cut there
+
+    Returns:
+        Tuple[int, str]: The number of results to keep and what decided it
+        ("max_k", "min_score" or "gap")
+    """
+    scores = np.asarray(scores, dtype=np.float64)[:max_k]
+    k, reason = len(scores), "max_k"
+    if k <= min_k:
+        return k, reason
+
+    if min_score is not None:
+        above = int(np.count_nonzero(scores >= min_score))
+        if above < k:
+            k, reason = max(min_k, above), "min_score"
+
+    if min_gap_ratio is not None and k > min_k:
+        spread = scores[0] - scores[k - 1]
+        # gaps[j] is the drop between result min_k + j - 1 and result min_k + j
+        gaps = scores[min_k - 1:k - 1] - scores[min_k:k]
+        j = int(np.argmax(gaps))
+        if spread > 0 and gaps[j] >= min_gap_ratio * spread:
+            k, reason = min_k + j, "gap"
+    return k, reason
+
+
+class AdaptiveTopKStats:
+    """Totals of results retrieved and kept by the adaptive cutoff, to tune its thresholds."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.queries = 0
+        self.retrieved = 0
+        self.kept = 0
+        self.reasons: Dict[str, int] = {}
+
+    def record(self, retrieved: int, kept: int, reason: str) -> None:
+        with self._lock:
+            self.queries += 1
+            self.retrieved += retrieved
+            self.kept += kept
+            self.reasons[reason] = self.reasons.get(reason, 0) + 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "queries": self.queries,
+                "average_retrieved": round(self.retrieved / self.queries, 2) if self.queries else 0.0,
+                "average_kept": round(self.kept / self.queries, 2) if self.queries else 0.0,
+                "cut_by": dict(self.reasons),
+            }
+
+
+adaptive_top_k_stats = AdaptiveTopKStats()
+
+
+def get_adaptive_top_k_stats() -> Dict[str, Any]:
+    """Return how many results the adaptive cutoff kept on average, and what cut them."""
+    return adaptive_top_k_stats.stats()
@@ -0,0 +1,501 @@
+import json
+import logging
+import os
+import shutil
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple, Union
+from uuid import uuid4
+
+import faiss
+import numpy as np
+
+from api.vector_index import MANIFEST_FILE, VectorIndex, load_full_vectors, normalize_rows, save_full_vectors
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Approximate engines backed by FAISS; "numpy" is the exact scan of VectorIndex
+ANN_ENGINES = ("flat", "hnsw", "ivf", "ivfpq")
+VECTOR_ENGINES = ("numpy",) + ANN_ENGINES
+
+FAISS_INDEX_FILE = "index.faiss"
+
+# Chunk counts below which "auto" picks an engine; larger corpora get IVF-PQ
+DEFAULT_AUTO_THRESHOLDS = {"numpy": 50000, "hnsw": 1000000}
+
+DEFAULT_ANN_PARAMS = {
+    "hnsw_m": 32,
+    "ef_construction": 200,
+    "ef_search": 128,
+    "nlist": None,
+    "nprobe": 16,
+    "pq_m": None,
+    "pq_nbits": 8,
+    "train_size": 262144,
+}
+
+# Parameters that are baked into the index files; the others only affect search
+BUILD_PARAMS = {
+    "flat": (),
+    "hnsw": ("hnsw_m", "ef_construction"),
+    "ivf": ("nlist",),
+    "ivfpq": ("nlist", "pq_m", "pq_nbits"),
+}
+
+# Masks allowing at most this many rows are searched exactly over those rows, which is both
+# faster and more accurate than filtering inside a graph or inverted-list traversal
+EXACT_MASK_MAX_ROWS = 20000
+
+
+def select_engine(count: int, engine: str = "auto", auto_thresholds: Optional[Dict[str, int]] = None) -> str:
+    """
+    Resolve the engine used for an index of count vectors.
+
+    Args:
+        count: Number of vectors
+        engine: One of VECTOR_ENGINES, or "auto" to pick by count
+        auto_thresholds: Counts below which "auto" picks "numpy" and then "hnsw"
+
+    Returns:
+        str: The engine name
+    """
+    if engine != "auto":
+        if engine not in VECTOR_ENGINES:
+            raise ValueError(f"Unsupported vector engine '{engine}', expected 'auto' or one of {VECTOR_ENGINES}")
+        return engine
+    thresholds = dict(DEFAULT_AUTO_THRESHOLDS, **(auto_thresholds or {}))
+    if count < thresholds["numpy"]:
+        return "numpy"
+    if count < thresholds["hnsw"]:
+        return "hnsw"
+    return "ivfpq"
+
+
+def resolve_ann_params(engine: str, count: int, dimensions: int, params: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """
+    Fill in the parameters left to defaults for an index of count vectors of the given size.
+
+    nlist defaults to 4·√N inverted lists (with at least 39 training points each), pq_m to the
+    largest divisor of the dimensions up to d/4 (one byte per 4 dimensions), and pq_nbits is
+    lowered when there are fewer than 39 training points per centroid.
+    """
+    resolved = dict(DEFAULT_ANN_PARAMS, **{key: value for key, value in (params or {}).items() if value is not None})
+    if engine in ("ivf", "ivfpq"):
+        if not resolved["nlist"]:
+            resolved["nlist"] = int(4 * np.sqrt(count))
+        resolved["nlist"] = int(max(1, min(resolved["nlist"], count // 39)))
+    if engine == "ivfpq":
+        if not resolved["pq_m"]:
+            limit = max(1, dimensions // 4)
+            resolved["pq_m"] = max(m for m in range(1, limit + 1) if dimensions % m == 0)
+        if dimensions % resolved["pq_m"]:
+            raise ValueError(f"pq_m={resolved['pq_m']} must divide the embedding size {dimensions}")
+        train_count = min(count, resolved["train_size"])
+        resolved["pq_nbits"] = int(max(1, min(resolved["pq_nbits"], np.log2(max(train_count / 39, 2)))))
+    return resolved
+
+
+def _create_faiss_index(engine: str, dimensions: int, params: Dict[str, Any]) -> "faiss.Index":
+    if engine == "flat":
+        return faiss.IndexFlatIP(dimensions)
+    if engine == "hnsw":
+        index = faiss.IndexHNSWFlat(dimensions, params["hnsw_m"], faiss.METRIC_INNER_PRODUCT)
+        index.hnsw.efConstruction = params["ef_construction"]
+        return index
+    quantizer = faiss.IndexFlatIP(dimensions)
+    if engine == "ivf":
+        return faiss.IndexIVFFlat(quantizer, dimensions, params["nlist"], faiss.METRIC_INNER_PRODUCT)
+    return faiss.IndexIVFPQ(
+        quantizer, dimensions, params["nlist"], params["pq_m"], params["pq_nbits"], faiss.METRIC_INNER_PRODUCT
+    )
+
+
+class AnnIndex:
+    """
+    Approximate inner-product search with a FAISS index, behind the VectorIndex interface.
+
+    The FAISS index is persisted next to the full vectors (float16 unless configured as float32)
+    and loaded with FAISS's mmap I/O flag. IVF-PQ results are rescored against the memory-mapped
+    full vectors; the other engines already rank by exact inner products.
+    """
+
+    def __init__(
+        self,
+        index: "faiss.Index",
+        engine: str,
+        full_vectors: np.ndarray,
+        params: Dict[str, Any],
+        rescore: bool = True,
+        rescore_factor: int = 4,
+        version: Optional[str] = None,
+        nbytes: int = 0,
+    ):
+        self.index = index
+        self.engine = engine
+        self.full_vectors = full_vectors
+        self.params = params
+        self.rescore = rescore and engine == "ivfpq"
+        self.rescore_factor = max(1, int(rescore_factor))
+        self.version = version or uuid4().hex
+        self._nbytes = nbytes
+
+    @property
+    def dtype(self) -> str:
+        return "pq" if self.engine == "ivfpq" else "float32"
+
+    @property
+    def dimensions(self) -> int:
+        return int(self.index.d)
+
+    def __len__(self) -> int:
+        return int(self.index.ntotal)
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the FAISS index (the full vectors used for rescoring are memory-mapped and not counted)."""
+        return self._nbytes
+
+    @classmethod
+    def build(
+        cls,
+        vectors: np.ndarray,
+        index_dir: str,
+        engine: str = "hnsw",
+        params: Optional[Dict[str, Any]] = None,
+        rescore: bool = True,
+        rescore_factor: int = 4,
+        mmap: bool = True,
+        full_vectors_dtype: str = "float16",
+    ) -> "AnnIndex":
+        """
+        Normalize the vectors, build and persist a FAISS index to index_dir and return it loaded.
+
+        Args:
+            vectors: A (N, d) array of embeddings
+            index_dir: Directory the index files are written to (replaced if it exists)
+            engine: One of ANN_ENGINES
+            params: Overrides of DEFAULT_ANN_PARAMS
+            rescore: Whether IVF-PQ candidates are re-ranked with the full vectors
+            rescore_factor: Candidates kept for rescoring, as a multiple of top_k
+            mmap: Whether the loaded index is memory-mapped
+            full_vectors_dtype: Precision of the full vectors, "float16" or "float32"
+
+        Returns:
+            AnnIndex: The index, loaded back from disk
+        """
+        if engine not in ANN_ENGINES:
+            raise ValueError(f"Unsupported ANN engine '{engine}', expected one of {ANN_ENGINES}")
+        full_vectors = normalize_rows(vectors)
+        count, dimensions = full_vectors.shape
+        params = resolve_ann_params(engine, count, dimensions, params)
+
+        started_at = time.time()
+        index = _create_faiss_index(engine, dimensions, params)
+        if not index.is_trained:
+            train_count = min(count, params["train_size"])
+            sample = np.random.default_rng(0).choice(count, train_count, replace=False) if train_count < count else slice(None)
+            index.train(np.ascontiguousarray(full_vectors[sample]))
+        index.add(full_vectors)
+
+        tmp_dir = f"{index_dir}.{uuid4().hex}.tmp"
+        os.makedirs(tmp_dir, exist_ok=True)
+        try:
+            save_full_vectors(tmp_dir, full_vectors, full_vectors_dtype)
+            faiss.write_index(index, os.path.join(tmp_dir, FAISS_INDEX_FILE))
+            with open(os.path.join(tmp_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+                json.dump({
+                    "count": int(count),
+                    "dimensions": int(dimensions),
+                    "engine": engine,
+                    "dtype": "pq" if engine == "ivfpq" else "float32",
+                    "params": {key: params[key] for key in BUILD_PARAMS[engine]},
+                    "version": uuid4().hex,
+                }, f)
+
+            shutil.rmtree(index_dir, ignore_errors=True)
+            os.replace(tmp_dir, index_dir)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        logger.info(f"Built {engine} index of {count} vectors in {time.time() - started_at:.2f}s at {index_dir}")
+        return cls.load(index_dir, params=params, rescore=rescore, rescore_factor=rescore_factor, mmap=mmap)
+
+    @classmethod
+    def load(
+        cls,
+        index_dir: str,
+        params: Optional[Dict[str, Any]] = None,
+        rescore: bool = True,
+        rescore_factor: int = 4,
+        mmap: bool = True,
+    ) -> "AnnIndex":
+        """
+        Load an index written by build(). Search parameters (ef_search, nprobe) come from
+        params, so they can be tuned without rebuilding.
+        """
+        manifest = VectorIndex.read_manifest(index_dir) or {}
+        engine = manifest.get("engine")
+        if engine not in ANN_ENGINES:
+            raise ValueError(f"No ANN index found at {index_dir}")
+        path = os.path.join(index_dir, FAISS_INDEX_FILE)
+        flags = faiss.IO_FLAG_READ_ONLY
+        if mmap:
+            flags |= getattr(faiss, "IO_FLAG_MMAP_IFC", faiss.IO_FLAG_MMAP)
+        index = faiss.read_index(path, flags)
+        params = dict(DEFAULT_ANN_PARAMS, **{key: value for key, value in (params or {}).items() if value is not None})
+        params.update(manifest.get("params", {}))
+        full_vectors = load_full_vectors(index_dir, include_codes=False)
+        if full_vectors is None:
+            raise ValueError(f"No full vectors found next to the ANN index at {index_dir}")
+        return cls(
+            index,
+            engine,
+            full_vectors,
+            params,
+            rescore=rescore,
+            rescore_factor=rescore_factor,
+            version=manifest.get("version"),
+            nbytes=os.path.getsize(path),
+        )
+
+    def _search_parameters(self, n_candidates: int, selector: Any = None) -> "faiss.SearchParameters":
+        if self.engine == "hnsw":
+            search_params = faiss.SearchParametersHNSW()
+            search_params.efSearch = max(int(self.params["ef_search"]), n_candidates)
+        elif self.engine in ("ivf", "ivfpq"):
+            search_params = faiss.SearchParametersIVF()
+            search_params.nprobe = min(int(self.params["nprobe"]), int(self.params["nlist"]))
+        else:
+            search_params = faiss.SearchParameters()
+        if selector is not None:
+            search_params.sel = selector
+        return search_params
+
+    def _exact_search(self, queries: np.ndarray, rows: np.ndarray, k: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Score the given rows exactly against every query and keep the top k."""
+        scores = np.asarray(self.full_vectors[rows], dtype=np.float32) @ queries.T
+        all_scores = np.empty((queries.shape[0], k), dtype=np.float32)
+        all_indices = np.empty((queries.shape[0], k), dtype=np.int64)
+        for qi in range(queries.shape[0]):
+            column = scores[:, qi]
+            candidates = np.argpartition(-column, k - 1)[:k] if k < len(rows) else np.arange(len(rows))
+            order = np.argsort(-column[candidates], kind="stable")
+            all_indices[qi] = rows[candidates[order]]
+            all_scores[qi] = column[candidates[order]]
+        return all_scores, all_indices
+
+    def search(
+        self, queries: np.ndarray, top_k: int, mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the top_k most similar vectors for each query.
+
+        Args:
+            queries: A (m, d) or (d,) array of query embeddings
+            top_k: Number of results per query
+            mask: Optional boolean array of length len(self); only rows where it is True are returned
+
+        Returns:
+            Tuple of (scores, indices), both shaped (m, k) with k = min(top_k, number of
+            searchable rows). Scores are cosine similarities. An approximate engine may find
+            fewer than k neighbors, in which case the missing entries have index -1.
+        """
+        queries = normalize_rows(np.atleast_2d(queries))
+        if queries.shape[1] != self.dimensions:
+            raise ValueError(f"Query dimension {queries.shape[1]} does not match index dimension {self.dimensions}")
+        if mask is not None and len(mask) != len(self):
+            raise ValueError(f"Mask length {len(mask)} does not match index size {len(self)}")
+
+        searchable = len(self) if mask is None else int(np.count_nonzero(mask))
+        k = min(top_k, searchable)
+        if k <= 0:
+            empty = np.zeros((queries.shape[0], 0))
+            return empty.astype(np.float32), empty.astype(np.int64)
+        if mask is not None and searchable <= EXACT_MASK_MAX_ROWS:
+            return self._exact_search(queries, np.flatnonzero(mask), k)
+
+        n_candidates = min(searchable, k * self.rescore_factor) if self.rescore else k
+        selector = None
+        if mask is not None:
+            bitmap = np.packbits(np.asarray(mask, dtype=bool), bitorder="little")
+            selector = faiss.IDSelectorBitmap(len(self), faiss.swig_ptr(bitmap))
+        scores, indices = self.index.search(queries, n_candidates, params=self._search_parameters(n_candidates, selector))
+
+        if self.rescore:
+            for qi in range(queries.shape[0]):
+                found = indices[qi][indices[qi] >= 0]
+                rows = np.sort(found)
+                exact = np.asarray(self.full_vectors[rows], dtype=np.float32) @ queries[qi]
+                order = np.argsort(-exact, kind="stable")
+                indices[qi] = -1
+                scores[qi] = -np.inf
+                indices[qi, :len(rows)] = rows[order]
+                scores[qi, :len(rows)] = exact[order]
+        return scores[:, :k].astype(np.float32, copy=False), indices[:, :k].astype(np.int64, copy=False)
+
+    def measure_recall(self, queries: np.ndarray, top_k: int) -> float:
+        """Fraction of the exact top_k results, scored against the full vectors, that this index also returns."""
+        queries = normalize_rows(np.atleast_2d(queries))
+        k = min(top_k, len(self))
+        _, exact = self._exact_search(queries, np.arange(len(self)), k)
+        _, approx = self.search(queries, top_k)
+        hits = sum(len(set(exact[i]) & set(approx[i])) for i in range(queries.shape[0]))
+        return hits / float(exact.size) if exact.size else 1.0
+
+
+def _resolve_engine(count: int, vector_store_config: Dict[str, Any]) -> str:
+    return select_engine(count, vector_store_config.get("engine", "numpy"), vector_store_config.get("auto_thresholds"))
+
+
+def _ann_rescore_factor(vector_store_config: Dict[str, Any]) -> int:
+    # Product quantization codes are much coarser than int8, so IVF-PQ has its own candidate pool size
+    return (vector_store_config.get("ann") or {}).get("rescore_factor") or vector_store_config.get("rescore_factor", 4)
+
+
+def build_vector_index(
+    vectors: np.ndarray, index_dir: str, vector_store_config: Optional[Dict[str, Any]] = None
+) -> Union[VectorIndex, AnnIndex]:
+    """
+    Build and persist the search index for a set of embeddings with the engine selected by
+    the "vector_store" configuration section.
+
+    Args:
+        vectors: A (N, d) array of embeddings
+        index_dir: Directory the index files are written to (replaced if it exists)
+        vector_store_config: The "vector_store" configuration section
+
+    Returns:
+        Union[VectorIndex, AnnIndex]: The index, loaded back from disk
+    """
+    config = vector_store_config or {}
+    engine = _resolve_engine(len(vectors), config)
+    rescore = config.get("rescore", True)
+    mmap = config.get("mmap", True)
+    if engine == "numpy":
+        return VectorIndex.build(
+            vectors,
+            index_dir,
+            dtype=config.get("dtype", "float32"),
+            rescore=rescore,
+            rescore_factor=config.get("rescore_factor", 4),
+            mmap=mmap,
+            full_vectors_dtype=config.get("full_vectors_dtype", "float16"),
+        )
+    return AnnIndex.build(
+        vectors,
+        index_dir,
+        engine=engine,
+        params=config.get("ann"),
+        rescore=rescore,
+        rescore_factor=_ann_rescore_factor(config),
+        mmap=mmap,
+        full_vectors_dtype=config.get("full_vectors_dtype", "float16"),
+    )
+
+
+def vector_index_matches(manifest: Optional[Dict[str, Any]], count: int, vector_store_config: Optional[Dict[str, Any]] = None) -> bool:
+    """Whether a persisted index, described by its manifest, was built the way the configuration asks for."""
+    if not manifest or manifest.get("count") != count:
+        return False
+    config = vector_store_config or {}
+    engine = _resolve_engine(count, config)
+    if manifest.get("engine", "numpy") != engine:
+        return False
+    if engine == "numpy":
+        return manifest.get("dtype") == config.get("dtype", "float32")
+    params = resolve_ann_params(engine, count, int(manifest.get("dimensions", 0)), config.get("ann"))
+    return all(manifest.get("params", {}).get(key) == params[key] for key in BUILD_PARAMS[engine])
+
+
+def load_vector_index(index_dir: str, vector_store_config: Optional[Dict[str, Any]] = None) -> Union[VectorIndex, AnnIndex]:
+    """Load the index persisted in index_dir, whichever engine built it."""
+    config = vector_store_config or {}
+    rescore = config.get("rescore", True)
+    mmap = config.get("mmap", True)
+    manifest = VectorIndex.read_manifest(index_dir) or {}
+    if manifest.get("engine", "numpy") == "numpy":
+        return VectorIndex.load(index_dir, rescore=rescore, rescore_factor=config.get("rescore_factor", 4), mmap=mmap)
+    return AnnIndex.load(
+        index_dir, params=config.get("ann"), rescore=rescore, rescore_factor=_ann_rescore_factor(config), mmap=mmap
+    )
+
+
+def benchmark(
+    vectors: np.ndarray,
+    queries: np.ndarray,
+    engines: Sequence[str] = VECTOR_ENGINES,
+    top_k: int = 20,
+    work_dir: Optional[str] = None,
+    vector_store_config: Optional[Dict[str, Any]] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Measure build time, size, recall@top_k against exact search and per-query latency of each engine.
+
+    Args:
+        vectors: A (N, d) array of embeddings
+        queries: A (m, d) array of query embeddings
+        engines: Engines to compare
+        top_k: Cutoff for recall and search
+        work_dir: Directory for the index files, a temporary one if None
+        vector_store_config: Base "vector_store" configuration, its engine is overridden
+
+    Returns:
+        List[Dict[str, Any]]: One result row per engine
+    """
+    import tempfile
+
+    results = []
+    with tempfile.TemporaryDirectory(dir=work_dir) as tmp_dir:
+        for engine in engines:
+            config = dict(vector_store_config or {}, engine=engine)
+            started_at = time.time()
+            index = build_vector_index(vectors, os.path.join(tmp_dir, engine), config)
+            build_seconds = time.time() - started_at
+
+            latencies = []
+            for query in queries:
+                started_at = time.perf_counter()
+                index.search(query, top_k)
+                latencies.append(time.perf_counter() - started_at)
+            latencies_ms = np.array(latencies) * 1000
+            results.append({
+                "engine": engine,
+                "build_seconds": round(build_seconds, 3),
+                "size_mb": round(index.nbytes / 1024 / 1024, 2),
+                f"recall@{top_k}": round(index.measure_recall(queries, top_k), 4),
+                "p50_ms": round(float(np.percentile(latencies_ms, 50)), 3),
+                "p95_ms": round(float(np.percentile(latencies_ms, 95)), 3),
+            })
+    return results
+
+
+if __name__ == "__main__":
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Compare the recall and latency of the vector search engines")
+    parser.add_argument("--index-dir", help="A repository index directory whose embeddings are benchmarked")
+    parser.add_argument("--count", type=int, default=100000, help="Number of synthetic vectors without --index-dir")
+    parser.add_argument("--dimensions", type=int, default=256, help="Size of the synthetic vectors")
+    parser.add_argument("--queries", type=int, default=200, help="Number of queries")
+    parser.add_argument("--top-k", type=int, default=20)
+    parser.add_argument("--engines", default=",".join(VECTOR_ENGINES), help="Comma-separated engines to compare")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    rng = np.random.default_rng(0)
+    if args.index_dir:
+        vectors = load_full_vectors(os.path.join(args.index_dir, "vectors"))
+    else:
+        # Clustered vectors, closer to real embeddings than uniform noise
+        centers = rng.normal(size=(max(1, args.count // 1000), args.dimensions))
+        vectors = centers[rng.integers(len(centers), size=args.count)] + 0.5 * rng.normal(size=(args.count, args.dimensions))
+    vectors = np.asarray(vectors, dtype=np.float32)
+    # Queries are perturbed stored vectors, so each has a meaningful neighborhood
+    sample = vectors[rng.integers(len(vectors), size=args.queries)]
+    queries = sample + 0.1 * np.abs(sample).mean() * rng.normal(size=sample.shape).astype(np.float32)
+
+    from api.config import configs
+
+    rows = benchmark(vectors, queries, args.engines.split(","), args.top_k, vector_store_config=configs.get("vector_store"))
+    print(f"{len(vectors)} vectors of {vectors.shape[1]} dimensions, {len(queries)} queries")
+    print(json.dumps(rows, indent=2))
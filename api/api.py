@@ -1,6 +1,6 @@
 import os
 import logging
-from fastapi import FastAPI, HTTPException, Query, Request, WebSocket
+from fastapi import FastAPI, HTTPException, Query, Request, WebSocket, WebSocketDisconnect
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse, Response
 from typing import List, Optional, Dict, Any, Literal
@@ -144,6 +144,45 @@ class ModelConfig(BaseModel):
 class AuthorizationConfig(BaseModel):
     code: str = Field(..., description="Authorization code")
 
+class RetrieveRepository(BaseModel):
+    """
+    Model for an additional repository searched by a federated retrieval request.
+    """
+    repo_url: str = Field(..., description="URL or local path of the repository")
+    type: Optional[str] = Field("github", description="Type of repository (e.g., 'github', 'gitlab', 'bitbucket', 'local')")
+    token: Optional[str] = Field(None, description="Personal access token for private repositories")
+
+class RetrieveRequest(BaseModel):
+    """
+    Model for retrieving the context of many queries at once, such as every page of a wiki structure.
+    """
+    repo_url: str = Field(..., description="URL or local path of the repository to search")
+    queries: List[str] = Field(..., description="Queries to retrieve context for")
+    type: Optional[str] = Field("github", description="Type of repository (e.g., 'github', 'gitlab', 'bitbucket', 'local')")
+    token: Optional[str] = Field(None, description="Personal access token for private repositories")
+    provider: str = Field("google", description="Model provider of the RAG pipeline")
+    model: Optional[str] = Field(None, description="Model name for the specified provider")
+    excluded_dirs: Optional[List[str]] = Field(None, description="Directories to exclude from retrieval")
+    excluded_files: Optional[List[str]] = Field(None, description="File patterns to exclude from retrieval")
+    included_dirs: Optional[List[str]] = Field(None, description="Directories to include exclusively")
+    included_files: Optional[List[str]] = Field(None, description="File patterns to include exclusively")
+    metadata_filters: Optional[Dict[str, Any]] = Field(
+        None, description="Predicates on the chunks to search: code_only, implementation_only, exclude_tests, path_prefix, languages"
+    )
+    merge: bool = Field(True, description="Merge overlapping chunks of the same file into single spans")
+    repositories: Optional[List[RetrieveRepository]] = Field(
+        None, description="Other repositories to search together with repo_url; results are tagged with their repo"
+    )
+
+class IndexRequest(BaseModel):
+    """
+    Model for enqueueing a background indexing job for a repository.
+    """
+    repo_url: str = Field(..., description="URL or local path of the repository to index")
+    type: Optional[str] = Field("github", description="Type of repository (e.g., 'github', 'gitlab', 'bitbucket', 'local')")
+    token: Optional[str] = Field(None, description="Personal access token for private repositories")
+    provider: str = Field("google", description="Model provider whose embedder builds the index")
+
 from api.config import configs, WIKI_AUTH_MODE, WIKI_AUTH_CODE
 
 @app.get("/lang/config")
@@ -393,6 +432,21 @@ def generate_json_export(repo_url: str, pages: List[WikiPage]) -> str:
 # Import the simplified chat implementation
 from api.simple_chat import chat_completions_stream
 from api.websocket_wiki import handle_websocket_chat
+from api.retrieval_cache import get_cache_stats
+from api.retriever_registry import get_registry_stats
+from api.lexical_index import get_lexical_stats
+from api.context_merge import get_context_merge_stats
+from api.adaptive_top_k import get_adaptive_top_k_stats
+from api.file_vectors import get_coarse_search_stats
+from api.client_pool import get_client_pool_stats
+from api.executors import get_executor_stats, run_blocking, shutdown_executors
+from api.index_jobs import get_index_job_stats, index_jobs
+from api.embedding_throughput import get_throughput_stats
+from api.storage_manager import get_storage_manager
+from api.rag import RAG
+from api.federated_retriever import FederatedRetriever
+from api.context_merge import merge_chunks
+from api.metadata_filters import resolve_metadata_filters
 
 # Add the chat_completions_stream endpoint to the main app
 app.add_api_route("/chat/completions/stream", chat_completions_stream, methods=["POST"])
@@ -400,6 +454,11 @@ app.add_api_route("/chat/completions/stream", chat_completions_stream, methods=[
 # Add the WebSocket endpoint
 app.add_websocket_route("/ws/chat", handle_websocket_chat)
 
+@app.on_event("shutdown")
+async def stop_executors():
+    """Stop the thread pools that run blocking work for the handlers."""
+    shutdown_executors()
+
 # --- Wiki Cache Helper Functions ---
 
 WIKI_CACHE_DIR = os.path.join(get_adalflow_default_root_path(), "wikicache")
@@ -417,7 +476,8 @@ async def read_wiki_cache(owner: str, repo: str, repo_type: str, language: str)
         try:
             with open(cache_path, 'r', encoding='utf-8') as f:
                 data = json.load(f)
-                return WikiCacheData(**data)
+            get_storage_manager().touch(cache_path)
+            return WikiCacheData(**data)
         except Exception as e:
             logger.error(f"Error reading wiki cache from {cache_path}: {e}")
             return None
@@ -448,6 +508,9 @@ async def save_wiki_cache(data: WikiCacheRequest) -> bool:
         with open(cache_path, 'w', encoding='utf-8') as f:
             json.dump(payload.model_dump(), f, indent=2)
         logger.info(f"Wiki cache successfully saved to {cache_path}")
+        storage_manager = get_storage_manager()
+        storage_manager.touch(cache_path)
+        await run_blocking("io", storage_manager.enforce_quota, [cache_path])
         return True
     except IOError as e:
         logger.error(f"IOError saving wiki cache to {cache_path}: {e.strerror} (errno: {e.errno})", exc_info=True)
@@ -546,6 +609,157 @@ async def health_check():
         "service": "deepwiki-api"
     }
 
+@app.get("/metrics")
+async def get_metrics():
+    """Runtime metrics, such as retrieval cache and retriever registry hit rates, lexical fast path use, prompt tokens saved by chunk merging and embedding throughput, for monitoring"""
+    return {
+        "retrieval_cache": get_cache_stats(),
+        "retriever_registry": get_registry_stats(),
+        "lexical_search": get_lexical_stats(),
+        "coarse_search": get_coarse_search_stats(),
+        "adaptive_top_k": get_adaptive_top_k_stats(),
+        "context_merge": get_context_merge_stats(),
+        "embedding_throughput": get_throughput_stats(),
+        "client_pool": get_client_pool_stats(),
+        "executors": get_executor_stats(),
+        "index_jobs": get_index_job_stats(),
+        "timestamp": datetime.now().isoformat(),
+    }
+
+@app.post("/retrieve")
+async def retrieve_contexts(request: RetrieveRequest):
+    """
+    Retrieve the chunks of many queries in one request: queries are embedded in one batched
+    call and searched as a single matrix, so a whole wiki structure costs one round trip.
+    """
+    if not request.queries:
+        raise HTTPException(status_code=400, detail="No queries provided")
+    try:
+        resolve_metadata_filters(request.metadata_filters)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+
+    for repository in [request] + (request.repositories or []):
+        indexing_job = await index_jobs.wait_for_repo(repository.repo_url, repository.type)
+        if indexing_job is not None:
+            raise HTTPException(
+                status_code=409,
+                detail=f"{repository.repo_url} is still being indexed by job {indexing_job.id} ({indexing_job.stage})",
+            )
+
+    file_filters = {
+        "excluded_dirs": request.excluded_dirs,
+        "excluded_files": request.excluded_files,
+        "included_dirs": request.included_dirs,
+        "included_files": request.included_files,
+    }
+
+    async def retrieve_federated():
+        """Return the documents and their scores for each query, across every repository."""
+        # Several repositories are searched in parallel as shards of one corpus
+        repositories = [{"repo_url": request.repo_url, "type": request.type, "token": request.token}]
+        repositories += [repository.model_dump() for repository in request.repositories]
+        federated = await FederatedRetriever.prepare(
+            repositories, provider=request.provider, model=request.model, **file_filters
+        )
+        return await run_blocking("io", search_federated, federated)
+
+    def search_federated(federated):
+        """Search the prepared shards for each query."""
+        return [
+            ([hit.document for hit in hits], [hit.score for hit in hits])
+            for hits in federated.search(request.queries, metadata_filters=request.metadata_filters)
+        ]
+
+    def retrieve():
+        """Return the documents and their scores for each query."""
+        rag = RAG(provider=request.provider, model=request.model)
+        rag.prepare_retriever(request.repo_url, request.type, request.token, **file_filters)
+        return [
+            (result.documents, result.doc_scores)
+            for result in rag.retrieve_many(request.queries, request.metadata_filters)
+        ]
+
+    try:
+        if request.repositories:
+            results = await retrieve_federated()
+        else:
+            # Loaded indexes are served from "io" workers; a load or build runs on the "index" pool
+            results = await run_blocking("io", retrieve)
+    except ValueError as e:
+        logger.error(f"Error retrieving contexts: {str(e)}")
+        raise HTTPException(status_code=500, detail=f"Error retrieving contexts: {str(e)}")
+
+    response = []
+    for query, (documents, doc_scores) in zip(request.queries, results):
+        scores = {doc.id: score for doc, score in zip(documents, doc_scores)}
+        if request.merge:
+            documents = merge_chunks(documents).documents
+        response.append({
+            "query": query,
+            "documents": [
+                {
+                    "repo": doc.meta_data.get("repo", request.repo_url),
+                    "file_path": doc.meta_data.get("file_path"),
+                    "text": doc.text,
+                    "score": scores.get(doc.id),
+                }
+                for doc in documents
+            ],
+        })
+    return {"results": response}
+
+@app.post("/index", status_code=202)
+async def submit_index_job(request: IndexRequest):
+    """
+    Enqueue a background job that clones, reads, splits and embeds a repository, and return
+    its job ID. A repository that is already queued or being indexed returns its current job.
+    """
+    job = index_jobs.submit(request.repo_url, request.type, request.token, request.provider)
+    return job.snapshot()
+
+@app.get("/index/{job_id}")
+async def get_index_job(job_id: str):
+    """Status of an indexing job: its stage, the stage's progress counts and throughput, and its result or error"""
+    job = index_jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Indexing job {job_id} not found")
+    return job.snapshot()
+
+# Seconds between two progress messages of /ws/index/{job_id}
+INDEX_PROGRESS_INTERVAL = 1.0
+
+@app.websocket("/ws/index/{job_id}")
+async def stream_index_job(websocket: WebSocket, job_id: str):
+    """Send the status of an indexing job every INDEX_PROGRESS_INTERVAL seconds, and once more when it finishes."""
+    await websocket.accept()
+    job = index_jobs.get(job_id)
+    if job is None:
+        await websocket.send_json({"error": f"Indexing job {job_id} not found"})
+        await websocket.close()
+        return
+    try:
+        while True:
+            snapshot = job.snapshot()
+            await websocket.send_json(snapshot)
+            if snapshot["status"] not in ("queued", "running"):
+                break
+            await job.wait(INDEX_PROGRESS_INTERVAL)
+        await websocket.close()
+    except WebSocketDisconnect:
+        logger.info(f"Progress listener of indexing job {job_id} disconnected")
+
+@app.get("/storage/usage")
+async def get_storage_usage():
+    """Disk usage of cloned repositories, indexes and wiki caches against the configured quota"""
+    return await run_blocking("io", get_storage_manager().usage)
+
+@app.post("/storage/enforce")
+async def enforce_storage_quota():
+    """Evict least recently used artifacts until the storage root fits the quota"""
+    evicted = await run_blocking("io", get_storage_manager().enforce_quota)
+    return {"evicted": [artifact.path for artifact in evicted], "count": len(evicted)}
+
 @app.get("/")
 async def root():
     """Root endpoint to check if the API is running and list available endpoints dynamically."""
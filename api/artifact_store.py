@@ -0,0 +1,264 @@
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+from uuid import uuid4
+
+from api.config import configs
+from api.index_store import is_index
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Descriptor of a published index, written last so a half-published artifact is never visible
+ARTIFACT_FILE = "artifact.json"
+
+
+def list_index_files(index_dir: str) -> List[Dict[str, Any]]:
+    """Return the relative path and size of every file of an index directory, sorted by path."""
+    files = []
+    for dirpath, _, filenames in os.walk(index_dir):
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            files.append({
+                "path": os.path.relpath(path, index_dir).replace(os.sep, "/"),
+                "size": os.path.getsize(path),
+            })
+    return sorted(files, key=lambda file: file["path"])
+
+
+def _install_pulled_index(tmp_dir: str, index_dir: str) -> bool:
+    """Move a downloaded index into place, unless another request installed one first."""
+    if not is_index(tmp_dir):
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise ValueError(f"Pulled artifact at {tmp_dir} is not a complete index")
+    try:
+        os.replace(tmp_dir, index_dir)
+    except OSError:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        if not is_index(index_dir):
+            raise
+    return True
+
+
+class ArtifactStore(ABC):
+    """
+    Shared store of built repository indexes, addressed by index key.
+
+    One API node builds an index and publishes it; other nodes pull it into their local
+    databases directory and memory-map it from there, so a fleet embeds each repository once.
+    Publishing uploads the index files first and the artifact descriptor last, so readers
+    only ever see complete artifacts.
+    """
+
+    @abstractmethod
+    def get_artifact(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the descriptor of a published index, or None if the key was not published."""
+
+    @abstractmethod
+    def _upload(self, key: str, index_dir: str, artifact: Dict[str, Any]) -> None:
+        """Upload the files of an index, then its descriptor."""
+
+    @abstractmethod
+    def _download(self, key: str, artifact: Dict[str, Any], target_dir: str) -> None:
+        """Download the files of a published index into target_dir."""
+
+    def publish(self, key: str, index_dir: str, entry: Dict[str, Any]) -> bool:
+        """
+        Publish a local index under its key.
+
+        Args:
+            key: The index key
+            index_dir: The local index directory
+            entry: The catalog entry describing the inputs of the index
+
+        Returns:
+            bool: False if the key was already published
+        """
+        if self.get_artifact(key) is not None:
+            return False
+        artifact = {
+            "key": key,
+            "entry": entry,
+            "files": list_index_files(index_dir),
+            "published_at": time.time(),
+        }
+        started_at = time.time()
+        self._upload(key, index_dir, artifact)
+        size = sum(file["size"] for file in artifact["files"])
+        logger.info(f"Published index {key} ({size / 1024 / 1024:.1f} MB) in {time.time() - started_at:.2f}s")
+        return True
+
+    def pull(self, key: str, index_dir: str) -> Optional[Dict[str, Any]]:
+        """
+        Download a published index into a local index directory.
+
+        Args:
+            key: The index key
+            index_dir: The local index directory to create
+
+        Returns:
+            Optional[Dict[str, Any]]: The artifact descriptor, or None if the key was not published
+        """
+        artifact = self.get_artifact(key)
+        if artifact is None:
+            return None
+        started_at = time.time()
+        tmp_dir = f"{index_dir}.{uuid4().hex}.tmp"
+        try:
+            self._download(key, artifact, tmp_dir)
+        except Exception:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        _install_pulled_index(tmp_dir, index_dir)
+        logger.info(f"Pulled index {key} in {time.time() - started_at:.2f}s")
+        return artifact
+
+
+class LocalArtifactStore(ArtifactStore):
+    """Artifact store on a shared directory, such as an NFS mount: one {key}/ directory per index."""
+
+    def __init__(self, root_path: str):
+        self.root_path = root_path
+
+    def get_artifact(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            with open(os.path.join(self.root_path, key, ARTIFACT_FILE), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _upload(self, key: str, index_dir: str, artifact: Dict[str, Any]) -> None:
+        os.makedirs(self.root_path, exist_ok=True)
+        tmp_dir = os.path.join(self.root_path, f"{key}.{uuid4().hex}.tmp")
+        try:
+            shutil.copytree(index_dir, tmp_dir)
+            with open(os.path.join(tmp_dir, ARTIFACT_FILE), "w", encoding="utf-8") as f:
+                json.dump(artifact, f)
+            os.replace(tmp_dir, os.path.join(self.root_path, key))
+        except OSError:
+            # Another node published the same key concurrently
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            if self.get_artifact(key) is None:
+                raise
+
+    def _download(self, key: str, artifact: Dict[str, Any], target_dir: str) -> None:
+        source_dir = os.path.join(self.root_path, key)
+        shutil.copytree(source_dir, target_dir, ignore=shutil.ignore_patterns(ARTIFACT_FILE))
+
+
+class S3ArtifactStore(ArtifactStore):
+    """
+    Artifact store on S3 or any S3-compatible API, such as MinIO for local deployments.
+    Objects are stored as {prefix}/{key}/{file}.
+    """
+
+    def __init__(
+        self,
+        bucket: str,
+        prefix: str = "",
+        endpoint_url: Optional[str] = None,
+        region_name: Optional[str] = None,
+        client: Any = None,
+    ):
+        """
+        Args:
+            bucket: The bucket name
+            prefix: Key prefix of the artifacts within the bucket
+            endpoint_url: URL of an S3-compatible service, None for AWS S3
+            region_name: The bucket region
+            client: A boto3 S3 client, created from the default AWS credentials if None
+        """
+        if client is None:
+            import boto3
+
+            client = boto3.client("s3", endpoint_url=endpoint_url or None, region_name=region_name or None)
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix.strip("/")
+
+    def _object_key(self, key: str, path: str) -> str:
+        return "/".join(part for part in (self.prefix, key, path) if part)
+
+    def get_artifact(self, key: str) -> Optional[Dict[str, Any]]:
+        try:
+            response = self.client.get_object(Bucket=self.bucket, Key=self._object_key(key, ARTIFACT_FILE))
+        except Exception as e:
+            error_code = getattr(e, "response", {}).get("Error", {}).get("Code")
+            if error_code in ("NoSuchKey", "404", "NotFound"):
+                return None
+            raise
+        return json.loads(response["Body"].read())
+
+    def _upload(self, key: str, index_dir: str, artifact: Dict[str, Any]) -> None:
+        for file in artifact["files"]:
+            self.client.upload_file(
+                os.path.join(index_dir, file["path"]), self.bucket, self._object_key(key, file["path"])
+            )
+        self.client.put_object(
+            Bucket=self.bucket,
+            Key=self._object_key(key, ARTIFACT_FILE),
+            Body=json.dumps(artifact).encode("utf-8"),
+            ContentType="application/json",
+        )
+
+    def _download(self, key: str, artifact: Dict[str, Any], target_dir: str) -> None:
+        for file in artifact["files"]:
+            path = os.path.join(target_dir, *file["path"].split("/"))
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            self.client.download_file(self.bucket, self._object_key(key, file["path"]), path)
+            if os.path.getsize(path) != file["size"]:
+                raise ValueError(f"Size mismatch for {file['path']} of index {key}")
+
+
+def create_artifact_store(config: Dict[str, Any]) -> Optional[ArtifactStore]:
+    """
+    Create the artifact store described by an artifact_store config.
+
+    The url selects the backend: "s3://bucket/prefix" for S3 or an S3-compatible service
+    (with endpoint_url), a directory path or "file://" URL for a shared directory, and an
+    empty url disables publishing.
+
+    Returns:
+        Optional[ArtifactStore]: The store, or None if none is configured
+    """
+    url = (config or {}).get("url")
+    if not url:
+        return None
+    parsed = urlparse(url)
+    if parsed.scheme == "s3":
+        return S3ArtifactStore(
+            bucket=parsed.netloc,
+            prefix=parsed.path,
+            endpoint_url=config.get("endpoint_url"),
+            region_name=config.get("region"),
+        )
+    if parsed.scheme in ("", "file"):
+        return LocalArtifactStore(os.path.expanduser(parsed.path if parsed.scheme else url))
+    raise ValueError(f"Unsupported artifact store URL: {url}")
+
+
+_artifact_store: Optional[ArtifactStore] = None
+_artifact_store_loaded = False
+_artifact_store_lock = threading.Lock()
+
+
+def get_artifact_store() -> Optional[ArtifactStore]:
+    """
+    Return the process-wide artifact store from repo.json's artifact_store section, or None.
+    The DEEPWIKI_ARTIFACT_STORE environment variable overrides its url.
+    """
+    global _artifact_store, _artifact_store_loaded
+    with _artifact_store_lock:
+        if not _artifact_store_loaded:
+            config = dict(configs.get("artifact_store", {}))
+            if os.environ.get("DEEPWIKI_ARTIFACT_STORE"):
+                config["url"] = os.environ["DEEPWIKI_ARTIFACT_STORE"]
+            _artifact_store = create_artifact_store(config)
+            _artifact_store_loaded = True
+        return _artifact_store
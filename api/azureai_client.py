@@ -305,9 +305,11 @@ class AzureAIClient(ModelClient):
         completion: Union[ChatCompletion, Generator[ChatCompletionChunk, None, None]],
     ) -> "GeneratorOutput":
         """Parse the completion, and put it into the raw_response."""
-        log.debug(f"completion: {completion}, parser: {self.chat_completion_parser}")
+        # Pooled clients are shared by concurrent requests, so the parser is chosen per completion
+        parser = handle_streaming_response if isinstance(completion, Stream) else self.chat_completion_parser
+        log.debug(f"completion: {completion}, parser: {parser}")
         try:
-            data = self.chat_completion_parser(completion)
+            data = parser(completion)
             usage = self.track_completion_usage(completion)
             return GeneratorOutput(
                 data=None, error=None, raw_response=data, usage=usage
@@ -415,10 +417,7 @@ class AzureAIClient(ModelClient):
         if model_type == ModelType.EMBEDDER:
             return self.sync_client.embeddings.create(**api_kwargs)
         elif model_type == ModelType.LLM:
-            if "stream" in api_kwargs and api_kwargs.get("stream", False):
-                log.debug("streaming call")
-                self.chat_completion_parser = handle_streaming_response
-                return self.sync_client.chat.completions.create(**api_kwargs)
+            # Streams are told apart from completions in parse_chat_completion
             return self.sync_client.chat.completions.create(**api_kwargs)
         else:
             raise ValueError(f"model_type {model_type} is not supported")
@@ -11,6 +11,8 @@ from typing import Dict, Any, Optional, List, Generator, Union, AsyncGenerator
 from adalflow.core.model_client import ModelClient
 from adalflow.core.types import ModelType, GeneratorOutput
 
+from api.executors import run_blocking
+
 # Configure logging
 from api.logging_config import setup_logging
 
@@ -291,9 +293,8 @@ class BedrockClient(ModelClient):
 
     async def acall(self, api_kwargs: Dict = None, model_type: ModelType = None) -> Any:
         """Make an asynchronous call to the AWS Bedrock API."""
-        # For now, just call the sync method
-        # In a real implementation, you would use an async library or run the sync method in a thread pool
-        return self.call(api_kwargs, model_type)
+        # boto3 is synchronous, so the call runs on the I/O pool instead of blocking the event loop
+        return await run_blocking("io", self.call, api_kwargs, model_type)
 
     def convert_inputs_to_api_kwargs(
         self, input: Any = None, model_kwargs: Dict = None, model_type: ModelType = None
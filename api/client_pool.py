@@ -0,0 +1,110 @@
+import json
+import logging
+import threading
+import time
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# How long a model availability check is trusted; missing models are checked again sooner,
+# so a model pulled after a failed request is picked up quickly
+AVAILABLE_TTL_SECONDS = 600
+UNAVAILABLE_TTL_SECONDS = 15
+
+
+def _freeze(kwargs: Dict[str, Any]) -> str:
+    return json.dumps(kwargs, sort_keys=True, default=repr)
+
+
+class ClientPool:
+    """
+    Process-wide pool of model provider clients, one per client class and initialization
+    arguments, so requests reuse the HTTP transports and connection pools of the clients
+    instead of building new ones. Model availability checks are cached as well.
+
+    Pooled clients are shared by concurrent requests and must not hold per-request state.
+    """
+
+    def __init__(self):
+        self._clients: Dict[Tuple[type, str], Any] = {}
+        self._availability: Dict[Hashable, Tuple[bool, float]] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+        self.reused = 0
+        self.availability_checks = 0
+
+    def get(self, client_class: Callable[..., Any], **initialize_kwargs) -> Any:
+        """
+        Return the pooled client of a class, creating it on first use.
+
+        Args:
+            client_class: The model client class, such as OpenAIClient
+            **initialize_kwargs: Arguments the client is created with; part of the pool key
+
+        Returns:
+            The shared client instance
+        """
+        key = (client_class, _freeze(initialize_kwargs))
+        with self._lock:
+            client = self._clients.get(key)
+            if client is not None:
+                self.reused += 1
+                return client
+            # Created under the lock so concurrent first requests build a single client
+            client = client_class(**initialize_kwargs)
+            self._clients[key] = client
+            self.created += 1
+        logger.info(f"Created pooled {getattr(client_class, '__name__', client_class)} client")
+        return client
+
+    def is_model_available(self, key: Hashable, check: Callable[[], bool]) -> bool:
+        """
+        Return whether a model is available, calling check only when no recent result is cached.
+
+        Args:
+            key: Identifies the model, for example ("ollama", host, model_name)
+            check: Performs the actual availability check
+
+        Returns:
+            bool: The cached or fresh result of check
+        """
+        now = time.monotonic()
+        with self._lock:
+            cached = self._availability.get(key)
+        if cached is not None:
+            available, checked_at = cached
+            if now - checked_at < (AVAILABLE_TTL_SECONDS if available else UNAVAILABLE_TTL_SECONDS):
+                return available
+        available = bool(check())
+        with self._lock:
+            self._availability[key] = (available, time.monotonic())
+            self.availability_checks += 1
+        return available
+
+    def clear(self) -> None:
+        with self._lock:
+            self._clients.clear()
+            self._availability.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "clients": len(self._clients),
+                "created": self.created,
+                "reused": self.reused,
+                "availability_checks": self.availability_checks,
+            }
+
+
+client_pool = ClientPool()
+
+
+def get_client(client_class: Callable[..., Any], **initialize_kwargs) -> Any:
+    """Return the process-wide client of a class and initialization arguments."""
+    return client_pool.get(client_class, **initialize_kwargs)
+
+
+def get_client_pool_stats() -> Dict[str, Any]:
+    """Return the number of pooled clients, how often they were reused and how many availability checks ran."""
+    return client_pool.stats()
@@ -11,6 +11,7 @@ from api.openai_client import OpenAIClient
 from api.openrouter_client import OpenRouterClient
 from api.bedrock_client import BedrockClient
 from api.azureai_client import AzureAIClient
+from api.local_embedder_client import LocalEmbedderClient
 from adalflow import GoogleGenAIClient, OllamaClient
 
 # Get API keys from environment variables
@@ -53,7 +54,8 @@ CLIENT_CLASSES = {
     "OpenRouterClient": OpenRouterClient,
     "OllamaClient": OllamaClient,
     "BedrockClient": BedrockClient,
-    "AzureAIClient": AzureAIClient
+    "AzureAIClient": AzureAIClient,
+    "LocalEmbedderClient": LocalEmbedderClient
 }
 
 def replace_env_placeholders(config: Union[Dict[str, Any], List[Any], str, Any]) -> Union[Dict[str, Any], List[Any], str, Any]:
@@ -158,6 +160,23 @@ def get_embedder_config():
     """
     return configs.get("embedder", {})
 
+def get_embedder_signature():
+    """
+    Get a stable string identifying the current embedding model.
+    Two configurations with the same signature produce interchangeable embeddings.
+
+    Returns:
+        str: JSON of the embedder client class and model kwargs, with sorted keys
+    """
+    embedder_config = get_embedder_config()
+    return json.dumps(
+        {
+            "client_class": embedder_config.get("client_class", ""),
+            "model_kwargs": embedder_config.get("model_kwargs", {}),
+        },
+        sort_keys=True,
+    )
+
 def is_ollama_embedder():
     """
     Check if the current embedder configuration uses OllamaClient.
@@ -265,13 +284,13 @@ if generator_config:
 
 # Update embedder configuration
 if embedder_config:
-    for key in ["embedder", "embedder_ollama", "retriever", "text_splitter"]:
+    for key in ["embedder", "embedder_ollama", "retriever", "adaptive_top_k", "vector_store", "retrieval_cache", "lexical_search", "coarse_search", "embedding_throughput", "text_splitter"]:
         if key in embedder_config:
             configs[key] = embedder_config[key]
 
 # Update repository configuration
 if repo_config:
-    for key in ["file_filters", "repository"]:
+    for key in ["file_filters", "repository", "storage", "artifact_store"]:
         if key in repo_config:
             configs[key] = repo_config[key]
 
@@ -0,0 +1,166 @@
+import logging
+import threading
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from adalflow.core.types import Document
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class MergedContext:
+    """Retrieved chunks merged into contiguous spans, with what merging saved."""
+
+    documents: List[Document]
+    chunk_count: int
+    chars_saved: int
+    tokens_saved: int
+
+
+# Shorter suffix/prefix matches only count as overlap when they are whole words
+MIN_UNBOUNDED_OVERLAP = 32
+
+
+def _overlap_length(previous: str, following: str) -> int:
+    """Return the length of the longest suffix of previous that is also a prefix of following."""
+    if not previous or not following:
+        return 0
+    start = max(0, len(previous) - len(following))
+    while True:
+        start = previous.find(following[0], start)
+        if start < 0:
+            return 0
+        overlap = len(previous) - start
+        if following.startswith(previous[start:]):
+            starts_word = start == 0 or previous[start - 1].isspace()
+            ends_word = overlap == len(following) or previous[-1].isspace() or following[overlap].isspace()
+            if overlap >= MIN_UNBOUNDED_OVERLAP or (starts_word and ends_word):
+                return overlap
+        start += 1
+
+
+def _group_key(document: Document) -> Any:
+    return document.parent_doc_id or (document.meta_data or {}).get("file_path")
+
+
+def merge_chunks(
+    documents: Sequence[Document],
+    count_tokens: Optional[Callable[[str], int]] = None,
+) -> MergedContext:
+    """
+    Merge retrieved chunks of the same file that are duplicates, adjacent or overlapping
+    into single spans, so text repeated by the splitter's chunk overlap reaches the prompt once.
+
+    Chunks of a file are adjacent when their chunk orders are consecutive; the text the
+    splitter repeated at the start of the later chunk is found by matching it against the end
+    of the earlier one and dropped. Spans keep the relevance order of their best ranked chunk.
+
+    Args:
+        documents: Retrieved chunks, best first
+        count_tokens: Counts the tokens of a text; defaults to 4 characters per token
+
+    Returns:
+        MergedContext: The spans and the characters and tokens saved
+    """
+    count_tokens = count_tokens or (lambda text: len(text) // 4)
+
+    groups: Dict[Any, List[tuple]] = {}
+    for rank, document in enumerate(documents):
+        groups.setdefault(_group_key(document), []).append((rank, document))
+
+    spans = []
+    removed_texts = []
+    for key, ranked_documents in groups.items():
+        if key is None:
+            spans.extend((rank, [document], document.text or "") for rank, document in ranked_documents)
+            continue
+        ranked_documents.sort(key=lambda item: (item[1].order is None, item[1].order or 0, item[0]))
+        current = None
+        for rank, document in ranked_documents:
+            text = document.text or ""
+            if current is not None:
+                last = current[1][-1]
+                if (document.order is not None and document.order == last.order) or text == (last.text or ""):
+                    # The same chunk retrieved twice
+                    current[0] = min(current[0], rank)
+                    removed_texts.append(text)
+                    continue
+                if document.order is not None and last.order is not None and document.order == last.order + 1:
+                    overlap = _overlap_length(last.text or "", text)
+                    removed_texts.append(text[:overlap])
+                    current[0] = min(current[0], rank)
+                    current[1].append(document)
+                    current[2] += text[overlap:]
+                    continue
+                spans.append(tuple(current))
+            current = [rank, [document], text]
+        if current is not None:
+            spans.append(tuple(current))
+
+    spans.sort(key=lambda span: span[0])
+    merged = []
+    for _, chunks, text in spans:
+        first = chunks[0]
+        if len(chunks) == 1:
+            merged.append(first)
+            continue
+        meta_data = dict(first.meta_data or {})
+        meta_data["merged_chunks"] = [chunk.order for chunk in chunks]
+        merged.append(Document(
+            text=text,
+            meta_data=meta_data,
+            id=first.id,
+            parent_doc_id=first.parent_doc_id,
+            order=first.order,
+        ))
+
+    removed_text = "".join(removed_texts)
+    result = MergedContext(
+        documents=merged,
+        chunk_count=len(documents),
+        chars_saved=len(removed_text),
+        tokens_saved=count_tokens(removed_text) if removed_text else 0,
+    )
+    context_merge_stats.record(result)
+    if result.chars_saved:
+        logger.info(
+            f"Merged {result.chunk_count} chunks into {len(merged)} spans, saving {result.tokens_saved} prompt tokens"
+        )
+    return result
+
+
+class ContextMergeStats:
+    """Totals of retrieved chunks, merged spans and prompt tokens saved by merging."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.merges = 0
+        self.chunks = 0
+        self.spans = 0
+        self.tokens_saved = 0
+
+    def record(self, result: MergedContext) -> None:
+        with self._lock:
+            self.merges += 1
+            self.chunks += result.chunk_count
+            self.spans += len(result.documents)
+            self.tokens_saved += result.tokens_saved
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "merges": self.merges,
+                "chunks": self.chunks,
+                "spans": self.spans,
+                "tokens_saved": self.tokens_saved,
+            }
+
+
+context_merge_stats = ContextMergeStats()
+
+
+def get_context_merge_stats() -> Dict[str, Any]:
+    """Return the totals of the chunks merged before prompt assembly."""
+    return context_merge_stats.stats()
@@ -1,7 +1,8 @@
 import adalflow as adal
 from adalflow.core.types import Document, List
-from adalflow.components.data_process import TextSplitter, ToEmbeddings
+from adalflow.components.data_process import TextSplitter
 import os
+import shutil
 import subprocess
 import json
 import tiktoken
@@ -9,10 +10,28 @@ import logging
 import base64
 import re
 import glob
+import threading
+from contextlib import contextmanager
+from typing import Dict
 from adalflow.utils import get_adalflow_default_root_path
-from adalflow.core.db import LocalDB
-from api.config import configs, DEFAULT_EXCLUDED_DIRS, DEFAULT_EXCLUDED_FILES
+from api.config import configs, get_embedder_config, get_embedder_signature
+from api.file_filters import resolve_file_filters, should_process_file
 from api.ollama_patch import OllamaDocumentProcessor
+from api.embedding_throughput import AdaptiveBatchEmbedder, get_throughput_controller
+from api.index_catalog import IndexCatalog, compute_index_key, get_repo_commit, get_repo_identity
+from api.artifact_store import get_artifact_store
+from api.executors import run_in_pool
+from api.storage_manager import get_storage_manager
+from api.index_store import (
+    ChunkStore,
+    is_index,
+    migrate_pickle_database,
+    open_index,
+    read_index_manifest,
+    remove_pickle_database,
+    write_index,
+)
+from api.index_jobs import report_progress
 from urllib.parse import urlparse, urlunparse, quote
 import requests
 from requests.exceptions import RequestException
@@ -22,6 +41,10 @@ from api.tools.embedder import get_embedder
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Locks serializing the clone and index build of each repository, by checkout path
+_repository_locks: Dict[str, threading.Lock] = {}
+_repository_locks_guard = threading.Lock()
+
 # Maximum token limit for OpenAI embedding models
 MAX_EMBEDDING_TOKENS = 8192
 
@@ -241,132 +264,24 @@ def read_all_documents(
     ]
     doc_extensions = [".md", ".txt", ".rst", ".json", ".yaml", ".yml"]
 
-    # Determine filtering mode: inclusion or exclusion
-    use_inclusion_mode = (included_dirs is not None and len(included_dirs) > 0) or (
-        included_files is not None and len(included_files) > 0
-    )
+    filters = resolve_file_filters(excluded_dirs, excluded_files, included_dirs, included_files)
+    use_inclusion_mode = filters["use_inclusion"]
+    included_dirs = filters["included_dirs"]
+    included_files = filters["included_files"]
+    excluded_dirs = filters["excluded_dirs"]
+    excluded_files = filters["excluded_files"]
 
     if use_inclusion_mode:
-        # Inclusion mode: only process specified directories and files
-        final_included_dirs = set(included_dirs) if included_dirs else set()
-        final_included_files = set(included_files) if included_files else set()
-
         logger.info(f"Using inclusion mode")
-        logger.info(f"Included directories: {list(final_included_dirs)}")
-        logger.info(f"Included files: {list(final_included_files)}")
-
-        # Convert to lists for processing
-        included_dirs = list(final_included_dirs)
-        included_files = list(final_included_files)
-        excluded_dirs = []
-        excluded_files = []
+        logger.info(f"Included directories: {included_dirs}")
+        logger.info(f"Included files: {included_files}")
     else:
-        # Exclusion mode: use default exclusions plus any additional ones
-        final_excluded_dirs = set(DEFAULT_EXCLUDED_DIRS)
-        final_excluded_files = set(DEFAULT_EXCLUDED_FILES)
-
-        # Add any additional excluded directories from config
-        if "file_filters" in configs and "excluded_dirs" in configs["file_filters"]:
-            final_excluded_dirs.update(configs["file_filters"]["excluded_dirs"])
-
-        # Add any additional excluded files from config
-        if "file_filters" in configs and "excluded_files" in configs["file_filters"]:
-            final_excluded_files.update(configs["file_filters"]["excluded_files"])
-
-        # Add any explicitly provided excluded directories and files
-        if excluded_dirs is not None:
-            final_excluded_dirs.update(excluded_dirs)
-
-        if excluded_files is not None:
-            final_excluded_files.update(excluded_files)
-
-        # Convert back to lists for compatibility
-        excluded_dirs = list(final_excluded_dirs)
-        excluded_files = list(final_excluded_files)
-        included_dirs = []
-        included_files = []
-
         logger.info(f"Using exclusion mode")
         logger.info(f"Excluded directories: {excluded_dirs}")
         logger.info(f"Excluded files: {excluded_files}")
 
     logger.info(f"Reading documents from {path}")
 
-    def should_process_file(
-        file_path: str,
-        use_inclusion: bool,
-        included_dirs: List[str],
-        included_files: List[str],
-        excluded_dirs: List[str],
-        excluded_files: List[str],
-    ) -> bool:
-        """
-        Determine if a file should be processed based on inclusion/exclusion rules.
-
-        Args:
-            file_path (str): The file path to check
-            use_inclusion (bool): Whether to use inclusion mode
-            included_dirs (List[str]): List of directories to include
-            included_files (List[str]): List of files to include
-            excluded_dirs (List[str]): List of directories to exclude
-            excluded_files (List[str]): List of files to exclude
-
-        Returns:
-            bool: True if the file should be processed, False otherwise
-        """
-        file_path_parts = os.path.normpath(file_path).split(os.sep)
-        file_name = os.path.basename(file_path)
-
-        if use_inclusion:
-            # Inclusion mode: file must be in included directories or match included files
-            is_included = False
-
-            # Check if file is in an included directory
-            if included_dirs:
-                for included in included_dirs:
-                    clean_included = included.strip("./").rstrip("/")
-                    if clean_included in file_path_parts:
-                        is_included = True
-                        break
-
-            # Check if file matches included file patterns
-            if not is_included and included_files:
-                for included_file in included_files:
-                    if file_name == included_file or file_name.endswith(included_file):
-                        is_included = True
-                        break
-
-            # If no inclusion rules are specified for a category, allow all files from that category
-            if not included_dirs and not included_files:
-                is_included = True
-            elif not included_dirs and included_files:
-                # Only file patterns specified, allow all directories
-                pass  # is_included is already set based on file patterns
-            elif included_dirs and not included_files:
-                # Only directory patterns specified, allow all files in included directories
-                pass  # is_included is already set based on directory patterns
-
-            return is_included
-        else:
-            # Exclusion mode: file must not be in excluded directories or match excluded files
-            is_excluded = False
-
-            # Check if file is in an excluded directory
-            for excluded in excluded_dirs:
-                clean_excluded = excluded.strip("./").rstrip("/")
-                if clean_excluded in file_path_parts:
-                    is_excluded = True
-                    break
-
-            # Check if file matches excluded file patterns
-            if not is_excluded:
-                for excluded_file in excluded_files:
-                    if file_name == excluded_file:
-                        is_excluded = True
-                        break
-
-            return not is_excluded
-
     # Process code files first
     for ext in code_extensions:
         files = glob.glob(f"{path}/**/*{ext}", recursive=True)
@@ -414,6 +329,7 @@ def read_all_documents(
                         },
                     )
                     documents.append(doc)
+                    report_progress("reading", len(documents))
             except Exception as e:
                 logger.error(f"Error reading {file_path}: {e}")
 
@@ -457,6 +373,7 @@ def read_all_documents(
                         },
                     )
                     documents.append(doc)
+                    report_progress("reading", len(documents))
             except Exception as e:
                 logger.error(f"Error reading {file_path}: {e}")
 
@@ -485,15 +402,21 @@ def prepare_data_pipeline(is_ollama_embedder: bool = None):
     splitter = TextSplitter(**configs["text_splitter"])
     embedder_config = get_embedder_config()
 
-    embedder = get_embedder()
-
     if is_ollama_embedder:
         # Use Ollama document processor for single-document processing
-        embedder_transformer = OllamaDocumentProcessor(embedder=embedder)
+        embedder_transformer = OllamaDocumentProcessor(embedder=get_embedder())
     else:
-        # Use batch processing for other embedders
-        batch_size = embedder_config.get("batch_size", 500)
-        embedder_transformer = ToEmbeddings(embedder=embedder, batch_size=batch_size)
+        # Use adaptive batch processing for other embedders
+        throughput_config = dict(configs.get("embedding_throughput", {}))
+        max_retries = throughput_config.pop("max_retries", 6)
+        controller = get_throughput_controller(
+            f"{embedder_config['client_class']}:{embedder_config.get('model_kwargs', {}).get('model', '')}",
+            batch_size=embedder_config.get("batch_size", 500),
+            **throughput_config,
+        )
+        # The client does not retry on its own, so the controller sees every throttled request
+        embedder = get_embedder(ingestion=True)
+        embedder_transformer = AdaptiveBatchEmbedder(embedder=embedder, controller=controller, max_retries=max_retries)
 
     data_transformer = adal.Sequential(
         splitter, embedder_transformer
@@ -501,30 +424,32 @@ def prepare_data_pipeline(is_ollama_embedder: bool = None):
     return data_transformer
 
 
-def transform_documents_and_save_to_db(
-    documents: List[Document], db_path: str, is_ollama_embedder: bool = None
-) -> LocalDB:
+def transform_documents_and_save_to_index(
+    documents: List[Document], index_dir: str, is_ollama_embedder: bool = None
+) -> ChunkStore:
     """
-    Transforms a list of documents and saves them to a local database.
-    将documents进行转换（切分、向量化）并保存到本地数据库。
+    Transforms a list of documents and saves them to an index directory.
+    将documents进行转换（切分、向量化）并保存到本地索引目录。
 
     Args:
         documents (list): A list of `Document` objects.
-        db_path (str): The path to the local database file.
+        index_dir (str): The path to the index directory.
         is_ollama_embedder (bool, optional): Whether to use Ollama for embedding.
                                            If None, will be determined from configuration.
+
+    Returns:
+        ChunkStore: The saved chunks, opened from the index directory
     """
     # Get the data transformer
     data_transformer = prepare_data_pipeline(is_ollama_embedder)
 
-    # Save the documents to a local database
-    db = LocalDB()
-    db.register_transformer(transformer=data_transformer, key="split_and_embed")
-    db.load(documents)
-    db.transform(key="split_and_embed")
-    os.makedirs(os.path.dirname(db_path), exist_ok=True)
-    db.save_state(filepath=db_path)
-    return db
+    # Split and embed the documents, then save them to the index directory
+    report_progress("splitting", total=len(documents))
+    transformed_docs = data_transformer(documents)
+    report_progress("writing", total=len(transformed_docs))
+    os.makedirs(os.path.dirname(index_dir), exist_ok=True)
+    write_index(transformed_docs, index_dir, configs.get("vector_store", {}), embedder=get_embedder_signature())
+    return open_index(index_dir)
 
 
 def get_github_file_content(
@@ -796,15 +721,28 @@ def get_file_content(
         )
 
 
+@contextmanager
+def _repository_lock(save_repo_dir: str):
+    """Hold the lock of a repository while it is cloned and indexed."""
+    with _repository_locks_guard:
+        lock = _repository_locks.setdefault(os.path.abspath(save_repo_dir), threading.Lock())
+    with lock:
+        yield
+
+
 class DatabaseManager:
     """
-    Manages the creation, loading, transformation, and persistence of LocalDB instances.
+    Manages the creation, loading, transformation, and persistence of repository indexes.
     """
 
     def __init__(self):
         self.db = None
         self.repo_url_or_path = None
         self.repo_paths = None
+        self.repo_name = None
+        self.repo_identity = None
+        self.index_key = None
+        self.pending_download = None
 
     def prepare_database(
         self,
@@ -812,11 +750,7 @@ class DatabaseManager:
         type: str = "github",
         access_token: str = None,
         is_ollama_embedder: bool = None,
-        excluded_dirs: List[str] = None,
-        excluded_files: List[str] = None,
-        included_dirs: List[str] = None,
-        included_files: List[str] = None,
-    ) -> List[Document]:
+    ) -> ChunkStore:
         """
         Create a new database from the repository.
 
@@ -825,23 +759,13 @@ class DatabaseManager:
             access_token (str, optional): Access token for private repositories
             is_ollama_embedder (bool, optional): Whether to use Ollama for embedding.
                                                If None, will be determined from configuration.
-            excluded_dirs (List[str], optional): List of directories to exclude from processing
-            excluded_files (List[str], optional): List of file patterns to exclude from processing
-            included_dirs (List[str], optional): List of directories to include exclusively
-            included_files (List[str], optional): List of file patterns to include exclusively
 
         Returns:
-            List[Document]: List of Document objects
+            ChunkStore: The indexed chunks, loaded lazily
         """
         self.reset_database()
         self._create_repo(repo_url_or_path, type, access_token)
-        return self.prepare_db_index(
-            is_ollama_embedder=is_ollama_embedder,
-            excluded_dirs=excluded_dirs,
-            excluded_files=excluded_files,
-            included_dirs=included_dirs,
-            included_files=included_files,
-        )
+        return self.prepare_db_index(is_ollama_embedder=is_ollama_embedder)
 
     def reset_database(self):
         """
@@ -850,6 +774,10 @@ class DatabaseManager:
         self.db = None
         self.repo_url_or_path = None
         self.repo_paths = None
+        self.repo_name = None
+        self.repo_identity = None
+        self.index_key = None
+        self.pending_download = None
 
     def _extract_repo_name_from_url(self, repo_url_or_path: str, repo_type: str) -> str:
         # Extract owner and repo name to create unique identifier
@@ -870,10 +798,12 @@ class DatabaseManager:
         self, repo_url_or_path: str, repo_type: str = "github", access_token: str = None
     ) -> None:
         """
-        Download and prepare all paths.
+        Prepare all paths. A remote repository that is not checked out yet is only cloned
+        when its index has to be built, see prepare_db_index.
         Paths:
         ~/.adalflow/repos/{owner}_{repo_name} (for url, local path will be the same)
-        ~/.adalflow/databases/{owner}_{repo_name}.pkl
+        ~/.adalflow/databases/{owner}_{repo_name}-{index_key}.index/ (set by prepare_db_index)
+        ~/.adalflow/databases/{owner}_{repo_name}.pkl (legacy LocalDB, migrated on first load)
 
         Args:
             repo_url_or_path (str): The URL or local path of the repository
@@ -885,6 +815,7 @@ class DatabaseManager:
             root_path = get_adalflow_default_root_path()
 
             os.makedirs(root_path, exist_ok=True)
+            self.pending_download = None
             # url
             if repo_url_or_path.startswith("https://") or repo_url_or_path.startswith(
                 "http://"
@@ -900,10 +831,8 @@ class DatabaseManager:
 
                 # Check if the repository directory already exists and is not empty
                 if not (os.path.exists(save_repo_dir) and os.listdir(save_repo_dir)):
-                    # Only download if the repository doesn't exist or is empty
-                    download_repo(
-                        repo_url_or_path, save_repo_dir, repo_type, access_token
-                    )
+                    # Only download if the repository doesn't exist or is empty, and its index is needed
+                    self.pending_download = (repo_url_or_path, save_repo_dir, repo_type, access_token)
                 else:
                     logger.info(
                         f"Repository already exists at {save_repo_dir}. Using existing repository."
@@ -913,7 +842,6 @@ class DatabaseManager:
                 save_repo_dir = repo_url_or_path
 
             save_db_file = os.path.join(root_path, "databases", f"{repo_name}.pkl")
-            os.makedirs(save_repo_dir, exist_ok=True)
             os.makedirs(os.path.dirname(save_db_file), exist_ok=True)
 
             self.repo_paths = {
@@ -921,71 +849,283 @@ class DatabaseManager:
                 "save_db_file": save_db_file,
             }
             self.repo_url_or_path = repo_url_or_path
+            self.repo_name = repo_name
+            self.repo_identity = get_repo_identity(repo_url_or_path, repo_type)
             logger.info(f"Repo paths: {self.repo_paths}")
 
         except Exception as e:
             logger.error(f"Failed to create repository structure: {e}")
             raise
 
-    def prepare_db_index(
-        self,
-        is_ollama_embedder: bool = None,
-        excluded_dirs: List[str] = None,
-        excluded_files: List[str] = None,
-        included_dirs: List[str] = None,
-        included_files: List[str] = None,
-    ) -> List[Document]:
+    def _set_index_key(self, commit: str = None) -> dict:
+        """
+        Address the index by everything its content depends on, and set its paths.
+
+        Args:
+            commit (str, optional): The repository commit being indexed
+
+        Returns:
+            dict: The catalog entry describing the index
+        """
+        file_filters = resolve_file_filters()
+        embedder_signature = get_embedder_signature()
+        self.index_key = compute_index_key(
+            self.repo_identity, commit, file_filters, configs["text_splitter"], embedder_signature
+        )
+        databases_dir = os.path.dirname(self.repo_paths["save_db_file"])
+        index_dir = os.path.join(databases_dir, f"{self.repo_name}-{self.index_key}.index")
+        self.repo_paths["save_index_dir"] = index_dir
+        self.repo_paths["save_vectors_dir"] = os.path.join(index_dir, "vectors")
+        logger.info(f"Index key {self.index_key} (commit {commit})")
+        return {
+            "repo": self.repo_identity,
+            "repo_url_or_path": self.repo_url_or_path,
+            "commit": commit,
+            "file_filters": file_filters,
+            "text_splitter": configs["text_splitter"],
+            "embedder": embedder_signature,
+            "path": os.path.basename(index_dir),
+        }
+
+    def _pull_published_index(self, artifact_store, catalog: IndexCatalog, catalog_entry: dict) -> bool:
+        """
+        Pull the index of the current key from the artifact store and open it.
+
+        Returns:
+            bool: Whether self.db now holds the published index
+        """
+        if artifact_store is None:
+            return False
+        index_dir = self.repo_paths["save_index_dir"]
+        try:
+            artifact = artifact_store.pull(self.index_key, index_dir)
+            if artifact is None:
+                return False
+            self.db = open_index(index_dir)
+        except Exception as e:
+            logger.error(f"Error pulling published index {self.index_key}: {e}")
+            return False
+        logger.info(f"Loaded {len(self.db)} documents from published index {self.index_key}")
+        catalog.register(self.index_key, dict(catalog_entry, count=len(self.db)))
+        storage_manager = get_storage_manager()
+        storage_manager.touch(index_dir)
+        storage_manager.enforce_quota(protect=[self.repo_paths["save_repo_dir"], index_dir])
+        return True
+
+    def _adopt_legacy_database(self, index_dir: str, vector_store_config: dict) -> None:
+        """
+        Adopt a database from an earlier version as the index of the current key: a pickled
+        LocalDB, or an index migrated from one by `python -m api.index_store`. Neither records
+        what it was built from, so it is adopted only when its embeddings fit the current
+        embedder and its chunks come from this checkout (see _is_adoptable); otherwise the
+        index is rebuilt and the legacy database is left in place.
+        """
+        databases_dir = os.path.dirname(self.repo_paths["save_db_file"])
+        legacy_index_dir = os.path.join(databases_dir, f"{self.repo_name}.index")
+        pickle_path = self.repo_paths["save_db_file"]
+        if is_index(legacy_index_dir):
+            if self._is_adoptable(legacy_index_dir):
+                logger.info(f"Adopting migrated database {legacy_index_dir}")
+                os.replace(legacy_index_dir, index_dir)
+            return
+        if not os.path.exists(pickle_path):
+            return
+
+        logger.info("Migrating existing pickled database...")
+        staging_dir = f"{index_dir}.legacy"
+        try:
+            migrate_pickle_database(pickle_path, staging_dir, vector_store_config, remove_source=False)
+            if not self._is_adoptable(staging_dir):
+                return
+            os.replace(staging_dir, index_dir)
+            store = open_index(index_dir)
+            loaded = len(store) > 0
+            store.close()
+            # The pickle may be the only copy of the embeddings: it is removed once its index loads
+            if loaded:
+                remove_pickle_database(pickle_path)
+        except Exception as e:
+            logger.error(f"Error migrating existing database: {e}")
+        finally:
+            shutil.rmtree(staging_dir, ignore_errors=True)
+
+    def _is_adoptable(self, legacy_index_dir: str) -> bool:
+        """
+        Whether a legacy index was embedded like the current configuration embeds, and indexes
+        this repository: legacy databases are named after the repository alone, so unrelated
+        repositories sharing a name would otherwise adopt each other's index.
+        """
+        manifest = read_index_manifest(legacy_index_dir) or {}
+        embedder = manifest.get("embedder")
+        if embedder is not None and embedder != get_embedder_signature():
+            logger.warning(f"Not adopting {legacy_index_dir}: it was built with another embedder")
+            return False
+        dimensions = self._embedder_dimensions()
+        if dimensions is None or manifest.get("dimensions") != dimensions:
+            logger.warning(
+                f"Not adopting {legacy_index_dir}: its {manifest.get('dimensions')}-dimensional embeddings "
+                f"do not match the current embedder ({dimensions})"
+            )
+            return False
+
+        store = open_index(legacy_index_dir)
+        file_paths = [file_path for file_path in store.file_paths() if file_path]
+        store.close()
+        sample = file_paths[::max(1, len(file_paths) // 50)]
+        found = sum(os.path.exists(os.path.join(self.repo_paths["save_repo_dir"], file_path)) for file_path in sample)
+        # Files may have moved since the legacy index was built, so a majority is enough
+        if not sample or found * 2 < len(sample):
+            logger.warning(
+                f"Not adopting {legacy_index_dir}: only {found}/{len(sample)} of its sampled files exist in "
+                f"{self.repo_paths['save_repo_dir']}"
+            )
+            return False
+        return True
+
+    def _embedder_dimensions(self):
+        """Return the embedding size of the current embedder, from its configuration or one probe embedding."""
+        dimensions = get_embedder_config().get("model_kwargs", {}).get("dimensions")
+        if dimensions:
+            return int(dimensions)
+        try:
+            output = get_embedder()(input="dimensions")
+            return len(output.data[0].embedding)
+        except Exception as e:
+            logger.error(f"Error probing the embedding size: {e}")
+            return None
+
+    def prepare_db_index(self, is_ollama_embedder: bool = None) -> ChunkStore:
         """
         Prepare the indexed database for the repository.
         创建该仓库的向量数据库,然后对仓库的文件进行向量化并存储
 
+        One index is built per repository commit with the default file filters; request
+        specific filters are applied at search time (see api.file_filters.file_filter_mask).
+
         Args:
             is_ollama_embedder (bool, optional): Whether to use Ollama for embedding.
                                                If None, will be determined from configuration.
-            excluded_dirs (List[str], optional): List of directories to exclude from processing
-            excluded_files (List[str], optional): List of file patterns to exclude from processing
-            included_dirs (List[str], optional): List of directories to include exclusively
-            included_files (List[str], optional): List of file patterns to include exclusively
 
         Returns:
-            List[Document]: List of Document objects
+            ChunkStore: The indexed chunks, loaded lazily
         """
-        # check the database
-        if self.repo_paths and os.path.exists(self.repo_paths["save_db_file"]):
-            logger.info("Loading existing database...")
-            try:
-                self.db = LocalDB.load_state(self.repo_paths["save_db_file"])
-                documents = self.db.get_transformed_data(key="split_and_embed")
-                if documents:
-                    logger.info(
-                        f"Loaded {len(documents)} documents from existing database"
-                    )
-                    return documents
-            except Exception as e:
-                logger.error(f"Error loading existing database: {e}")
-                # Continue to create a new database
+        databases_dir = os.path.dirname(self.repo_paths["save_db_file"])
+        catalog = IndexCatalog(databases_dir)
+
+        if self.pending_download is None:
+            commit = get_repo_commit(self.repo_paths["save_repo_dir"])
+        else:
+            # Without a checkout, reuse the most recently used index built with the same settings
+            settings = self._set_index_key(None)
+            commit = next(
+                (
+                    entry.get("commit")
+                    for entry in catalog.find(self.repo_identity)
+                    if all(entry.get(field) == settings[field] for field in ("file_filters", "text_splitter", "embedder"))
+                ),
+                None,
+            )
+        catalog_entry = self._set_index_key(commit)
+        if self._load_existing_index(catalog, catalog_entry):
+            return self.db
+
+        # Concurrent first requests for a repository wait for one clone and build instead of
+        # writing to the same checkout and index directories
+        with _repository_lock(self.repo_paths["save_repo_dir"]):
+            if self._load_existing_index(catalog, catalog_entry):
+                return self.db
+            # Adopting, pulling, cloning and embedding run on the bounded "index" pool, so requests
+            # for indexes that already exist never queue behind a build
+            return run_in_pool("index", self._build_db_index, catalog, catalog_entry, is_ollama_embedder)
+
+    def _load_existing_index(self, catalog: IndexCatalog, catalog_entry: dict) -> bool:
+        """
+        Open the index of the current key if it exists on disk.
+
+        Returns:
+            bool: Whether self.db now holds the index
+        """
+        index_dir = self.repo_paths["save_index_dir"]
+        if not is_index(index_dir):
+            return False
+        logger.info("Loading existing database...")
+        try:
+            self.db = open_index(index_dir)
+            if len(self.db):
+                logger.info(f"Loaded {len(self.db)} documents from existing database")
+                if catalog.get(self.index_key) is None:
+                    catalog.register(self.index_key, dict(catalog_entry, count=len(self.db)))
+                else:
+                    catalog.touch(self.index_key)
+                get_storage_manager().touch(index_dir)
+                return True
+        except Exception as e:
+            logger.error(f"Error loading existing database: {e}")
+            # Continue to create a new database
+        return False
+
+    def _build_db_index(self, catalog: IndexCatalog, catalog_entry: dict, is_ollama_embedder: bool = None) -> ChunkStore:
+        """
+        Provide the index of the current key when none could be opened: adopt a database of an
+        earlier version, pull the index published by another node, or clone the repository
+        and build it.
+
+        Returns:
+            ChunkStore: The indexed chunks, loaded lazily
+        """
+        vector_store_config = configs.get("vector_store", {})
+        storage_manager = get_storage_manager()
+        index_dir = self.repo_paths["save_index_dir"]
+        if not is_index(index_dir):
+            self._adopt_legacy_database(index_dir, vector_store_config)
+            if self._load_existing_index(catalog, catalog_entry):
+                return self.db
+
+        # Another node may have built this index already
+        artifact_store = get_artifact_store()
+        if self._pull_published_index(artifact_store, catalog, catalog_entry):
+            return self.db
+
+        if self.pending_download is not None:
+            report_progress("cloning")
+            download_repo(*self.pending_download)
+            self.pending_download = None
+            catalog_entry = self._set_index_key(get_repo_commit(self.repo_paths["save_repo_dir"]))
+            index_dir = self.repo_paths["save_index_dir"]
+            # The checkout may come from a request that has built its index since
+            if self._load_existing_index(catalog, catalog_entry):
+                return self.db
+            if self._pull_published_index(artifact_store, catalog, catalog_entry):
+                return self.db
 
         # prepare the database
         logger.info("Creating new database...")
+        storage_manager.touch(self.repo_paths["save_repo_dir"])
         # 从本地仓库目录，读取文件的内容
+        report_progress("reading")
         documents = read_all_documents(
             self.repo_paths["save_repo_dir"],
             is_ollama_embedder=is_ollama_embedder,
-            excluded_dirs=excluded_dirs,
-            excluded_files=excluded_files,
-            included_dirs=included_dirs,
-            included_files=included_files,
         )
         # 把文件进行转换(切分和向量化)
-        self.db = transform_documents_and_save_to_db(
+        self.db = transform_documents_and_save_to_index(
             documents,
-            self.repo_paths["save_db_file"],
+            index_dir,
             is_ollama_embedder=is_ollama_embedder,
         )
+        catalog.register(self.index_key, dict(catalog_entry, count=len(self.db)))
         logger.info(f"Total documents: {len(documents)}")
-        transformed_docs = self.db.get_transformed_data(key="split_and_embed")
-        logger.info(f"Total transformed documents: {len(transformed_docs)}")
-        return transformed_docs
+        logger.info(f"Total transformed documents: {len(self.db)}")
+        if artifact_store is not None:
+            try:
+                artifact_store.publish(self.index_key, index_dir, dict(catalog_entry, count=len(self.db)))
+            except Exception as e:
+                logger.error(f"Error publishing index {self.index_key}: {e}")
+
+        # Keep the storage root under its quota, without touching what this request uses
+        storage_manager.touch(self.repo_paths["save_repo_dir"], index_dir)
+        storage_manager.enforce_quota(protect=[self.repo_paths["save_repo_dir"], index_dir])
+        return self.db
 
     def prepare_retriever(
         self, repo_url_or_path: str, type: str = "github", access_token: str = None
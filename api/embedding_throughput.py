@@ -0,0 +1,359 @@
+import logging
+import random
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from copy import deepcopy
+from email.utils import parsedate_to_datetime
+from typing import Any, Deque, Dict, List, Optional, Sequence, Tuple
+
+import adalflow as adal
+from adalflow.core.component import DataComponent
+from adalflow.core.types import Document, ModelType
+from tqdm import tqdm
+
+from api.index_jobs import report_progress
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Status codes that signal a transient condition worth retrying
+RETRYABLE_STATUS_CODES = {408, 409, 429}
+
+
+def get_status_code(error: BaseException) -> Optional[int]:
+    """Return the HTTP status code carried by a provider exception, if any."""
+    status_code = getattr(error, "status_code", None)
+    if status_code is None:
+        status_code = getattr(getattr(error, "response", None), "status_code", None)
+    return status_code if isinstance(status_code, int) else None
+
+
+def get_retry_after(error: BaseException) -> Optional[float]:
+    """
+    Return the delay in seconds requested by the provider through the Retry-After
+    (seconds or HTTP date) or retry-after-ms headers, if any.
+    """
+    headers = getattr(getattr(error, "response", None), "headers", None)
+    if not headers:
+        return None
+    try:
+        if headers.get("retry-after-ms"):
+            return max(0.0, float(headers["retry-after-ms"]) / 1000)
+        retry_after = headers.get("retry-after")
+        if not retry_after:
+            return None
+        try:
+            return max(0.0, float(retry_after))
+        except ValueError:
+            return max(0.0, parsedate_to_datetime(retry_after).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def is_retryable_error(error: BaseException) -> bool:
+    """
+    Whether an embedding call failed for a transient reason: throttling (429), a server
+    error (5xx), a timeout or a dropped connection. Client errors such as 400 are not retried.
+    """
+    status_code = get_status_code(error)
+    if status_code is not None:
+        return status_code in RETRYABLE_STATUS_CODES or status_code >= 500
+    name = type(error).__name__
+    return "Timeout" in name or "Connection" in name
+
+
+class AIMDController:
+    """
+    Additive-increase / multiplicative-decrease controller for embedding requests.
+
+    While requests complete under the target latency, the batch size grows by
+    ``batch_step`` per round of requests and the concurrency by one. A 429, 5xx or
+    timeout multiplies both by ``decrease_factor`` and pauses new requests for the
+    provider's Retry-After, or an exponential backoff with jitter when none is given.
+    A slow but successful request only reduces the concurrency. Each request can cause
+    at most one decrease, and only if it started after the previous decrease, so one
+    congestion event is not counted once per in-flight request.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        batch_size: int = 10,
+        min_batch_size: int = 1,
+        max_batch_size: Optional[int] = None,
+        concurrency: int = 1,
+        max_concurrency: int = 4,
+        target_latency: float = 5.0,
+        batch_step: Optional[int] = None,
+        decrease_factor: float = 0.5,
+        base_backoff: float = 1.0,
+        max_backoff: float = 60.0,
+    ):
+        """
+        Args:
+            name: Label under which the controller's metrics are reported
+            batch_size: Initial number of texts per request
+            min_batch_size: Lower bound of the batch size
+            max_batch_size: Upper bound of the batch size, defaults to batch_size (provider limits vary)
+            concurrency: Initial number of requests in flight
+            max_concurrency: Upper bound of the requests in flight
+            target_latency: Request latency in seconds above which the provider is considered saturated
+            batch_step: Batch size increase per round, defaults to a quarter of the initial batch size
+            decrease_factor: Multiplier applied to the limits on throttling or server errors
+            base_backoff: First backoff delay in seconds when no Retry-After is given
+            max_backoff: Maximum backoff delay in seconds
+        """
+        self.name = name
+        self.min_batch_size = max(1, min_batch_size)
+        self.max_batch_size = max(self.min_batch_size, max_batch_size or batch_size)
+        self.max_concurrency = max(1, max_concurrency)
+        self.target_latency = target_latency
+        self.batch_step = batch_step or max(1, batch_size // 4)
+        self.decrease_factor = decrease_factor
+        self.base_backoff = base_backoff
+        self.max_backoff = max_backoff
+
+        self._batch_size = float(min(max(batch_size, self.min_batch_size), self.max_batch_size))
+        self._concurrency = float(min(max(concurrency, 1), self.max_concurrency))
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self._resume_at = 0.0
+        self._last_decrease = 0.0
+        self._consecutive_failures = 0
+        self._latency: Optional[float] = None
+        self._completed: Deque[Tuple[float, int]] = deque()
+        self.requests = 0
+        self.throttled = 0
+        self.server_errors = 0
+        self.failed = 0
+        self.items = 0
+
+    @property
+    def batch_size(self) -> int:
+        return int(self._batch_size)
+
+    @property
+    def concurrency(self) -> int:
+        return int(self._concurrency)
+
+    def delay(self) -> float:
+        """Seconds until new requests may be sent again."""
+        return max(0.0, self._resume_at - time.monotonic())
+
+    def try_acquire(self) -> Optional[float]:
+        """
+        Reserve a request slot without blocking.
+
+        Returns:
+            Optional[float]: The start time to pass back to record_success/record_failure, or
+            None if the concurrency limit is reached or the controller is backing off
+        """
+        with self._lock:
+            if self.delay() > 0 or self._in_flight >= self.concurrency:
+                return None
+            self._in_flight += 1
+            return time.monotonic()
+
+    def record_success(self, started_at: float, items: int) -> None:
+        """Release the slot of a successful request and adapt the limits to its latency."""
+        now = time.monotonic()
+        latency = now - started_at
+        with self._lock:
+            self._in_flight -= 1
+            self.requests += 1
+            self.items += items
+            self._consecutive_failures = 0
+            self._latency = latency if self._latency is None else 0.8 * self._latency + 0.2 * latency
+            self._completed.append((now, items))
+
+            if latency > self.target_latency:
+                if started_at >= self._last_decrease:
+                    self._concurrency = max(1.0, self._concurrency * self.decrease_factor)
+                    self._last_decrease = now
+                    logger.info(f"[{self.name}] latency {latency:.2f}s above target, concurrency -> {self.concurrency}")
+            else:
+                # Spread one step over the requests of a round, as in TCP congestion avoidance
+                self._concurrency = min(float(self.max_concurrency), self._concurrency + 1.0 / self._concurrency)
+                self._batch_size = min(float(self.max_batch_size), self._batch_size + self.batch_step / self._concurrency)
+
+    def record_failure(self, started_at: float, error: BaseException) -> None:
+        """Release the slot of a failed request and back off if the failure was transient."""
+        now = time.monotonic()
+        with self._lock:
+            self._in_flight -= 1
+            if not is_retryable_error(error):
+                self.failed += 1
+                return
+
+            status_code = get_status_code(error)
+            if status_code == 429:
+                self.throttled += 1
+            else:
+                self.server_errors += 1
+            self._consecutive_failures += 1
+
+            if started_at >= self._last_decrease:
+                self._batch_size = max(float(self.min_batch_size), self._batch_size * self.decrease_factor)
+                self._concurrency = max(1.0, self._concurrency * self.decrease_factor)
+                self._last_decrease = now
+
+            retry_after = get_retry_after(error)
+            if retry_after is None:
+                retry_after = min(self.max_backoff, self.base_backoff * 2 ** (self._consecutive_failures - 1))
+                retry_after *= random.uniform(0.5, 1.0)
+            self._resume_at = max(self._resume_at, now + retry_after)
+            logger.warning(
+                f"[{self.name}] {type(error).__name__} (status {status_code}), pausing {retry_after:.1f}s; "
+                f"batch_size -> {self.batch_size}, concurrency -> {self.concurrency}"
+            )
+
+    def items_per_second(self, window: float = 30.0) -> float:
+        """Embedding throughput over the last window seconds."""
+        with self._lock:
+            cutoff = time.monotonic() - window
+            while self._completed and self._completed[0][0] < cutoff:
+                self._completed.popleft()
+            return round(sum(items for _, items in self._completed) / window, 2)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return the current limits, rate and error counters."""
+        items_per_second = self.items_per_second()
+        with self._lock:
+            return {
+                "batch_size": self.batch_size,
+                "max_batch_size": self.max_batch_size,
+                "concurrency": self.concurrency,
+                "max_concurrency": self.max_concurrency,
+                "in_flight": self._in_flight,
+                "items_per_second": items_per_second,
+                "latency_seconds": round(self._latency, 3) if self._latency is not None else None,
+                "backoff_seconds": round(self.delay(), 2),
+                "requests": self.requests,
+                "items": self.items,
+                "throttled": self.throttled,
+                "server_errors": self.server_errors,
+                "failed": self.failed,
+            }
+
+
+_controllers: Dict[str, AIMDController] = {}
+_controllers_lock = threading.Lock()
+
+
+def get_throughput_controller(name: str, **kwargs) -> AIMDController:
+    """
+    Return the process-wide controller for an embedding provider, creating it on first use,
+    so limits learned during one ingestion carry over to the next.
+    """
+    with _controllers_lock:
+        if name not in _controllers:
+            _controllers[name] = AIMDController(name, **kwargs)
+        return _controllers[name]
+
+
+def get_throughput_stats() -> Dict[str, Dict[str, Any]]:
+    """Return the metrics of every embedding throughput controller."""
+    with _controllers_lock:
+        controllers = list(_controllers.values())
+    return {controller.name: controller.stats() for controller in controllers}
+
+
+class AdaptiveBatchEmbedder(DataComponent):
+    """
+    Embed documents in batches whose size and concurrency are driven by an AIMDController.
+    Drop-in replacement for adalflow's ToEmbeddings. Transient failures are retried with
+    the batch re-split to the current batch size; documents whose batch fails permanently
+    are left without a vector and are filtered out when the retriever is prepared.
+    """
+
+    def __init__(self, embedder: adal.Embedder, controller: AIMDController, max_retries: int = 6) -> None:
+        super().__init__()
+        self.embedder = embedder
+        self.controller = controller
+        self.max_retries = max_retries
+
+    def _embed_batch(self, texts: List[str]) -> List[Any]:
+        """
+        Embed one batch with the model client directly, so provider exceptions reach the controller.
+        Clients with an embed_once() method send a single request through it, bypassing the
+        retries that decorate their call().
+        """
+        model_client = self.embedder.model_client
+        api_kwargs = model_client.convert_inputs_to_api_kwargs(
+            input=texts, model_kwargs=self.embedder.model_kwargs, model_type=ModelType.EMBEDDER
+        )
+        embed_once = getattr(model_client, "embed_once", None)
+        if callable(embed_once):
+            response = embed_once(api_kwargs)
+        else:
+            response = model_client.call(api_kwargs=api_kwargs, model_type=ModelType.EMBEDDER)
+        output = model_client.parse_embedding_response(response)
+        if output.error:
+            raise ValueError(f"Error parsing embedding response: {output.error}")
+        if len(output.data) != len(texts):
+            raise ValueError(f"Expected {len(texts)} embeddings, got {len(output.data)}")
+        return [embedding.embedding for embedding in output.data]
+
+    def __call__(self, documents: Sequence[Document]) -> Sequence[Document]:
+        output = deepcopy(documents)
+        texts = [doc.text for doc in output]
+        next_start = 0
+        retries: Deque[Tuple[int, int, int]] = deque()
+        in_flight: Dict[Any, Tuple[int, int, int, float]] = {}
+        progress = tqdm(total=len(texts), desc="Embedding documents")
+        embedded = 0
+        report_progress("embedding", embedded, len(texts))
+
+        with ThreadPoolExecutor(max_workers=self.controller.max_concurrency) as executor:
+            while next_start < len(texts) or retries or in_flight:
+                # Send as many batches as the controller currently allows
+                while next_start < len(texts) or retries:
+                    started_at = self.controller.try_acquire()
+                    if started_at is None:
+                        break
+                    batch_size = self.controller.batch_size
+                    if retries:
+                        start, end, attempt = retries.popleft()
+                        if end - start > batch_size:
+                            retries.appendleft((start + batch_size, end, attempt))
+                            end = start + batch_size
+                    else:
+                        start, end, attempt = next_start, min(len(texts), next_start + batch_size), 0
+                        next_start = end
+                    future = executor.submit(self._embed_batch, texts[start:end])
+                    in_flight[future] = (start, end, attempt, started_at)
+
+                if not in_flight:
+                    time.sleep(min(max(self.controller.delay(), 0.01), 1.0))
+                    continue
+
+                done, _ = wait(list(in_flight), timeout=1.0, return_when=FIRST_COMPLETED)
+                for future in done:
+                    start, end, attempt, started_at = in_flight.pop(future)
+                    try:
+                        embeddings = future.result()
+                    except Exception as e:
+                        self.controller.record_failure(started_at, e)
+                        if is_retryable_error(e) and attempt < self.max_retries:
+                            retries.append((start, end, attempt + 1))
+                        else:
+                            logger.error(f"Failed to embed documents {start}-{end - 1}: {e}, skipping")
+                            progress.update(end - start)
+                            embedded += end - start
+                            report_progress("embedding", embedded)
+                        continue
+                    self.controller.record_success(started_at, end - start)
+                    for i, embedding in enumerate(embeddings):
+                        output[start + i].vector = embedding
+                    progress.update(end - start)
+                    embedded += end - start
+                    report_progress("embedding", embedded)
+
+        progress.close()
+        logger.info(f"Embedded {len(texts)} documents: {self.controller.stats()}")
+        return output
+
+    def _extra_repr(self) -> str:
+        return f"controller={self.controller.name}, batch_size={self.controller.batch_size}, concurrency={self.controller.concurrency}"
@@ -0,0 +1,164 @@
+import asyncio
+import contextvars
+import functools
+import logging
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, AsyncIterator, Callable, Dict, Iterable, TypeVar
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+T = TypeVar("T")
+
+# Kinds of blocking work, each with its own pool so one kind cannot starve another:
+#   io     network calls: retrieval with its query embedding, file content fetches, synchronous model streams
+#   cpu    token counting and prompt assembly
+#   index  cloning, embedding and loading repository indexes, which can take minutes; requests
+#          wait for it from "io" (see run_in_pool), so indexes already loaded never queue behind a build
+#   build  indexing jobs submitted with POST /index, kept apart so they never delay index loads
+EXECUTOR_WORKERS = {
+    "io": int(os.environ.get("DEEPWIKI_IO_WORKERS", 32)),
+    "cpu": int(os.environ.get("DEEPWIKI_CPU_WORKERS", os.cpu_count() or 4)),
+    "index": int(os.environ.get("DEEPWIKI_INDEX_WORKERS", 2)),
+    "build": int(os.environ.get("DEEPWIKI_INDEX_JOB_WORKERS", 2)),
+}
+
+# Pools whose tasks do work of another kind themselves instead of waiting for its pool:
+# indexing jobs already have a bounded pool of their own
+INLINE_KINDS = {"index": ("index", "build")}
+
+_SENTINEL = object()
+
+
+class _TrackedExecutor:
+    """A thread pool that counts its running and waiting tasks."""
+
+    def __init__(self, kind: str, max_workers: int):
+        self.kind = kind
+        self.max_workers = max_workers
+        self.pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"deepwiki-{kind}")
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.running = 0
+
+    def _run(self, func: Callable[[], T]) -> T:
+        with self._lock:
+            self.running += 1
+        try:
+            return func()
+        finally:
+            with self._lock:
+                self.running -= 1
+                self.completed += 1
+
+    def submit(self, func: Callable[[], T]) -> "asyncio.Future[T]":
+        return asyncio.wrap_future(self.submit_background(func))
+
+    def submit_background(self, func: Callable[[], T]) -> "Future[T]":
+        with self._lock:
+            self.submitted += 1
+        return self.pool.submit(self._run, func)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "max_workers": self.max_workers,
+                "running": self.running,
+                "queued": self.submitted - self.completed - self.running,
+                "completed": self.completed,
+            }
+
+
+_executors: Dict[str, _TrackedExecutor] = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(kind: str) -> _TrackedExecutor:
+    """Return the pool for a kind of work ("io", "cpu", "index" or "build"), created on first use."""
+    if kind not in EXECUTOR_WORKERS:
+        raise ValueError(f"Unknown executor {kind!r}, expected one of {list(EXECUTOR_WORKERS)}")
+    with _executors_lock:
+        executor = _executors.get(kind)
+        if executor is None:
+            executor = _executors[kind] = _TrackedExecutor(kind, max(1, EXECUTOR_WORKERS[kind]))
+        return executor
+
+
+async def run_blocking(kind: str, func: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Run a blocking function on the pool for its kind of work and await its result, so the
+    event loop keeps serving other requests (and streaming their tokens) meanwhile.
+
+    Args:
+        kind: "io", "cpu", "index" or "build"
+        func: The blocking function
+        *args: Positional arguments of func
+        **kwargs: Keyword arguments of func
+
+    Returns:
+        The return value of func; its exceptions are raised here
+    """
+    return await get_executor(kind).submit(functools.partial(func, *args, **kwargs))
+
+
+def submit_background(kind: str, func: Callable[..., T], *args, **kwargs) -> "Future[T]":
+    """
+    Run a blocking function on the pool for its kind of work without awaiting it, for work
+    that outlives the request starting it, such as an indexing job.
+
+    Returns:
+        concurrent.futures.Future: The future of func's result
+    """
+    return get_executor(kind).submit_background(functools.partial(func, *args, **kwargs))
+
+
+def run_in_pool(kind: str, func: Callable[..., T], *args, **kwargs) -> T:
+    """
+    Run a blocking function on the pool for its kind of work from synchronous code, such as
+    a request on the "io" pool that has to build an index, and wait for its result.
+
+    The context variables of the caller, such as the progress of its indexing job, are
+    carried over. On a thread of that pool already, or of a pool in INLINE_KINDS, func runs
+    inline, so a pool never waits on its own tasks.
+
+    Returns:
+        The return value of func; its exceptions are raised here
+    """
+    executor = get_executor(kind)
+    current_kind = threading.current_thread().name.rsplit("_", 1)[0].removeprefix("deepwiki-")
+    if current_kind in INLINE_KINDS.get(kind, (kind,)):
+        return func(*args, **kwargs)
+    context = contextvars.copy_context()
+    return executor.submit_background(functools.partial(context.run, func, *args, **kwargs)).result()
+
+
+async def iterate_blocking(kind: str, iterable: Iterable[T]) -> AsyncIterator[T]:
+    """
+    Iterate a blocking iterator, such as a synchronous model response stream, fetching each
+    item on the pool for its kind of work.
+    """
+    iterator = iter(iterable)
+    while True:
+        item = await run_blocking(kind, next, iterator, _SENTINEL)
+        if item is _SENTINEL:
+            return
+        yield item
+
+
+def get_executor_stats() -> Dict[str, Any]:
+    """Return the running and queued tasks of every pool created so far."""
+    with _executors_lock:
+        executors = list(_executors.values())
+    return {executor.kind: executor.stats() for executor in executors}
+
+
+def shutdown_executors() -> None:
+    """Stop every pool, letting running tasks finish; called when the application shuts down."""
+    with _executors_lock:
+        executors = list(_executors.values())
+        _executors.clear()
+    for executor in executors:
+        executor.pool.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,181 @@
+import asyncio
+import logging
+import time
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+from adalflow.core.types import Document
+
+from api.config import configs
+from api.executors import run_blocking, submit_background
+from api.lexical_index import get_lexical_config, reciprocal_rank_fusion
+from api.rag import RAG
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class FederatedHit:
+    """A chunk found by a federated search, tagged with the repository it comes from."""
+
+    repo: str
+    row: int
+    score: float
+    document: Optional[Document] = None
+
+
+class FederatedRetriever:
+    """
+    Searches the indexes of several repositories ("shards") as one corpus, for questions
+    that span related services.
+
+    Shards are prepared in parallel on the shared "index" pool and searched in parallel on the
+    "cpu" pool (see api.executors), so latency follows the slowest shard rather than the sum,
+    concurrency stays within the pool sizes and the work shows up in /metrics. Callers wait for
+    the shards from another pool, such as "io", so a pool never waits on its own tasks.
+
+    Queries are embedded once for all shards, since every index is built with the configured
+    embedder, and the per-shard results are merged into one global top k.
+    """
+
+    def __init__(self, shards: Dict[str, RAG]):
+        """
+        Args:
+            shards: Prepared RAG instances by repository URL or path
+        """
+        if not shards:
+            raise ValueError("At least one repository is required for a federated search")
+        self.shards = shards
+
+    @classmethod
+    async def prepare(
+        cls,
+        repositories: Sequence[Dict[str, Any]],
+        provider: str = "google",
+        model: Optional[str] = None,
+        excluded_dirs: List[str] = None,
+        excluded_files: List[str] = None,
+        included_dirs: List[str] = None,
+        included_files: List[str] = None,
+    ) -> "FederatedRetriever":
+        """
+        Prepare the retriever of every repository in parallel. Indexes already loaded are served
+        from "io" workers; only those being loaded or built take a worker of the "index" pool.
+
+        Args:
+            repositories: Mappings with "repo_url" and optional "type" and "token"
+            provider: Model provider of the RAG pipelines
+            model: Model name for the provider
+            excluded_dirs: Optional list of directories to exclude from retrieval
+            excluded_files: Optional list of file patterns to exclude from retrieval
+            included_dirs: Optional list of directories to include exclusively
+            included_files: Optional list of file patterns to include exclusively
+
+        Returns:
+            FederatedRetriever: The retriever over all the repositories
+        """
+        def prepare_shard(repository: Dict[str, Any]) -> RAG:
+            rag = RAG(provider=provider, model=model)
+            rag.prepare_retriever(
+                repository["repo_url"],
+                repository.get("type") or "github",
+                repository.get("token"),
+                excluded_dirs=excluded_dirs,
+                excluded_files=excluded_files,
+                included_dirs=included_dirs,
+                included_files=included_files,
+            )
+            return rag
+
+        repositories = list({repository["repo_url"]: repository for repository in repositories}.values())
+        rags = await asyncio.gather(*(run_blocking("io", prepare_shard, repository) for repository in repositories))
+        return cls({repository["repo_url"]: rag for repository, rag in zip(repositories, rags)})
+
+    def search(
+        self,
+        queries: Sequence[str],
+        top_k: Optional[int] = None,
+        metadata_filters: Optional[Dict[str, Any]] = None,
+    ) -> List[List[FederatedHit]]:
+        """
+        Search every shard for each query and merge the results.
+
+        Dense results are merged by cosine score, which is comparable across shards built with
+        the same embedder. BM25 scores depend on the term statistics of each shard, so in hybrid
+        mode the BM25 ranking of every shard is fused by rank with the merged dense ranking,
+        with reciprocal rank fusion: the best keyword match of each shard counts as much as
+        that of a single-repository search.
+
+        Args:
+            queries: The queries
+            top_k: Number of chunks per query, across all shards; defaults to the retriever's top_k
+            metadata_filters: Optional predicates on the chunks to search, applied in every shard
+
+        Returns:
+            List[List[FederatedHit]]: The best chunks of each query, best first, with documents filled in
+        """
+        queries = list(queries)
+        first = next(iter(self.shards.values()))
+        top_k = top_k or first.retriever.top_k
+        lexical_config = get_lexical_config(configs.get("lexical_search"))
+        hybrid = lexical_config["mode"] == "hybrid"
+
+        started_at = time.time()
+        valid = [i for i, query in enumerate(queries) if query]
+        embeddings = first.retriever.embed_queries([queries[i] for i in valid]) if valid else None
+
+        def search_shard(repo: str):
+            rag = self.shards[repo]
+            mask = rag.search_mask(metadata_filters) if metadata_filters else rag.filter_mask
+            dense = rag.retriever(embeddings, top_k, mask=mask) if valid else []
+            lexical = [
+                rag.transformed_docs.lexical_index.search(
+                    queries[i], top_k, mask=mask, k1=lexical_config["k1"], b=lexical_config["b"]
+                )
+                for i in valid
+            ] if hybrid else []
+            return repo, dense, lexical
+
+        futures = [submit_background("cpu", search_shard, repo) for repo in self.shards]
+        shard_results = [future.result() for future in futures]
+
+        results: List[List[FederatedHit]] = [[] for _ in queries]
+        for position, i in enumerate(valid):
+            dense_hits = sorted(
+                (
+                    (repo, row, score)
+                    for repo, dense, _ in shard_results
+                    for row, score in zip(dense[position].doc_indices, dense[position].doc_scores)
+                ),
+                key=lambda hit: -hit[2],
+            )[:top_k]
+            if hybrid:
+                lexical_rankings = [
+                    [(repo, int(row)) for row in lexical[position][1]] for repo, _, lexical in shard_results
+                ]
+                fused = reciprocal_rank_fusion(
+                    [[(repo, row) for repo, row, _ in dense_hits]] + lexical_rankings,
+                    k=lexical_config["rrf_k"],
+                )[:top_k]
+                hits = [FederatedHit(repo=repo, row=row, score=score) for (repo, row), score in fused]
+            else:
+                hits = [FederatedHit(repo=repo, row=row, score=score) for repo, row, score in dense_hits]
+            self._fill_documents(hits)
+            results[i] = hits
+
+        logger.info(
+            f"Searched {len(self.shards)} repositories for {len(valid)} queries in {time.time() - started_at:.3f}s"
+        )
+        return results
+
+    def _fill_documents(self, hits: List[FederatedHit]) -> None:
+        """Load the chunks of the hits, one query per shard, and tag them with their repository."""
+        rows_by_repo: Dict[str, List[FederatedHit]] = {}
+        for hit in hits:
+            rows_by_repo.setdefault(hit.repo, []).append(hit)
+        for repo, repo_hits in rows_by_repo.items():
+            documents = self.shards[repo].transformed_docs.take([hit.row for hit in repo_hits])
+            for hit, document in zip(repo_hits, documents):
+                document.meta_data = dict(document.meta_data or {}, repo=repo)
+                hit.document = document
@@ -0,0 +1,182 @@
+import json
+import os
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+
+from api.config import configs, DEFAULT_EXCLUDED_DIRS, DEFAULT_EXCLUDED_FILES
+
+
+def resolve_file_filters(
+    excluded_dirs: List[str] = None,
+    excluded_files: List[str] = None,
+    included_dirs: List[str] = None,
+    included_files: List[str] = None,
+) -> dict:
+    """
+    Resolve the filters of a request into the effective file filter set.
+    Inclusion mode is used when any included directories or files are given; otherwise the
+    default and configured exclusions are extended with the given ones.
+
+    Returns:
+        dict: "use_inclusion" plus sorted "included_dirs", "included_files", "excluded_dirs"
+              and "excluded_files" lists
+    """
+    # Determine filtering mode: inclusion or exclusion
+    use_inclusion_mode = (included_dirs is not None and len(included_dirs) > 0) or (
+        included_files is not None and len(included_files) > 0
+    )
+
+    if use_inclusion_mode:
+        # Inclusion mode: only process specified directories and files
+        return {
+            "use_inclusion": True,
+            "included_dirs": sorted(set(included_dirs or [])),
+            "included_files": sorted(set(included_files or [])),
+            "excluded_dirs": [],
+            "excluded_files": [],
+        }
+
+    # Exclusion mode: use default exclusions plus any additional ones
+    final_excluded_dirs = set(DEFAULT_EXCLUDED_DIRS)
+    final_excluded_files = set(DEFAULT_EXCLUDED_FILES)
+
+    # Add any additional excluded directories and files from config
+    if "file_filters" in configs and "excluded_dirs" in configs["file_filters"]:
+        final_excluded_dirs.update(configs["file_filters"]["excluded_dirs"])
+    if "file_filters" in configs and "excluded_files" in configs["file_filters"]:
+        final_excluded_files.update(configs["file_filters"]["excluded_files"])
+
+    # Add any explicitly provided excluded directories and files
+    if excluded_dirs is not None:
+        final_excluded_dirs.update(excluded_dirs)
+    if excluded_files is not None:
+        final_excluded_files.update(excluded_files)
+
+    return {
+        "use_inclusion": False,
+        "included_dirs": [],
+        "included_files": [],
+        "excluded_dirs": sorted(final_excluded_dirs),
+        "excluded_files": sorted(final_excluded_files),
+    }
+
+
+def should_process_file(
+    file_path: str,
+    use_inclusion: bool,
+    included_dirs: List[str],
+    included_files: List[str],
+    excluded_dirs: List[str],
+    excluded_files: List[str],
+) -> bool:
+    """
+    Determine if a file should be processed based on inclusion/exclusion rules.
+
+    Args:
+        file_path (str): The file path to check
+        use_inclusion (bool): Whether to use inclusion mode
+        included_dirs (List[str]): List of directories to include
+        included_files (List[str]): List of files to include
+        excluded_dirs (List[str]): List of directories to exclude
+        excluded_files (List[str]): List of files to exclude
+
+    Returns:
+        bool: True if the file should be processed, False otherwise
+    """
+    file_path_parts = os.path.normpath(file_path).split(os.sep)
+    file_name = os.path.basename(file_path)
+
+    if use_inclusion:
+        # Inclusion mode: file must be in included directories or match included files
+        is_included = False
+
+        # Check if file is in an included directory
+        if included_dirs:
+            for included in included_dirs:
+                clean_included = included.strip("./").rstrip("/")
+                if clean_included in file_path_parts:
+                    is_included = True
+                    break
+
+        # Check if file matches included file patterns
+        if not is_included and included_files:
+            for included_file in included_files:
+                if file_name == included_file or file_name.endswith(included_file):
+                    is_included = True
+                    break
+
+        # If no inclusion rules are specified for a category, allow all files from that category
+        if not included_dirs and not included_files:
+            is_included = True
+        elif not included_dirs and included_files:
+            # Only file patterns specified, allow all directories
+            pass  # is_included is already set based on file patterns
+        elif included_dirs and not included_files:
+            # Only directory patterns specified, allow all files in included directories
+            pass  # is_included is already set based on directory patterns
+
+        return is_included
+    else:
+        # Exclusion mode: file must not be in excluded directories or match excluded files
+        is_excluded = False
+
+        # Check if file is in an excluded directory
+        for excluded in excluded_dirs:
+            clean_excluded = excluded.strip("./").rstrip("/")
+            if clean_excluded in file_path_parts:
+                is_excluded = True
+                break
+
+        # Check if file matches excluded file patterns
+        if not is_excluded:
+            for excluded_file in excluded_files:
+                if file_name == excluded_file:
+                    is_excluded = True
+                    break
+
+        return not is_excluded
+
+
+def is_default_filters(file_filters: Dict[str, Any]) -> bool:
+    """Whether the filters are the default ones every repository index is built with."""
+    return file_filters == resolve_file_filters()
+
+
+def file_filters_key(file_filters: Dict[str, Any]) -> str:
+    """Return a stable string identifying a resolved filter set, for use in cache keys."""
+    return json.dumps(file_filters, sort_keys=True)
+
+
+def file_filter_mask(file_paths: Sequence[Optional[str]], file_filters: Dict[str, Any]) -> np.ndarray:
+    """
+    Evaluate resolved filters against the file path of every chunk.
+    Each distinct path is checked once, so the cost grows with the number of files rather
+    than the number of chunks.
+
+    Args:
+        file_paths: The repository-relative file path of each chunk
+        file_filters: Filters returned by resolve_file_filters
+
+    Returns:
+        np.ndarray: A boolean mask, True for the chunks the filters keep
+    """
+    if len(file_paths) == 0:
+        return np.zeros(0, dtype=bool)
+    unique_paths, inverse = np.unique(np.array([path or "" for path in file_paths], dtype=object), return_inverse=True)
+    keep = np.fromiter(
+        (
+            should_process_file(
+                path,
+                file_filters["use_inclusion"],
+                file_filters["included_dirs"],
+                file_filters["included_files"],
+                file_filters["excluded_dirs"],
+                file_filters["excluded_files"],
+            )
+            for path in unique_paths
+        ),
+        dtype=bool,
+        count=len(unique_paths),
+    )
+    return keep[inverse.reshape(-1)]
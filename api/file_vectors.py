@@ -0,0 +1,148 @@
+import logging
+import threading
+from typing import Any, Dict, Optional, Sequence
+
+import numpy as np
+
+from api.vector_index import normalize_rows
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# File of an index holding one vector per file and the chunk rows of each file
+FILE_VECTORS_FILE = "file_vectors.npz"
+
+DEFAULT_COARSE_SEARCH_CONFIG = {
+    "enabled": True,
+    # Indexes with fewer chunks are scanned in full; the file stage only pays off on large repositories
+    "min_chunks": 20000,
+    "top_files": 64,
+}
+
+
+class FileVectorIndex:
+    """
+    One vector per file, the normalized centroid of the embeddings of its chunks, used to
+    narrow a search to the chunks of the files closest to a query.
+
+    The chunk rows of file f are rows[offsets[f]:offsets[f + 1]], in ascending order.
+    """
+
+    def __init__(self, centroids: np.ndarray, offsets: np.ndarray, rows: np.ndarray):
+        self.centroids = centroids
+        self.offsets = offsets
+        self.rows = rows
+
+    def __len__(self) -> int:
+        return int(self.centroids.shape[0])
+
+    @property
+    def chunk_count(self) -> int:
+        return int(len(self.rows))
+
+    @property
+    def nbytes(self) -> int:
+        return int(self.centroids.nbytes + self.offsets.nbytes + self.rows.nbytes)
+
+    @classmethod
+    def build(cls, vectors: np.ndarray, file_paths: Sequence[Optional[str]]) -> "FileVectorIndex":
+        """
+        Pool the chunk embeddings of each file into a centroid.
+
+        Args:
+            vectors: The (N, d) chunk embeddings, in row order
+            file_paths: The file path of every chunk, in row order
+
+        Returns:
+            FileVectorIndex: The file-level index
+        """
+        paths = np.asarray([path or "" for path in file_paths], dtype=object)
+        if not len(paths):
+            dimensions = vectors.shape[1] if vectors.ndim == 2 else 0
+            return cls(np.zeros((0, dimensions), dtype=np.float32), np.zeros(1, dtype=np.int64), np.zeros(0, dtype=np.int64))
+        _, file_ids = np.unique(paths, return_inverse=True)
+        file_ids = file_ids.reshape(-1)
+        file_count = int(file_ids.max()) + 1
+
+        centroids = np.zeros((file_count, vectors.shape[1]), dtype=np.float32)
+        np.add.at(centroids, file_ids, normalize_rows(np.asarray(vectors, dtype=np.float32)))
+        offsets = np.zeros(file_count + 1, dtype=np.int64)
+        np.cumsum(np.bincount(file_ids, minlength=file_count), out=offsets[1:])
+        rows = np.argsort(file_ids, kind="stable").astype(np.int64)
+        return cls(normalize_rows(centroids), offsets, rows)
+
+    def save(self, path: str) -> None:
+        np.savez(path, centroids=self.centroids, offsets=self.offsets, rows=self.rows)
+
+    @classmethod
+    def load(cls, path: str) -> "FileVectorIndex":
+        with np.load(path) as arrays:
+            return cls(arrays["centroids"], arrays["offsets"], arrays["rows"])
+
+    def candidate_mask(
+        self, query: np.ndarray, top_files: int, min_rows: int = 0, mask: Optional[np.ndarray] = None
+    ) -> np.ndarray:
+        """
+        Rank the files against a query and return the chunks of the best ones.
+
+        Args:
+            query: A (d,) query embedding
+            top_files: Number of files whose chunks are searched
+            min_rows: Further files are added, best first, until at least this many chunks are candidates
+            mask: Optional boolean mask of the chunks that may be returned; files without any are skipped
+
+        Returns:
+            np.ndarray: A boolean mask over the chunks, True for the candidates
+        """
+        candidates = np.zeros(self.chunk_count, dtype=bool)
+        if not len(self):
+            return candidates
+        scores = self.centroids @ normalize_rows(np.atleast_2d(np.asarray(query, dtype=np.float32)))[0]
+        sizes = np.diff(self.offsets)
+        if mask is not None:
+            sizes = np.add.reduceat(mask[self.rows].astype(np.int64), self.offsets[:-1])
+            scores[sizes == 0] = -np.inf
+        ranked = np.argsort(-scores, kind="stable")
+        reachable = np.cumsum(sizes[ranked])
+        file_count = max(min(top_files, len(self)), int(np.searchsorted(reachable, min_rows)) + 1)
+        for f in ranked[:file_count]:
+            candidates[self.rows[self.offsets[f]:self.offsets[f + 1]]] = True
+        if mask is not None:
+            candidates &= mask
+        return candidates
+
+
+class CoarseSearchStats:
+    """Counts of coarse-to-fine searches and the share of the chunks they scanned."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.searches = 0
+        self.chunks_scanned = 0
+        self.chunks_total = 0
+
+    def record(self, scanned: int, total: int) -> None:
+        with self._lock:
+            self.searches += 1
+            self.chunks_scanned += scanned
+            self.chunks_total += total
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            return {
+                "searches": self.searches,
+                "scanned_rate": round(self.chunks_scanned / self.chunks_total, 4) if self.chunks_total else 0.0,
+            }
+
+
+coarse_search_stats = CoarseSearchStats()
+
+
+def get_coarse_search_config(config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Merge a "coarse_search" configuration section over the defaults."""
+    return dict(DEFAULT_COARSE_SEARCH_CONFIG, **(config or {}))
+
+
+def get_coarse_search_stats() -> Dict[str, Any]:
+    """Return how many searches went through the file stage and the share of chunks they scanned."""
+    return coarse_search_stats.stats()
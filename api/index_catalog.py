@@ -0,0 +1,150 @@
+import hashlib
+import json
+import logging
+import os
+import subprocess
+import threading
+import time
+from typing import Any, Dict, List, Optional
+from urllib.parse import urlparse
+from uuid import uuid4
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+CATALOG_FILE = "catalog.json"
+
+# Minimum seconds between two last_used_at updates of the same entry
+TOUCH_INTERVAL = 60
+
+# Locks of the catalog files, by path: requests each open their own IndexCatalog
+_catalog_locks: Dict[str, threading.Lock] = {}
+_catalog_locks_guard = threading.Lock()
+
+
+def get_repo_identity(repo_url_or_path: str, repo_type: str) -> str:
+    """
+    Return a canonical identity for a repository: the normalized URL for remote repositories,
+    the resolved absolute path for local ones, so two local folders sharing a basename differ.
+    """
+    if repo_url_or_path.startswith("https://") or repo_url_or_path.startswith("http://"):
+        parsed = urlparse(repo_url_or_path.strip())
+        path = parsed.path.rstrip("/")
+        if path.endswith(".git"):
+            path = path[:-len(".git")]
+        return f"{repo_type}:{parsed.netloc.lower()}{path}"
+    return f"local:{os.path.realpath(repo_url_or_path)}"
+
+
+def get_repo_commit(repo_dir: str) -> Optional[str]:
+    """Return the HEAD commit of a git checkout, or None if repo_dir is not a git repository."""
+    try:
+        result = subprocess.run(
+            ["git", "-C", repo_dir, "rev-parse", "HEAD"],
+            check=True,
+            stdout=subprocess.PIPE,
+            stderr=subprocess.PIPE,
+            timeout=10,
+        )
+        return result.stdout.decode("utf-8").strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def compute_index_key(
+    repo_identity: str,
+    commit: Optional[str],
+    file_filters: Dict[str, Any],
+    splitter_config: Dict[str, Any],
+    embedder_signature: str,
+) -> str:
+    """
+    Compute the content address of a repository index.
+    Requests with the same key can share an index; any change to the repository commit, the
+    effective file filters, the text splitter or the embedding model gives a new key.
+
+    Returns:
+        str: A 24-character hex digest
+    """
+    payload = json.dumps(
+        {
+            "repo": repo_identity,
+            "commit": commit,
+            "file_filters": file_filters,
+            "text_splitter": splitter_config,
+            "embedder": embedder_signature,
+        },
+        sort_keys=True,
+    )
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:24]
+
+
+class IndexCatalog:
+    """
+    JSON catalog mapping index keys to their artifacts and the inputs they were built from.
+    Writes go through a temporary file and an atomic rename, so readers never see a partial file,
+    and catalogs of the same directory share one lock, so concurrent updates are not lost.
+    """
+
+    def __init__(self, databases_dir: str):
+        self.databases_dir = databases_dir
+        self.path = os.path.join(databases_dir, CATALOG_FILE)
+        with _catalog_locks_guard:
+            self._lock = _catalog_locks.setdefault(os.path.abspath(self.path), threading.Lock())
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except FileNotFoundError:
+            return {}
+        except (OSError, ValueError) as e:
+            logger.warning(f"Ignoring unreadable index catalog {self.path}: {e}")
+            return {}
+
+    def _write(self, entries: Dict[str, Dict[str, Any]]) -> None:
+        os.makedirs(self.databases_dir, exist_ok=True)
+        tmp_path = f"{self.path}.{uuid4().hex}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=2, sort_keys=True)
+        os.replace(tmp_path, self.path)
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            return self._read().get(key)
+
+    def entries(self) -> Dict[str, Dict[str, Any]]:
+        with self._lock:
+            return self._read()
+
+    def find(self, repo_identity: str) -> List[Dict[str, Any]]:
+        """Return the entries of every index built for a repository, most recently used first."""
+        matches = [dict(entry, key=key) for key, entry in self.entries().items() if entry.get("repo") == repo_identity]
+        return sorted(matches, key=lambda entry: entry.get("last_used_at", 0), reverse=True)
+
+    def register(self, key: str, entry: Dict[str, Any]) -> None:
+        """Add or replace the entry of an index, stamping its creation and last use."""
+        now = time.time()
+        with self._lock:
+            entries = self._read()
+            entries[key] = dict(entry, created_at=now, last_used_at=now)
+            self._write(entries)
+
+    def touch(self, key: str) -> None:
+        """Record that an index was used, at most once per TOUCH_INTERVAL."""
+        now = time.time()
+        with self._lock:
+            entries = self._read()
+            entry = entries.get(key)
+            if entry is None or now - entry.get("last_used_at", 0) < TOUCH_INTERVAL:
+                return
+            entry["last_used_at"] = now
+            self._write(entries)
+
+    def remove(self, key: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            entries = self._read()
+            entry = entries.pop(key, None)
+            if entry is not None:
+                self._write(entries)
+            return entry
@@ -0,0 +1,277 @@
+import asyncio
+import contextvars
+import logging
+import os
+import threading
+import time
+import uuid
+from collections import OrderedDict
+from concurrent.futures import Future
+from datetime import datetime
+from typing import Any, Callable, Dict, Optional
+
+from api.executors import submit_background
+from api.index_catalog import get_repo_identity
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Stages an indexing job goes through; stages whose work is already done, such as cloning a
+# repository that is checked out, are skipped
+JOB_STAGES = ("queued", "cloning", "reading", "splitting", "embedding", "writing", "loading", "done")
+
+# Seconds a chat request for a repository that is being indexed waits for the job before it
+# is rejected, instead of starting a build of its own
+INDEX_WAIT_SECONDS = float(os.environ.get("DEEPWIKI_INDEX_WAIT_SECONDS", 10))
+
+# Finished jobs kept for GET /index/{job_id}, oldest first evicted
+MAX_FINISHED_JOBS = 200
+
+# The job whose build runs in this context, carried over to the pools its build runs work on
+_current_job: contextvars.ContextVar = contextvars.ContextVar("index_job", default=None)
+
+
+def report_progress(stage: str, done: Optional[int] = None, total: Optional[int] = None) -> None:
+    """
+    Report the progress of the indexing job running in this context. Called by the indexing
+    pipeline at each stage; outside of an indexing job it does nothing.
+
+    Args:
+        stage: One of JOB_STAGES
+        done: Items of the stage processed so far, such as documents read or chunks embedded
+        total: Items the stage will process, when known
+    """
+    job = _current_job.get()
+    if job is not None:
+        job.update(stage, done, total)
+
+
+def _isoformat(timestamp: Optional[float]) -> Optional[str]:
+    return datetime.fromtimestamp(timestamp).isoformat() if timestamp is not None else None
+
+
+class IndexJob:
+    """An indexing job for one repository, updated by the worker running it."""
+
+    def __init__(self, repo_url: str, type: str = "github", token: str = None, provider: str = "google"):
+        self.id = uuid.uuid4().hex
+        self.repo_url = repo_url
+        self.type = type
+        self.token = token
+        self.provider = provider
+        self.key = get_repo_identity(repo_url, type)
+        self.status = "queued"
+        self.stage = "queued"
+        self.done = 0
+        self.total = None
+        self.result: Dict[str, Any] = {}
+        self.error = None
+        self.created_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.future: Optional[Future] = None
+        self._stage_started_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        return self.status in ("queued", "running")
+
+    def _enter_stage(self, stage: str) -> None:
+        if stage != self.stage:
+            self.stage = stage
+            self.done = 0
+            self.total = None
+            self._stage_started_at = time.monotonic()
+
+    def update(self, stage: str, done: Optional[int] = None, total: Optional[int] = None) -> None:
+        with self._lock:
+            self._enter_stage(stage)
+            if done is not None:
+                self.done = done
+            if total is not None:
+                self.total = total
+
+    def start(self) -> None:
+        with self._lock:
+            self.status = "running"
+            self.started_at = time.time()
+
+    def finish(self, result: Dict[str, Any] = None, error: str = None) -> None:
+        with self._lock:
+            self.status = "failed" if error else "done"
+            if error is None:
+                self._enter_stage("done")
+            self.result = result or {}
+            self.error = error
+            self.finished_at = time.time()
+            # The token is only needed to clone the repository
+            self.token = None
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Return the status of the job, its current stage and the stage's progress and throughput."""
+        with self._lock:
+            elapsed = time.monotonic() - self._stage_started_at
+            return {
+                "job_id": self.id,
+                "repo_url": self.repo_url,
+                "type": self.type,
+                "provider": self.provider,
+                "status": self.status,
+                "stage": self.stage,
+                "progress": {"done": self.done, "total": self.total},
+                # Items of the current stage processed per second
+                "throughput": round(self.done / elapsed, 2) if self.done and elapsed > 0 else 0.0,
+                "created_at": _isoformat(self.created_at),
+                "started_at": _isoformat(self.started_at),
+                "finished_at": _isoformat(self.finished_at),
+                "result": dict(self.result),
+                "error": self.error,
+            }
+
+    async def wait(self, timeout: Optional[float] = None) -> bool:
+        """
+        Wait for the job to finish, without holding a thread.
+
+        Returns:
+            bool: Whether the job has finished
+        """
+        if self.active and self.future is not None:
+            # asyncio.wait leaves the job running when the timeout expires or the waiter is cancelled
+            await asyncio.wait({asyncio.wrap_future(self.future)}, timeout=timeout)
+        return not self.active
+
+
+def build_index(job: IndexJob) -> Dict[str, Any]:
+    """Clone, read, split and embed the repository of a job, and load its index into the retriever registry."""
+    # Imported here since the indexing pipeline reports its progress through this module
+    from api.rag import RAG
+
+    rag = RAG(provider=job.provider)
+    rag.prepare_retriever(job.repo_url, job.type, job.token)
+    return {"chunks": len(rag.transformed_docs), "index_key": rag.db_manager.index_key}
+
+
+class IndexJobManager:
+    """
+    Runs indexing jobs on the bounded "build" thread pool, one active job per repository:
+    submitting a repository that is already queued or being indexed returns its job.
+    """
+
+    def __init__(
+        self,
+        build: Callable[[IndexJob], Dict[str, Any]] = build_index,
+        executor_kind: str = "build",
+        max_finished_jobs: int = MAX_FINISHED_JOBS,
+    ):
+        self.build = build
+        self.executor_kind = executor_kind
+        self.max_finished_jobs = max_finished_jobs
+        self._jobs: "OrderedDict[str, IndexJob]" = OrderedDict()
+        self._active: Dict[str, IndexJob] = {}
+        self._lock = threading.Lock()
+        self.submitted = 0
+        self.deduplicated = 0
+        self.succeeded = 0
+        self.failed = 0
+
+    def submit(self, repo_url: str, type: str = "github", token: str = None, provider: str = "google") -> IndexJob:
+        """
+        Enqueue an indexing job for a repository, or return the job already indexing it.
+
+        Args:
+            repo_url: URL or local path of the repository
+            type: Type of repository (e.g., 'github', 'gitlab', 'bitbucket', 'local')
+            token: Personal access token for private repositories
+            provider: Model provider whose embedder builds the index
+
+        Returns:
+            IndexJob: The new or already active job
+        """
+        job = IndexJob(repo_url, type, token, provider)
+        with self._lock:
+            active = self._active.get(job.key)
+            if active is not None and active.active:
+                self.deduplicated += 1
+                return active
+            self._active[job.key] = job
+            self._jobs[job.id] = job
+            self.submitted += 1
+        logger.info(f"Queued indexing job {job.id} for {repo_url}")
+        job.future = submit_background(self.executor_kind, self._run, job)
+        return job
+
+    def _run(self, job: IndexJob) -> None:
+        token = _current_job.set(job)
+        job.start()
+        started_at = time.monotonic()
+        try:
+            result = self.build(job)
+        except Exception as e:
+            logger.error(f"Indexing job {job.id} for {job.repo_url} failed: {e}")
+            job.finish(error=str(e))
+        else:
+            logger.info(f"Indexing job {job.id} for {job.repo_url} finished in {time.monotonic() - started_at:.1f}s")
+            job.finish(result=result)
+        finally:
+            _current_job.reset(token)
+            with self._lock:
+                if self._active.get(job.key) is job:
+                    del self._active[job.key]
+                if job.status == "done":
+                    self.succeeded += 1
+                else:
+                    self.failed += 1
+                self._evict_finished()
+
+    def _evict_finished(self) -> None:
+        finished = [job_id for job_id, job in self._jobs.items() if not job.active]
+        for job_id in finished[:max(0, len(finished) - self.max_finished_jobs)]:
+            del self._jobs[job_id]
+
+    def get(self, job_id: str) -> Optional[IndexJob]:
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def active_job(self, repo_url: str, type: str = "github") -> Optional[IndexJob]:
+        """Return the queued or running job indexing a repository, if any."""
+        key = get_repo_identity(repo_url, type)
+        with self._lock:
+            job = self._active.get(key)
+        return job if job is not None and job.active else None
+
+    async def wait_for_repo(self, repo_url: str, type: str = "github", timeout: float = INDEX_WAIT_SECONDS) -> Optional[IndexJob]:
+        """
+        Wait up to timeout seconds for the job indexing a repository, if there is one.
+
+        Returns:
+            IndexJob: The job if it is still running after the wait, else None: the repository
+            can be loaded (or, if the job failed, built by the caller)
+        """
+        job = self.active_job(repo_url, type)
+        if job is None:
+            return None
+        logger.info(f"Waiting up to {timeout:.0f}s for indexing job {job.id} of {repo_url}")
+        if await job.wait(timeout):
+            return None
+        return job
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            active = list(self._active.values())
+            return {
+                "queued": sum(1 for job in active if job.status == "queued"),
+                "running": sum(1 for job in active if job.status == "running"),
+                "submitted": self.submitted,
+                "deduplicated": self.deduplicated,
+                "succeeded": self.succeeded,
+                "failed": self.failed,
+            }
+
+
+index_jobs = IndexJobManager()
+
+
+def get_index_job_stats() -> Dict[str, Any]:
+    """Return the queued and running indexing jobs, and how many were submitted, deduplicated, built and failed."""
+    return index_jobs.stats()
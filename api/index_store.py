@@ -0,0 +1,458 @@
+import json
+import logging
+import mmap
+import os
+import shutil
+import sqlite3
+import sys
+import threading
+from collections import Counter
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+from uuid import uuid4
+
+import numpy as np
+from adalflow.core.types import Document
+
+from api.ann_index import build_vector_index
+from api.file_vectors import FILE_VECTORS_FILE, FileVectorIndex
+from api.lexical_index import LEXICAL_DIR, LexicalIndex
+from api.metadata_filters import metadata_columns
+from api.path_index import PATH_INDEX_FILE, PathIndex
+from api.vector_index import load_full_vectors
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+INDEX_FORMAT_VERSION = 1
+
+# Files of an index directory
+MANIFEST_FILE = "manifest.json"
+CHUNKS_FILE = "chunks.sqlite"
+TEXT_FILE = "text.bin"
+VECTORS_DIR = "vectors"
+
+_CHUNK_COLUMNS = "id, parent_doc_id, chunk_order, text_offset, text_length, estimated_num_tokens, meta_data"
+
+
+def is_index(index_dir: str) -> bool:
+    """Whether index_dir holds a complete index written by write_index."""
+    manifest = read_index_manifest(index_dir)
+    return bool(manifest) and manifest.get("format") == INDEX_FORMAT_VERSION
+
+
+def read_index_manifest(index_dir: str) -> Optional[Dict[str, Any]]:
+    """Return the manifest of an index directory, or None if it is missing or unreadable."""
+    try:
+        with open(os.path.join(index_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def _vector_size(vector: Any) -> int:
+    try:
+        return len(vector) if vector is not None else 0
+    except TypeError:
+        return 0
+
+
+def _lexical_text(file_path: Optional[str], text: Optional[str]) -> str:
+    """The text indexed for lexical search: the file path, so file and module names match, then the chunk."""
+    return f"{file_path or ''}\n{text or ''}"
+
+
+def write_index(
+    documents: Sequence[Document],
+    index_dir: str,
+    vector_store_config: Optional[Dict[str, Any]] = None,
+    embedder: Optional[str] = None,
+) -> None:
+    """
+    Write embedded chunks to an index directory, replacing any previous index.
+
+    Layout:
+        manifest.json     format version, chunk count, embedding size and embedder
+        chunks.sqlite     one row per chunk: ids, order, text offset/length and JSON metadata
+        text.bin          the UTF-8 chunk texts, back to back
+        paths.json        chunk rows by file path and top-level symbol, and the import graph
+        lexical/          the BM25 inverted index over the file path and text of each chunk
+        file_vectors.npz  one centroid vector per file and the chunk rows of each file
+        vectors/          the vector search index files, including the memory-mappable full vectors .npy
+
+    Embeddings are validated here, once: chunks without an embedding of the most common size
+    cannot be searched and are left out, and the rest are stored as a single contiguous
+    (N, d) matrix (float16 unless vector_store.full_vectors_dtype asks for float32) whose
+    row i belongs to the chunk with sqlite row i. Readers trust that shape instead of
+    checking every chunk again.
+
+    Args:
+        documents: Chunks with their vectors set
+        index_dir: Target directory
+        vector_store_config: The "vector_store" configuration section, selecting the search
+            engine and its parameters
+        embedder: Signature of the embedder that produced the vectors (see
+            api.config.get_embedder_signature), None when unknown
+    """
+    sizes = Counter(_vector_size(doc.vector) for doc in documents)
+    sizes.pop(0, None)
+    if not sizes:
+        raise ValueError("No documents with valid embeddings to index")
+    dimensions = sizes.most_common(1)[0][0]
+    valid_documents = [doc for doc in documents if _vector_size(doc.vector) == dimensions]
+    if len(valid_documents) < len(documents):
+        logger.warning(
+            f"Leaving out {len(documents) - len(valid_documents)} chunks without a {dimensions}-dimensional embedding"
+        )
+
+    tmp_dir = f"{index_dir}.{uuid4().hex}.tmp"
+    os.makedirs(tmp_dir)
+    try:
+        rows = []
+        offset = 0
+        with open(os.path.join(tmp_dir, TEXT_FILE), "wb") as text_file:
+            for row, doc in enumerate(valid_documents):
+                encoded = (doc.text or "").encode("utf-8")
+                text_file.write(encoded)
+                meta_data = doc.meta_data or {}
+                rows.append((
+                    row,
+                    doc.id,
+                    doc.parent_doc_id,
+                    doc.order,
+                    meta_data.get("file_path"),
+                    offset,
+                    len(encoded),
+                    doc.estimated_num_tokens,
+                    json.dumps(meta_data, ensure_ascii=False, default=str),
+                ))
+                offset += len(encoded)
+
+        connection = sqlite3.connect(os.path.join(tmp_dir, CHUNKS_FILE))
+        try:
+            connection.execute(
+                "CREATE TABLE chunks ("
+                "row INTEGER PRIMARY KEY, id TEXT, parent_doc_id TEXT, chunk_order INTEGER, file_path TEXT, "
+                "text_offset INTEGER, text_length INTEGER, estimated_num_tokens INTEGER, meta_data TEXT)"
+            )
+            connection.executemany("INSERT INTO chunks VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            connection.execute("CREATE INDEX chunks_file_path ON chunks (file_path)")
+            connection.commit()
+        finally:
+            connection.close()
+
+        chunk_texts = [((doc.meta_data or {}).get("file_path"), doc.text) for doc in valid_documents]
+        PathIndex.build(chunk_texts).save(os.path.join(tmp_dir, PATH_INDEX_FILE))
+        LexicalIndex.build(_lexical_text(file_path, text) for file_path, text in chunk_texts).save(
+            os.path.join(tmp_dir, LEXICAL_DIR)
+        )
+
+        vectors = np.array([doc.vector for doc in valid_documents], dtype=np.float32)
+        build_vector_index(vectors, os.path.join(tmp_dir, VECTORS_DIR), vector_store_config)
+        FileVectorIndex.build(vectors, [file_path for file_path, _ in chunk_texts]).save(
+            os.path.join(tmp_dir, FILE_VECTORS_FILE)
+        )
+
+        with open(os.path.join(tmp_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+            json.dump({
+                "format": INDEX_FORMAT_VERSION,
+                "count": len(valid_documents),
+                "dimensions": int(dimensions),
+                "embedder": embedder,
+                "created_at": datetime.now().isoformat(),
+                "version": uuid4().hex,
+            }, f)
+
+        shutil.rmtree(index_dir, ignore_errors=True)
+        os.replace(tmp_dir, index_dir)
+    except BaseException:
+        shutil.rmtree(tmp_dir, ignore_errors=True)
+        raise
+    logger.info(f"Saved index of {len(valid_documents)} chunks to {index_dir}")
+
+
+class ChunkStore(Sequence):
+    """
+    Read-only, lazily loaded sequence of the chunks of an index directory.
+
+    Opening only reads the manifest; chunk rows come from SQLite, texts are sliced out of
+    the memory-mapped text blob and vectors are rows of the memory-mapped full vector
+    matrix, so only the pages of the chunks actually accessed are read.
+    """
+
+    def __init__(self, index_dir: str):
+        manifest = read_index_manifest(index_dir)
+        if not manifest or manifest.get("format") != INDEX_FORMAT_VERSION:
+            raise ValueError(f"No index found at {index_dir}")
+        self.index_dir = index_dir
+        self.manifest = manifest
+        self._count = int(manifest["count"])
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+        self._text: Optional[mmap.mmap] = None
+        self._vectors: Optional[np.ndarray] = None
+        self._path_index: Optional[PathIndex] = None
+        self._lexical_index: Optional[LexicalIndex] = None
+        self._file_vectors: Optional[FileVectorIndex] = None
+        self._metadata_columns: Optional[Dict[str, np.ndarray]] = None
+
+    @property
+    def vectors_dir(self) -> str:
+        return os.path.join(self.index_dir, VECTORS_DIR)
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """The (N, d) normalized embeddings, memory-mapped (float16 unless the index keeps float32 vectors)."""
+        if self._vectors is None:
+            vectors = load_full_vectors(self.vectors_dir)
+            if vectors is None:
+                raise ValueError(f"No full vectors found in {self.vectors_dir}")
+            # The shape was validated when the index was written; only the .npy header is compared here
+            if vectors.shape != (self._count, self.manifest.get("dimensions")):
+                raise ValueError(
+                    f"Embedding matrix of shape {vectors.shape} does not match the {self._count} chunks of {self.index_dir}"
+                )
+            self._vectors = vectors
+        return self._vectors
+
+    @property
+    def path_index(self) -> PathIndex:
+        """The chunk lookup by file path and symbol; built from the chunks for indexes written without one."""
+        if self._path_index is None:
+            path = os.path.join(self.index_dir, PATH_INDEX_FILE)
+            if os.path.exists(path):
+                self._path_index = PathIndex.load(path)
+            else:
+                self._path_index = PathIndex.build(self._chunk_texts())
+        return self._path_index
+
+    @property
+    def lexical_index(self) -> LexicalIndex:
+        """The BM25 index of the chunks; built from the chunks for indexes written without one."""
+        if self._lexical_index is None:
+            lexical_dir = os.path.join(self.index_dir, LEXICAL_DIR)
+            if os.path.isdir(lexical_dir):
+                self._lexical_index = LexicalIndex.load(lexical_dir)
+            else:
+                self._lexical_index = LexicalIndex.build(
+                    _lexical_text(file_path, text) for file_path, text in self._chunk_texts()
+                )
+        return self._lexical_index
+
+    @property
+    def file_vectors(self) -> FileVectorIndex:
+        """The file-level centroid vectors; built from the chunk vectors for indexes written without them."""
+        if self._file_vectors is None:
+            path = os.path.join(self.index_dir, FILE_VECTORS_FILE)
+            if os.path.exists(path):
+                self._file_vectors = FileVectorIndex.load(path)
+            else:
+                self._file_vectors = FileVectorIndex.build(self.vectors, self.file_paths())
+        return self._file_vectors
+
+    @property
+    def metadata_columns(self) -> Dict[str, np.ndarray]:
+        """The file path, type, is_code and is_implementation of every chunk as arrays, read once."""
+        if self._metadata_columns is None:
+            self._metadata_columns = metadata_columns(self._query(
+                "SELECT file_path, json_extract(meta_data, '$.type'), json_extract(meta_data, '$.is_code'), "
+                "json_extract(meta_data, '$.is_implementation') FROM chunks ORDER BY row"
+            ))
+        return self._metadata_columns
+
+    def _chunk_texts(self) -> Iterator[tuple]:
+        """Yield the file path and text of every chunk, in row order."""
+        records = self._query("SELECT file_path, text_offset, text_length FROM chunks ORDER BY row")
+        for file_path, offset, length in records:
+            yield file_path, self._read_text(offset, length)
+
+    def _query(self, sql: str, parameters: Sequence = ()) -> List[tuple]:
+        with self._lock:
+            if self._connection is None:
+                path = os.path.join(self.index_dir, CHUNKS_FILE)
+                self._connection = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+            return self._connection.execute(sql, parameters).fetchall()
+
+    def _read_text(self, offset: int, length: int) -> str:
+        if length == 0:
+            return ""
+        if self._text is None:
+            with open(os.path.join(self.index_dir, TEXT_FILE), "rb") as f:
+                self._text = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self._text[offset:offset + length].decode("utf-8")
+
+    def _to_document(self, row: int, record: tuple) -> Document:
+        chunk_id, parent_doc_id, order, offset, length, estimated_num_tokens, meta_data = record
+        return Document(
+            text=self._read_text(offset, length),
+            meta_data=json.loads(meta_data) if meta_data else {},
+            vector=np.asarray(self.vectors[row], dtype=np.float32),
+            id=chunk_id,
+            order=order,
+            parent_doc_id=parent_doc_id,
+            estimated_num_tokens=estimated_num_tokens,
+        )
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(self._count))]
+        if index < 0:
+            index += self._count
+        if not 0 <= index < self._count:
+            raise IndexError("chunk index out of range")
+        records = self._query(f"SELECT {_CHUNK_COLUMNS} FROM chunks WHERE row = ?", (int(index),))
+        return self._to_document(index, records[0])
+
+    def take(self, rows: Sequence[int]) -> List[Document]:
+        """Return the chunks at the given rows, in that order, with a single query."""
+        rows = [int(row) for row in rows]
+        if not rows:
+            return []
+        if min(rows) < 0 or max(rows) >= self._count:
+            raise IndexError("chunk index out of range")
+        placeholders = ", ".join("?" * len(set(rows)))
+        records = self._query(f"SELECT row, {_CHUNK_COLUMNS} FROM chunks WHERE row IN ({placeholders})", sorted(set(rows)))
+        by_row = {record[0]: record[1:] for record in records}
+        return [self._to_document(row, by_row[row]) for row in rows]
+
+    def __iter__(self) -> Iterator[Document]:
+        records = self._query(f"SELECT {_CHUNK_COLUMNS} FROM chunks ORDER BY row")
+        for row, record in enumerate(records):
+            yield self._to_document(row, record)
+
+    @property
+    def nbytes(self) -> int:
+        """
+        Approximate memory used by the lookup structures loaded so far: the lexical and path
+        indexes, file vectors and metadata columns. Chunk texts and vectors are memory-mapped
+        and left to the page cache.
+        """
+        nbytes = sum(
+            structure.nbytes
+            for structure in (self._lexical_index, self._path_index, self._file_vectors)
+            if structure is not None
+        )
+        for column in (self._metadata_columns or {}).values():
+            nbytes += column.nbytes
+            if column.dtype == object:
+                nbytes += sum(sys.getsizeof(value) for value in column)
+        return int(nbytes)
+
+    def file_paths(self) -> List[Optional[str]]:
+        """Return the file path of every chunk, in row order."""
+        return [record[0] for record in self._query("SELECT file_path FROM chunks ORDER BY row")]
+
+    def close(self) -> None:
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+            if self._text is not None:
+                self._text.close()
+                self._text = None
+            self._vectors = None
+            self._path_index = None
+            self._lexical_index = None
+            self._file_vectors = None
+            self._metadata_columns = None
+
+
+def open_index(index_dir: str) -> ChunkStore:
+    """Open an index directory written by write_index."""
+    return ChunkStore(index_dir)
+
+
+def migrate_pickle_database(
+    pickle_path: str,
+    index_dir: str,
+    vector_store_config: Optional[Dict[str, Any]] = None,
+    remove_source: bool = True,
+) -> int:
+    """
+    Convert a LocalDB pickle written by earlier versions into an index directory.
+
+    Args:
+        pickle_path: Path of the {repo}.pkl database
+        index_dir: Target index directory
+        vector_store_config: The "vector_store" configuration section
+        remove_source: Delete the pickle, and the vectors saved next to it, once the migrated
+            index has been opened
+
+    Returns:
+        int: Number of chunks written
+    """
+    from adalflow.core.db import LocalDB
+
+    db = LocalDB.load_state(pickle_path)
+    documents = db.get_transformed_data(key="split_and_embed")
+    if not documents:
+        raise ValueError(f"No transformed documents in {pickle_path}")
+    write_index(documents, index_dir, vector_store_config)
+
+    store = open_index(index_dir)
+    count = len(store)
+    store.close()
+    if remove_source:
+        remove_pickle_database(pickle_path)
+    logger.info(f"Migrated {pickle_path} to {index_dir}")
+    return count
+
+
+def remove_pickle_database(pickle_path: str) -> None:
+    """Delete a LocalDB pickle and the vectors saved next to it."""
+    os.remove(pickle_path)
+    shutil.rmtree(f"{os.path.splitext(pickle_path)[0]}.vectors", ignore_errors=True)
+
+
+def migrate_all(databases_dir: str, remove_source: bool = True) -> Dict[str, int]:
+    """
+    Migrate every {repo}.pkl in databases_dir to a {repo}.index directory next to it.
+
+    Returns:
+        Dict[str, int]: Chunk counts of the migrated databases, by pickle path
+    """
+    from api.config import configs
+
+    vector_store_config = configs.get("vector_store", {})
+    migrated = {}
+    for name in sorted(os.listdir(databases_dir)):
+        if not name.endswith(".pkl"):
+            continue
+        pickle_path = os.path.join(databases_dir, name)
+        index_dir = os.path.join(databases_dir, f"{name[:-len('.pkl')]}.index")
+        if is_index(index_dir):
+            logger.info(f"Skipping {pickle_path}, {index_dir} already exists")
+            continue
+        try:
+            migrated[pickle_path] = migrate_pickle_database(
+                pickle_path,
+                index_dir,
+                vector_store_config,
+                remove_source=remove_source,
+            )
+        except Exception as e:
+            logger.error(f"Failed to migrate {pickle_path}: {e}")
+    return migrated
+
+
+if __name__ == "__main__":
+    import argparse
+
+    from adalflow.utils import get_adalflow_default_root_path
+
+    parser = argparse.ArgumentParser(description="Migrate pickled LocalDB databases to the index directory format")
+    parser.add_argument(
+        "databases_dir",
+        nargs="?",
+        default=os.path.join(get_adalflow_default_root_path(), "databases"),
+        help="Directory holding the {repo}.pkl files",
+    )
+    parser.add_argument("--keep", action="store_true", help="Keep the pickle files after migrating them")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    results = migrate_all(args.databases_dir, remove_source=not args.keep)
+    print(f"Migrated {len(results)} databases ({sum(results.values())} chunks)")
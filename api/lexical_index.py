@@ -0,0 +1,310 @@
+import json
+import logging
+import math
+import os
+import re
+import sys
+import threading
+from collections import Counter
+from typing import Any, Container, Dict, Hashable, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Directory of an index holding the BM25 inverted index
+LEXICAL_DIR = "lexical"
+VOCABULARY_FILE = "vocabulary.json"
+POSTINGS_FILE = "postings.npz"
+
+RETRIEVAL_MODES = ("dense", "hybrid")
+
+DEFAULT_LEXICAL_CONFIG = {
+    "mode": "hybrid",
+    "k1": 1.2,
+    "b": 0.75,
+    "rrf_k": 60,
+    "fast_path": True,
+    "fast_path_max_df": 0.05,
+    # The best BM25 score must be this many times that of the best chunk not naming the identifiers
+    "fast_path_min_margin": 1.5,
+}
+
+_WORD_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|[0-9]+")
+_SUBWORD_PATTERN = re.compile(r"[A-Z]+(?=[A-Z][a-z])|[A-Z]?[a-z]+|[A-Z]+|[0-9]+")
+# Identifiers in a question: quoted in backticks, called, dotted or snake_case. CamelCase words
+# are also product names (GitHub, FastAPI, OpenAI), so they only count when the repository defines them
+_BACKTICK_PATTERN = re.compile(r"`([^`]+)`")
+_IDENTIFIER_PATTERN = re.compile(
+    r"\b([A-Za-z_][A-Za-z0-9_]*(?:\.[A-Za-z_][A-Za-z0-9_]*)+|[A-Za-z0-9]*_[A-Za-z0-9_]+|"
+    r"[A-Za-z_][A-Za-z0-9_]*(?=\())"
+)
+_CAMEL_CASE_PATTERN = re.compile(r"\b([a-z][a-z0-9]*[A-Z][A-Za-z0-9]*|[A-Z][a-z0-9]+[A-Z][A-Za-z0-9]*)\b")
+
+
+def tokenize(text: str) -> List[str]:
+    """
+    Split text into lowercase terms, keeping each identifier whole and also adding its
+    snake_case and camelCase parts, so "prepare_db_index" matches both itself and "index".
+    """
+    terms = []
+    for word in _WORD_PATTERN.findall(text or ""):
+        if len(word) < 2:
+            continue
+        terms.append(word.lower())
+        parts = [part.lower() for piece in word.split("_") for part in _SUBWORD_PATTERN.findall(piece)]
+        if len(parts) > 1:
+            terms.extend(part for part in parts if len(part) > 1)
+    return terms
+
+
+def extract_identifiers(query: str, known_symbols: Optional[Container[str]] = None) -> List[str]:
+    """
+    Return the code identifiers named in a question, as written.
+
+    Args:
+        query: The question
+        known_symbols: Optional symbols defined in the repository, such as the symbol index of
+            its path index; CamelCase words in the question are identifiers only if listed here
+
+    Returns:
+        List[str]: The identifiers, in order of appearance
+    """
+    identifiers = []
+    for quoted in _BACKTICK_PATTERN.findall(query):
+        identifiers.extend(_WORD_PATTERN.findall(quoted))
+    unquoted = _BACKTICK_PATTERN.sub(" ", query)
+    for identifier in _IDENTIFIER_PATTERN.findall(unquoted):
+        identifiers.extend(identifier.split("."))
+    if known_symbols:
+        identifiers.extend(word for word in _CAMEL_CASE_PATTERN.findall(unquoted) if word in known_symbols)
+    return [identifier for identifier in dict.fromkeys(identifiers) if len(identifier) > 1 and not identifier.isdigit()]
+
+
+def reciprocal_rank_fusion(rankings: Sequence[Sequence[Hashable]], k: int = 60) -> List[Tuple[Any, float]]:
+    """
+    Fuse ranked lists of rows with reciprocal rank fusion: each row scores the sum of
+    1 / (k + rank) over the lists it appears in.
+
+    Returns:
+        List[Tuple[Any, float]]: Rows and fused scores, best first
+    """
+    scores: Dict[Hashable, float] = {}
+    for ranking in rankings:
+        for rank, row in enumerate(ranking):
+            scores[row] = scores.get(row, 0.0) + 1.0 / (k + rank + 1)
+    return sorted(scores.items(), key=lambda item: -item[1])
+
+
+class LexicalIndex:
+    """
+    BM25 inverted index over identifier-aware terms of the chunks of an index.
+
+    Postings are stored term by term in compressed sparse row form: the rows containing term t
+    and their term frequencies are postings[offsets[t]:offsets[t + 1]].
+    """
+
+    def __init__(
+        self,
+        vocabulary: Dict[str, int],
+        offsets: np.ndarray,
+        rows: np.ndarray,
+        frequencies: np.ndarray,
+        lengths: np.ndarray,
+    ):
+        self.vocabulary = vocabulary
+        self.offsets = offsets
+        self.rows = rows
+        self.frequencies = frequencies
+        self.lengths = lengths
+        self.average_length = float(lengths.mean()) if len(lengths) else 0.0
+
+    def __len__(self) -> int:
+        return len(self.lengths)
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory used by the postings and the vocabulary."""
+        postings = self.offsets.nbytes + self.rows.nbytes + self.frequencies.nbytes + self.lengths.nbytes
+        return int(postings + sys.getsizeof(self.vocabulary) + sum(sys.getsizeof(term) for term in self.vocabulary))
+
+    @classmethod
+    def build(cls, texts: Iterable[str]) -> "LexicalIndex":
+        """Build the index from the text of every chunk, in row order."""
+        vocabulary: Dict[str, int] = {}
+        term_ids: List[int] = []
+        rows: List[int] = []
+        frequencies: List[int] = []
+        lengths: List[int] = []
+        for row, text in enumerate(texts):
+            counts = Counter(tokenize(text))
+            lengths.append(sum(counts.values()))
+            for term, frequency in counts.items():
+                term_ids.append(vocabulary.setdefault(term, len(vocabulary)))
+                rows.append(row)
+                frequencies.append(frequency)
+
+        term_ids_array = np.asarray(term_ids, dtype=np.int64)
+        order = np.argsort(term_ids_array, kind="stable")
+        offsets = np.zeros(len(vocabulary) + 1, dtype=np.int64)
+        np.cumsum(np.bincount(term_ids_array, minlength=len(vocabulary)), out=offsets[1:])
+        return cls(
+            vocabulary,
+            offsets,
+            np.asarray(rows, dtype=np.int32)[order],
+            np.asarray(frequencies, dtype=np.float32)[order],
+            np.asarray(lengths, dtype=np.float32),
+        )
+
+    def save(self, lexical_dir: str) -> None:
+        os.makedirs(lexical_dir, exist_ok=True)
+        terms = sorted(self.vocabulary, key=self.vocabulary.get)
+        with open(os.path.join(lexical_dir, VOCABULARY_FILE), "w", encoding="utf-8") as f:
+            json.dump(terms, f, ensure_ascii=False)
+        np.savez(
+            os.path.join(lexical_dir, POSTINGS_FILE),
+            offsets=self.offsets,
+            rows=self.rows,
+            frequencies=self.frequencies,
+            lengths=self.lengths,
+        )
+
+    @classmethod
+    def load(cls, lexical_dir: str) -> "LexicalIndex":
+        with open(os.path.join(lexical_dir, VOCABULARY_FILE), "r", encoding="utf-8") as f:
+            terms = json.load(f)
+        with np.load(os.path.join(lexical_dir, POSTINGS_FILE)) as arrays:
+            return cls(
+                {term: term_id for term_id, term in enumerate(terms)},
+                arrays["offsets"],
+                arrays["rows"],
+                arrays["frequencies"],
+                arrays["lengths"],
+            )
+
+    def document_frequency(self, term: str) -> int:
+        """Return the number of chunks containing a term."""
+        term_id = self.vocabulary.get(term.lower())
+        if term_id is None:
+            return 0
+        return int(self.offsets[term_id + 1] - self.offsets[term_id])
+
+    def search(
+        self,
+        query: str,
+        top_k: int,
+        mask: Optional[np.ndarray] = None,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Score every chunk against the query with BM25.
+
+        Args:
+            query: The question
+            top_k: Number of chunks to return
+            mask: Optional boolean mask over rows; rows outside it are never returned
+            k1: BM25 term frequency saturation
+            b: BM25 length normalization
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: Scores and rows of the best matching chunks, best first;
+            chunks sharing no term with the query are left out
+        """
+        count = len(self)
+        scores = np.zeros(count, dtype=np.float32)
+        if not count:
+            return scores, np.zeros(0, dtype=np.int64)
+        for term in set(tokenize(query)):
+            term_id = self.vocabulary.get(term)
+            if term_id is None:
+                continue
+            start, end = self.offsets[term_id], self.offsets[term_id + 1]
+            rows = self.rows[start:end]
+            frequencies = self.frequencies[start:end]
+            document_frequency = end - start
+            idf = math.log(1.0 + (count - document_frequency + 0.5) / (document_frequency + 0.5))
+            norms = k1 * (1.0 - b + b * self.lengths[rows] / max(self.average_length, 1.0))
+            scores[rows] += idf * frequencies * (k1 + 1.0) / (frequencies + norms)
+
+        if mask is not None:
+            scores[~mask] = 0.0
+        candidates = np.flatnonzero(scores > 0)
+        if len(candidates) > top_k:
+            candidates = candidates[np.argpartition(-scores[candidates], top_k - 1)[:top_k]]
+        candidates = candidates[np.argsort(-scores[candidates], kind="stable")]
+        return scores[candidates], candidates
+
+    def is_specific(self, identifiers: Sequence[str], top_k: int, max_df: float) -> bool:
+        """
+        Whether a question is answered confidently by lexical search alone: it names at least
+        one identifier, and every identifier it names occurs in the index in no more than
+        max(top_k, max_df * N) chunks.
+        """
+        if not identifiers or not len(self):
+            return False
+        limit = max(top_k, max_df * len(self))
+        return all(0 < self.document_frequency(identifier) <= limit for identifier in identifiers)
+
+    def score_margin(self, identifiers: Sequence[str], scores: np.ndarray, rows: np.ndarray) -> float:
+        """
+        Ratio of the best score of a returned chunk containing one of the identifiers to the
+        best score of a returned chunk containing none, or infinity when there is no such chunk.
+
+        Args:
+            identifiers: The identifiers named in the question
+            scores: Scores of the search, best first
+            rows: Rows of the search, best first
+        """
+        named = np.zeros(len(rows), dtype=bool)
+        for identifier in identifiers:
+            term_id = self.vocabulary.get(identifier.lower())
+            if term_id is not None:
+                named |= np.isin(rows, self.rows[self.offsets[term_id]:self.offsets[term_id + 1]])
+        if not named.any():
+            return 0.0
+        unnamed = scores[~named]
+        if not len(unnamed) or unnamed[0] <= 0:
+            return math.inf
+        return float(scores[named][0] / unnamed[0])
+
+
+class LexicalSearchStats:
+    """Counts of searches answered lexically, without a query embedding, and of hybrid searches."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.fast_path = 0
+        self.hybrid = 0
+        self.dense = 0
+
+    def record(self, kind: str) -> None:
+        with self._lock:
+            setattr(self, kind, getattr(self, kind) + 1)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            searches = self.fast_path + self.hybrid + self.dense
+            return {
+                "fast_path": self.fast_path,
+                "hybrid": self.hybrid,
+                "dense": self.dense,
+                "embedding_calls_saved_rate": round(self.fast_path / searches, 4) if searches else 0.0,
+            }
+
+
+lexical_search_stats = LexicalSearchStats()
+
+
+def get_lexical_config(config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+    """Merge a "lexical_search" configuration section over the defaults."""
+    merged = dict(DEFAULT_LEXICAL_CONFIG, **(config or {}))
+    if merged["mode"] not in RETRIEVAL_MODES:
+        raise ValueError(f"Unknown retrieval mode {merged['mode']!r}, expected one of {RETRIEVAL_MODES}")
+    return merged
+
+
+def get_lexical_stats() -> Dict[str, Any]:
+    """Return how many searches took the lexical fast path, the hybrid path or the dense path."""
+    return lexical_search_stats.stats()
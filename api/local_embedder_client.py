@@ -0,0 +1,172 @@
+"""Local, deterministic embedding ModelClient that runs fully in-process."""
+
+import logging
+import re
+import zlib
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from adalflow.core.model_client import ModelClient
+from adalflow.core.types import Embedding, EmbedderOutput, ModelType, Usage
+
+log = logging.getLogger(__name__)
+
+# Splits text into identifier-like words, then camelCase / snake_case words into their parts
+_WORD_PATTERN = re.compile(r"[A-Za-z_][A-Za-z0-9_]*|\d+|[^\sA-Za-z0-9_]")
+_SUBWORD_PATTERN = re.compile(r"[A-Z]+(?=[A-Z][a-z]|\d|\b)|[A-Z]?[a-z]+|[A-Z]+|\d+")
+
+
+def tokenize_identifiers(text: str) -> List[str]:
+    """
+    Split text into lowercase tokens, expanding identifiers into their parts.
+    For example "prepare_db_index" yields "prepare_db_index", "prepare", "db", "index".
+    """
+    tokens: List[str] = []
+    for word in _WORD_PATTERN.findall(text):
+        lowered = word.lower()
+        tokens.append(lowered)
+        parts = [part.lower() for part in _SUBWORD_PATTERN.findall(word.replace("_", " "))]
+        if len(parts) > 1:
+            tokens.extend(parts)
+    return tokens
+
+
+@dataclass
+class LocalEmbeddingResponse:
+    """Raw response of LocalEmbedderClient.call: one batch of embeddings as a matrix."""
+
+    embeddings: np.ndarray
+    model: str
+
+
+class LocalEmbedderClient(ModelClient):
+    __doc__ = r"""An in-process embedding client based on hashed n-gram features.
+
+    Every text is turned into word unigrams, word bigrams and character n-grams of its
+    identifier-aware tokens. Each feature is hashed with CRC32 into one of ``dimensions``
+    buckets with a hash-derived sign, weighted with sublinear term frequency, and the
+    resulting vectors are L2-normalized. The whole batch is accumulated into a single
+    NumPy matrix.
+
+    The embeddings are deterministic across processes and machines and need no network
+    or model download, which makes ingestion and retrieval reproducible for air-gapped
+    deployments and benchmarks. They capture lexical rather than semantic similarity.
+
+    Example ``embedder.json``:
+
+    .. code-block:: json
+
+        "embedder": {
+            "client_class": "LocalEmbedderClient",
+            "batch_size": 256,
+            "model_kwargs": {"model": "hashed-ngram", "dimensions": 256}
+        }
+
+    Args:
+        dimensions (int): Default embedding size, overridden by ``model_kwargs["dimensions"]``.
+        char_ngram_range (Tuple[int, int]): Inclusive range of character n-gram lengths.
+    """
+
+    def __init__(self, dimensions: int = 256, char_ngram_range: Tuple[int, int] = (3, 5)):
+        super().__init__()
+        self.dimensions = dimensions
+        self.char_ngram_range = tuple(char_ngram_range)
+
+    def init_sync_client(self):
+        return None
+
+    def init_async_client(self):
+        return None
+
+    def _features(self, text: str) -> List[str]:
+        """Return the hashed feature strings of one text."""
+        tokens = tokenize_identifiers(text)
+        features = [f"w:{token}" for token in tokens]
+        features.extend(f"b:{first} {second}" for first, second in zip(tokens, tokens[1:]))
+        min_n, max_n = self.char_ngram_range
+        for token in set(tokens):
+            padded = f"<{token}>"
+            for n in range(min_n, max_n + 1):
+                features.extend(f"c:{padded[i:i + n]}" for i in range(len(padded) - n + 1))
+        return features
+
+    def embed(self, texts: Sequence[str], dimensions: Optional[int] = None) -> np.ndarray:
+        """
+        Embed a batch of texts.
+
+        Args:
+            texts: The texts to embed
+            dimensions: Embedding size, defaults to the client's dimensions
+
+        Returns:
+            np.ndarray: A float32 (len(texts), dimensions) matrix with unit-length rows
+        """
+        dimensions = int(dimensions or self.dimensions)
+        rows: List[np.ndarray] = []
+        hashes: List[np.ndarray] = []
+        for row, text in enumerate(texts):
+            features = self._features(text or "")
+            if not features:
+                continue
+            hashes.append(np.fromiter((zlib.crc32(f.encode("utf-8")) for f in features), dtype=np.uint32, count=len(features)))
+            rows.append(np.full(len(features), row, dtype=np.int64))
+
+        matrix = np.zeros((len(texts), dimensions), dtype=np.float32)
+        if hashes:
+            all_hashes = np.concatenate(hashes)
+            all_rows = np.concatenate(rows)
+            buckets = (all_hashes % dimensions).astype(np.int64)
+            # Count each (row, bucket, sign) feature, then apply sublinear tf weighting
+            signs = np.where((all_hashes >> 31) & 1, -1, 1).astype(np.int64)
+            keys = (all_rows * dimensions + buckets) * 2 + (signs > 0)
+            unique_keys, counts = np.unique(keys, return_counts=True)
+            weights = (1.0 + np.log(counts)).astype(np.float32)
+            weights[(unique_keys & 1) == 0] *= -1
+            flat_positions = unique_keys >> 1
+            np.add.at(matrix.reshape(-1), flat_positions, weights)
+
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        norms[norms == 0] = 1.0
+        return matrix / norms
+
+    def convert_inputs_to_api_kwargs(
+        self,
+        input: Optional[Any] = None,
+        model_kwargs: Dict = {},
+        model_type: ModelType = ModelType.UNDEFINED,
+    ) -> Dict:
+        if model_type != ModelType.EMBEDDER:
+            raise ValueError(f"model_type {model_type} is not supported by LocalEmbedderClient")
+        final_model_kwargs = model_kwargs.copy()
+        if isinstance(input, str):
+            input = [input]
+        if not isinstance(input, Sequence):
+            raise TypeError("input must be a sequence of text")
+        final_model_kwargs["input"] = list(input)
+        return final_model_kwargs
+
+    def call(self, api_kwargs: Dict = {}, model_type: ModelType = ModelType.UNDEFINED):
+        """Embed api_kwargs["input"] and return the batch matrix."""
+        if model_type != ModelType.EMBEDDER:
+            raise ValueError(f"model_type {model_type} is not supported by LocalEmbedderClient")
+        return LocalEmbeddingResponse(
+            embeddings=self.embed(api_kwargs["input"], api_kwargs.get("dimensions")),
+            model=api_kwargs.get("model", "hashed-ngram"),
+        )
+
+    async def acall(self, api_kwargs: Dict = {}, model_type: ModelType = ModelType.UNDEFINED):
+        return self.call(api_kwargs=api_kwargs, model_type=model_type)
+
+    def parse_embedding_response(self, response: LocalEmbeddingResponse) -> EmbedderOutput:
+        r"""Wrap the batch matrix in an EmbedderOutput. Each embedding is a row view of the matrix."""
+        try:
+            return EmbedderOutput(
+                data=[Embedding(embedding=row, index=i) for i, row in enumerate(response.embeddings)],
+                model=response.model,
+                usage=Usage(prompt_tokens=0, total_tokens=0),
+                raw_response=response,
+            )
+        except Exception as e:
+            log.error(f"Error parsing the embedding response: {e}")
+            return EmbedderOutput(data=[], error=str(e), raw_response=response)
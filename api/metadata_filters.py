@@ -0,0 +1,134 @@
+import json
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+# Language names accepted in the "languages" filter, by the file extensions recorded as chunk "type"
+LANGUAGE_EXTENSIONS = {
+    "python": ["py", "pyi"],
+    "javascript": ["js", "jsx", "mjs", "cjs"],
+    "typescript": ["ts", "tsx"],
+    "java": ["java"],
+    "kotlin": ["kt"],
+    "go": ["go"],
+    "rust": ["rs"],
+    "c": ["c", "h"],
+    "cpp": ["cpp", "cc", "cxx", "hpp", "h"],
+    "csharp": ["cs"],
+    "swift": ["swift"],
+    "php": ["php"],
+    "ruby": ["rb"],
+    "markdown": ["md"],
+}
+
+METADATA_FILTER_KEYS = ("code_only", "implementation_only", "exclude_tests", "path_prefix", "languages")
+
+
+def _as_list(value: Any) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [value]
+    return list(value)
+
+
+def _normalize_prefix(prefix: str) -> str:
+    prefix = prefix.replace("\\", "/")
+    while prefix.startswith("./"):
+        prefix = prefix[2:]
+    return prefix.lstrip("/")
+
+
+def resolve_metadata_filters(metadata_filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """
+    Validate and normalize the metadata predicates of a request.
+
+    Supported predicates, all optional and combined with AND:
+        code_only: only chunks of code files
+        implementation_only: only chunks of code files that are not tests
+        exclude_tests: leave out chunks of test code, keeping documentation
+        path_prefix: a path prefix, or a list of prefixes, the chunk's file must start with
+        languages: file extensions ("py") or language names ("python") to keep
+
+    Returns:
+        Optional[Dict[str, Any]]: The normalized predicates, or None if they select every chunk
+    """
+    if not metadata_filters:
+        return None
+    unknown = set(metadata_filters) - set(METADATA_FILTER_KEYS)
+    if unknown:
+        raise ValueError(f"Unknown metadata filters {sorted(unknown)}, expected some of {list(METADATA_FILTER_KEYS)}")
+
+    resolved: Dict[str, Any] = {}
+    for key in ("code_only", "implementation_only", "exclude_tests"):
+        if metadata_filters.get(key):
+            resolved[key] = True
+    prefixes = sorted({_normalize_prefix(prefix) for prefix in _as_list(metadata_filters.get("path_prefix"))} - {""})
+    if prefixes:
+        resolved["path_prefix"] = prefixes
+    extensions = set()
+    for language in _as_list(metadata_filters.get("languages")):
+        language = language.lower().lstrip(".")
+        extensions.update(LANGUAGE_EXTENSIONS.get(language, [language]))
+    if extensions:
+        resolved["languages"] = sorted(extensions)
+    return resolved or None
+
+
+def metadata_columns(records: Iterable[tuple]) -> Dict[str, np.ndarray]:
+    """
+    Build the metadata columns that predicates are evaluated against.
+
+    Args:
+        records: The file path, type, is_code and is_implementation of every chunk, in row order
+
+    Returns:
+        Dict[str, np.ndarray]: One array per field, indexed by chunk row
+    """
+    file_paths, types, is_code, is_implementation = [], [], [], []
+    for file_path, file_type, code, implementation in records:
+        file_paths.append((file_path or "").replace("\\", "/"))
+        types.append((file_type or "").lower())
+        is_code.append(bool(code))
+        is_implementation.append(bool(implementation))
+    return {
+        "file_path": np.asarray(file_paths, dtype=object),
+        "type": np.asarray(types, dtype=object),
+        "is_code": np.asarray(is_code, dtype=bool),
+        "is_implementation": np.asarray(is_implementation, dtype=bool),
+    }
+
+
+def metadata_filters_key(metadata_filters: Optional[Dict[str, Any]]) -> Optional[str]:
+    """Return a stable string identifying resolved metadata predicates, for use in cache keys."""
+    return json.dumps(metadata_filters, sort_keys=True) if metadata_filters else None
+
+
+def metadata_filter_mask(columns: Dict[str, np.ndarray], metadata_filters: Dict[str, Any]) -> np.ndarray:
+    """
+    Evaluate resolved metadata predicates against the metadata columns of an index.
+    Each predicate is a vectorized operation over the columns, and string predicates are
+    evaluated once per distinct value, so the cost does not depend on the query.
+
+    Args:
+        columns: "file_path", "type", "is_code" and "is_implementation" arrays, one entry per chunk
+        metadata_filters: Predicates returned by resolve_metadata_filters
+
+    Returns:
+        np.ndarray: A boolean mask, True for the chunks all predicates keep
+    """
+    mask = np.ones(len(columns["is_code"]), dtype=bool)
+    if metadata_filters.get("code_only"):
+        mask &= columns["is_code"]
+    if metadata_filters.get("implementation_only"):
+        mask &= columns["is_implementation"]
+    if metadata_filters.get("exclude_tests"):
+        mask &= ~(columns["is_code"] & ~columns["is_implementation"])
+    if metadata_filters.get("path_prefix"):
+        unique_paths, inverse = np.unique(columns["file_path"], return_inverse=True)
+        prefixes = tuple(metadata_filters["path_prefix"])
+        keep = np.fromiter((path.startswith(prefixes) for path in unique_paths), dtype=bool, count=len(unique_paths))
+        mask &= keep[inverse.reshape(-1)]
+    if metadata_filters.get("languages"):
+        mask &= np.isin(columns["type"], metadata_filters["languages"])
+    return mask
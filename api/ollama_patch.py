@@ -8,6 +8,8 @@ from adalflow.core.component import DataComponent
 import requests
 import os
 
+from api.index_jobs import report_progress
+
 # Configure logging
 from api.logging_config import setup_logging
 
@@ -76,6 +78,7 @@ class OllamaDocumentProcessor(DataComponent):
         expected_embedding_size = None
 
         for i, doc in enumerate(tqdm(output, desc="Processing documents for Ollama embeddings")):
+            report_progress("embedding", i, len(output))
             try:
                 # Get embedding for a single document
                 result = self.embedder(input=doc.text)
@@ -101,5 +104,6 @@ class OllamaDocumentProcessor(DataComponent):
                 file_path = getattr(doc, 'meta_data', {}).get('file_path', f'document_{i}')
                 logger.error(f"Error processing document '{file_path}': {e}, skipping")
 
+        report_progress("embedding", len(output), len(output))
         logger.info(f"Successfully processed {len(successful_docs)}/{len(output)} documents with consistent embeddings")
         return successful_docs
\ No newline at end of file
@@ -16,6 +16,9 @@ from typing import (
 )
 import re
 import httpx
+from dataclasses import dataclass
+
+import numpy as np
 
 import logging
 import backoff
@@ -34,7 +37,6 @@ from openai import (
     InternalServerError,
     RateLimitError,
     UnprocessableEntityError,
-    BadRequestError,
 )
 from openai.types import (
     Completion,
@@ -50,6 +52,8 @@ from adalflow.core.types import (
     TokenLogProb,
     CompletionUsage,
     GeneratorOutput,
+    Embedding,
+    Usage,
 )
 from adalflow.components.model_client.utils import parse_embedding_response
 
@@ -57,6 +61,36 @@ log = logging.getLogger(__name__)
 T = TypeVar("T")
 
 
+def decode_base64_embeddings(encoded: Sequence[Union[str, List[float]]]) -> np.ndarray:
+    """
+    Decode a batch of embeddings into one (n, d) float32 matrix.
+
+    Base64 items are little-endian float32 buffers and are joined and read with a single
+    ``np.frombuffer``. Providers that ignore ``encoding_format`` and send float lists are
+    converted as-is.
+    """
+    if not encoded:
+        return np.zeros((0, 0), dtype=np.float32)
+    if not all(isinstance(item, str) for item in encoded):
+        return np.array(
+            [np.frombuffer(base64.b64decode(item), dtype="<f4") if isinstance(item, str) else item for item in encoded],
+            dtype=np.float32,
+        )
+    buffer = b"".join(base64.b64decode(item) for item in encoded)
+    if len(buffer) % (4 * len(encoded)):
+        raise ValueError("Base64 embeddings have inconsistent dimensions")
+    return np.frombuffer(buffer, dtype="<f4").reshape(len(encoded), -1).astype(np.float32, copy=False)
+
+
+@dataclass
+class EmbeddingMatrixResponse:
+    """Embedding response decoded into a single matrix, one row per input."""
+
+    embeddings: np.ndarray
+    model: str
+    usage: Usage
+
+
 # completion parsing functions and you can combine them into one singple chat completion parser
 def get_first_message_content(completion: ChatCompletion) -> str:
     r"""When we only need the content of the first message.
@@ -201,6 +235,7 @@ class OpenAIClient(ModelClient):
         base_url: Optional[str] = None,
         env_base_url_name: str = "OPENAI_BASE_URL",
         env_api_key_name: str = "OPENAI_API_KEY",
+        max_retries: Optional[int] = None,
     ):
         r"""It is recommended to set the OPENAI_API_KEY environment variable instead of passing it as an argument.
 
@@ -208,9 +243,12 @@ class OpenAIClient(ModelClient):
             api_key (Optional[str], optional): OpenAI API key. Defaults to None.
             base_url (str): The API base URL to use when initializing the client.
             env_api_key_name (str): The environment variable name for the API key. Defaults to `"OPENAI_API_KEY"`.
+            max_retries (Optional[int], optional): Retries of the OpenAI SDK client, its default if None.
+                Ingestion uses 0 so that its throughput controller owns every retry.
         """
         super().__init__()
         self._api_key = api_key
+        self._max_retries = max_retries
         self._env_api_key_name = env_api_key_name
         self._env_base_url_name = env_base_url_name
         self.base_url = base_url or os.getenv(
@@ -222,7 +260,6 @@ class OpenAIClient(ModelClient):
             chat_completion_parser or get_first_message_content
         )
         self._input_type = input_type
-        self._api_kwargs = {}  # add api kwargs when the OpenAI Client is called
 
     def init_sync_client(self):
         api_key = self._api_key or os.getenv(self._env_api_key_name)
@@ -243,9 +280,13 @@ class OpenAIClient(ModelClient):
                 http_client=httpx.Client(transport=transport),
                 api_key=api_key,
                 base_url=self.base_url,
+                **self._retry_kwargs(),
             )
         else:
-            return OpenAI(api_key=api_key, base_url=self.base_url)
+            return OpenAI(api_key=api_key, base_url=self.base_url, **self._retry_kwargs())
+
+    def _retry_kwargs(self) -> Dict[str, Any]:
+        return {} if self._max_retries is None else {"max_retries": self._max_retries}
 
     def init_async_client(self):
         api_key = self._api_key or os.getenv(self._env_api_key_name)
@@ -265,9 +306,10 @@ class OpenAIClient(ModelClient):
                 http_client=httpx.AsyncClient(transport=transport),
                 api_key=api_key,
                 base_url=self.base_url,
+                **self._retry_kwargs(),
             )
         else:
-            return AsyncOpenAI(api_key=api_key, base_url=self.base_url)
+            return AsyncOpenAI(api_key=api_key, base_url=self.base_url, **self._retry_kwargs())
 
     # def _parse_chat_completion(self, completion: ChatCompletion) -> "GeneratorOutput":
     #     # TODO: raw output it is better to save the whole completion as a source of truth instead of just the message
@@ -286,9 +328,11 @@ class OpenAIClient(ModelClient):
         completion: Union[ChatCompletion, Generator[ChatCompletionChunk, None, None]],
     ) -> "GeneratorOutput":
         """Parse the completion, and put it into the raw_response."""
-        log.debug(f"completion: {completion}, parser: {self.chat_completion_parser}")
+        # Pooled clients are shared by concurrent requests, so the parser is chosen per completion
+        parser = handle_streaming_response if isinstance(completion, Stream) else self.chat_completion_parser
+        log.debug(f"completion: {completion}, parser: {parser}")
         try:
-            data = self.chat_completion_parser(completion)
+            data = parser(completion)
         except Exception as e:
             log.error(f"Error parsing the completion: {e}")
             return GeneratorOutput(data=None, error=str(e), raw_response=completion)
@@ -327,11 +371,32 @@ class OpenAIClient(ModelClient):
         Should be called in ``Embedder``.
         """
         try:
+            if isinstance(response, EmbeddingMatrixResponse):
+                return EmbedderOutput(
+                    data=[Embedding(embedding=row, index=i) for i, row in enumerate(response.embeddings)],
+                    model=response.model,
+                    usage=response.usage,
+                    raw_response=response,
+                )
             return parse_embedding_response(response)
         except Exception as e:
             log.error(f"Error parsing the embedding response: {e}")
             return EmbedderOutput(data=[], error=str(e), raw_response=response)
 
+    @staticmethod
+    def _to_embedding_matrix(response: CreateEmbeddingResponse) -> EmbeddingMatrixResponse:
+        """Decode a base64 embedding response into an EmbeddingMatrixResponse ordered by input index."""
+        items = sorted(response.data, key=lambda item: item.index)
+        usage = getattr(response, "usage", None)
+        return EmbeddingMatrixResponse(
+            embeddings=decode_base64_embeddings([item.embedding for item in items]),
+            model=response.model,
+            usage=Usage(
+                prompt_tokens=getattr(usage, "prompt_tokens", 0) or 0,
+                total_tokens=getattr(usage, "total_tokens", 0) or 0,
+            ),
+        )
+
     def convert_inputs_to_api_kwargs(
         self,
         input: Optional[Any] = None,
@@ -462,6 +527,16 @@ class OpenAIClient(ModelClient):
             log.error(f"Error parsing image generation response: {e}")
             return GeneratorOutput(data=None, error=str(e), raw_response=str(response))
 
+    def embed_once(self, api_kwargs: Dict = {}):
+        """
+        Send one embedding request, without the retries of call(), so callers that pace their
+        own requests (see api.embedding_throughput.AdaptiveBatchEmbedder) see every 429 and 5xx.
+        """
+        response = self.sync_client.embeddings.create(**api_kwargs)
+        if api_kwargs.get("encoding_format") == "base64":
+            return self._to_embedding_matrix(response)
+        return response
+
     @backoff.on_exception(
         backoff.expo,
         (
@@ -469,7 +544,6 @@ class OpenAIClient(ModelClient):
             InternalServerError,
             RateLimitError,
             UnprocessableEntityError,
-            BadRequestError,
         ),
         max_time=5,
     )
@@ -478,13 +552,11 @@ class OpenAIClient(ModelClient):
         kwargs is the combined input and model_kwargs.  Support streaming call.
         """
         log.info(f"api_kwargs: {api_kwargs}")
-        self._api_kwargs = api_kwargs
         if model_type == ModelType.EMBEDDER:
-            return self.sync_client.embeddings.create(**api_kwargs)
+            return self.embed_once(api_kwargs)
         elif model_type == ModelType.LLM:
             if "stream" in api_kwargs and api_kwargs.get("stream", False):
                 log.debug("streaming call")
-                self.chat_completion_parser = handle_streaming_response
                 return self.sync_client.chat.completions.create(**api_kwargs)
             else:
                 log.debug("non-streaming call converted to streaming")
@@ -552,7 +624,6 @@ class OpenAIClient(ModelClient):
             InternalServerError,
             RateLimitError,
             UnprocessableEntityError,
-            BadRequestError,
         ),
         max_time=5,
     )
@@ -562,12 +633,13 @@ class OpenAIClient(ModelClient):
         """
         kwargs is the combined input and model_kwargs
         """
-        # store the api kwargs in the client
-        self._api_kwargs = api_kwargs
         if self.async_client is None:
             self.async_client = self.init_async_client()
         if model_type == ModelType.EMBEDDER:
-            return await self.async_client.embeddings.create(**api_kwargs)
+            response = await self.async_client.embeddings.create(**api_kwargs)
+            if api_kwargs.get("encoding_format") == "base64":
+                return self._to_embedding_matrix(response)
+            return response
         elif model_type == ModelType.LLM:
             return await self.async_client.chat.completions.create(**api_kwargs)
         elif model_type == ModelType.IMAGE_GENERATION:
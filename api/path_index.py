@@ -0,0 +1,351 @@
+import json
+import logging
+import os
+import posixpath
+import re
+import sys
+from collections import defaultdict
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# File of an index directory mapping file paths and symbols to chunk rows
+PATH_INDEX_FILE = "paths.json"
+
+# Top-level definitions, matched at the start of a line so nested and indented ones are skipped
+_SYMBOL_PATTERNS = {
+    "python": [r"^(?:async\s+)?def\s+(\w+)", r"^class\s+(\w+)"],
+    "javascript": [
+        r"^(?:export\s+)?(?:default\s+)?(?:async\s+)?function\s*\*?\s*(\w+)",
+        r"^(?:export\s+)?(?:default\s+)?(?:abstract\s+)?class\s+(\w+)",
+        r"^(?:export\s+)?(?:const|let|var)\s+(\w+)\s*=",
+        r"^(?:export\s+)?(?:declare\s+)?(?:interface|type|enum)\s+(\w+)",
+    ],
+    "go": [r"^func\s+(?:\([^)]*\)\s*)?(\w+)", r"^type\s+(\w+)"],
+    "rust": [r"^(?:pub(?:\([^)]*\))?\s+)?(?:async\s+)?(?:fn|struct|enum|trait|mod)\s+(\w+)"],
+    "jvm": [
+        r"^(?:(?:public|private|protected|internal|abstract|final|sealed|static|open|data)\s+)*"
+        r"(?:class|interface|enum|record|object)\s+(\w+)",
+    ],
+    "c": [r"^(?:struct|class|enum|union)\s+(\w+)\s*[{:]", r"^[\w:<>*&][\w:<>*& \t]*?[ \t*&](\w+)[ \t]*\([^;\n]*$"],
+}
+
+# Import statements, each capturing the imported module or path
+_IMPORT_PATTERNS = {
+    "python": [r"^\s*from\s+(\.*[\w.]*)\s+import\b", r"^\s*import\s+([\w.]+)"],
+    "javascript": [
+        r"^\s*(?:import|export)\s[^'\"]*?from\s+['\"]([^'\"]+)['\"]",
+        r"^\s*import\s+['\"]([^'\"]+)['\"]",
+        r"\brequire\(\s*['\"]([^'\"]+)['\"]\s*\)",
+        r"\bimport\(\s*['\"]([^'\"]+)['\"]\s*\)",
+    ],
+    "go": [r"^\s*(?:import\s+)?(?:\w+\s+)?\"([\w./-]+)\"\s*$"],
+    "rust": [r"^\s*(?:pub\s+)?(?:use|mod)\s+((?:crate|super|self)?(?:::)?[\w:]+)"],
+    "jvm": [r"^\s*import\s+(?:static\s+)?([\w.]+?)(?:\.\*)?\s*;?\s*$"],
+    "c": [r"^\s*#\s*include\s+\"([^\"]+)\""],
+}
+
+_LANGUAGES = {
+    ".py": "python", ".pyi": "python",
+    ".js": "javascript", ".jsx": "javascript", ".mjs": "javascript", ".cjs": "javascript",
+    ".ts": "javascript", ".tsx": "javascript", ".vue": "javascript", ".svelte": "javascript",
+    ".go": "go",
+    ".rs": "rust",
+    ".java": "jvm", ".kt": "jvm", ".scala": "jvm", ".cs": "jvm", ".swift": "jvm",
+    ".c": "c", ".h": "c", ".cc": "c", ".cpp": "c", ".hpp": "c", ".cxx": "c",
+}
+
+# Extensions tried when an import names a module without one
+_MODULE_EXTENSIONS = {
+    "python": [".py", "/__init__.py", ".pyi"],
+    "javascript": [".ts", ".tsx", ".js", ".jsx", ".mjs", ".cjs", ".vue", ".svelte",
+                   "/index.ts", "/index.tsx", "/index.js", "/index.jsx"],
+    "rust": [".rs", "/mod.rs"],
+    "jvm": [".java", ".kt", ".scala", ".cs"],
+}
+
+_COMPILED_SYMBOLS = {language: [re.compile(p, re.MULTILINE) for p in patterns] for language, patterns in _SYMBOL_PATTERNS.items()}
+_COMPILED_IMPORTS = {language: [re.compile(p, re.MULTILINE) for p in patterns] for language, patterns in _IMPORT_PATTERNS.items()}
+
+_C_KEYWORDS = {"if", "for", "while", "switch", "return", "sizeof", "else", "do"}
+
+
+def normalize_path(file_path: Optional[str]) -> str:
+    """Normalize a repository-relative file path to forward slashes without a leading ./ or /."""
+    path = (file_path or "").replace("\\", "/").strip()
+    while path.startswith("./"):
+        path = path[2:]
+    return path.strip("/")
+
+
+def file_language(file_path: str) -> Optional[str]:
+    """Return the symbol and import dialect of a file, from its extension."""
+    return _LANGUAGES.get(os.path.splitext(file_path)[1].lower())
+
+
+def extract_symbols(text: str, language: Optional[str]) -> List[str]:
+    """Return the names of the top-level functions, classes and types defined in a chunk."""
+    names = []
+    for pattern in _COMPILED_SYMBOLS.get(language, []):
+        names.extend(name for name in pattern.findall(text) if name not in _C_KEYWORDS)
+    return list(dict.fromkeys(names))
+
+
+def extract_imports(text: str, language: Optional[str]) -> List[str]:
+    """Return the modules or paths imported by a chunk, as written in the source."""
+    specifiers = []
+    for pattern in _COMPILED_IMPORTS.get(language, []):
+        specifiers.extend(pattern.findall(text))
+    return list(dict.fromkeys(specifiers))
+
+
+class _ModuleResolver:
+    """Resolves import specifiers to the indexed files they refer to."""
+
+    def __init__(self, file_paths: Iterable[str]):
+        self.files = set(file_paths)
+        # Every path suffix, without extension, so "api.rag" finds "backend/api/rag.py"
+        self.by_suffix: Dict[str, Set[str]] = defaultdict(set)
+        self.by_directory: Dict[str, Set[str]] = defaultdict(set)
+        for path in self.files:
+            stem = os.path.splitext(path)[0]
+            if stem.endswith("/__init__") or stem.endswith("/index") or stem.endswith("/mod"):
+                self._add_suffixes(stem.rsplit("/", 1)[0], path)
+            self._add_suffixes(stem, path)
+            parts = path.split("/")
+            for start in range(len(parts) - 1):
+                self.by_directory["/".join(parts[start:-1])].add(path)
+
+    def _add_suffixes(self, stem: str, path: str) -> None:
+        parts = stem.split("/")
+        for start in range(len(parts)):
+            self.by_suffix["/".join(parts[start:])].add(path)
+
+    def _unique(self, candidates: Set[str], importer: str) -> Optional[str]:
+        candidates = candidates - {importer}
+        return next(iter(candidates)) if len(candidates) == 1 else None
+
+    def resolve(self, specifier: str, importer: str, language: str) -> List[str]:
+        importer_dir = posixpath.dirname(importer)
+        if language == "python":
+            dots = len(specifier) - len(specifier.lstrip("."))
+            module = specifier[dots:].replace(".", "/")
+            if dots:
+                base = importer_dir
+                for _ in range(dots - 1):
+                    base = posixpath.dirname(base)
+                return self._with_extensions(posixpath.join(base, module) if module else base, language)
+            resolved = self._unique(self.by_suffix.get(module, set()), importer)
+            return [resolved] if resolved else []
+        if language == "javascript":
+            if not specifier.startswith("."):
+                # Package imports, and aliases such as "@/components/x" resolved by suffix
+                alias = specifier.split("/", 1)[1] if specifier.startswith(("@/", "~/")) else None
+                resolved = self._unique(self.by_suffix.get(os.path.splitext(alias)[0], set()), importer) if alias else None
+                return [resolved] if resolved else []
+            return self._with_extensions(posixpath.normpath(posixpath.join(importer_dir, specifier)), language)
+        if language == "c":
+            local = posixpath.normpath(posixpath.join(importer_dir, specifier))
+            if local in self.files:
+                return [local]
+            resolved = self._unique(self.by_suffix.get(os.path.splitext(specifier)[0], set()), importer)
+            return [resolved] if resolved else []
+        if language == "go":
+            # Packages are directories; match the longest directory suffix of the import path
+            parts = specifier.split("/")
+            for start in range(len(parts)):
+                files = self.by_directory.get("/".join(parts[start:]))
+                if files and len(parts) > 1:
+                    return sorted(path for path in files - {importer} if path.endswith(".go"))
+            return []
+        if language == "rust":
+            module = specifier.split("::")
+            if module[0] in ("crate", "super", "self"):
+                module = module[1:]
+            for end in range(len(module), 0, -1):
+                resolved = self._unique(self.by_suffix.get("/".join(module[:end]), set()), importer)
+                if resolved:
+                    return [resolved]
+            return []
+        if language == "jvm":
+            resolved = self._unique(self.by_suffix.get(specifier.replace(".", "/"), set()), importer)
+            return [resolved] if resolved else []
+        return []
+
+    def _with_extensions(self, module_path: str, language: str) -> List[str]:
+        module_path = module_path.lstrip("/")
+        if module_path in self.files:
+            return [module_path]
+        for extension in _MODULE_EXTENSIONS.get(language, []):
+            if module_path + extension in self.files:
+                return [module_path + extension]
+        return []
+
+
+class PathIndex:
+    """
+    Lookup of the chunks of an index by file path and by top-level symbol, with the import
+    graph between indexed files.
+
+    Built from the chunk texts when the index is written, so file-focused requests find the
+    chunks of a file and of the files it imports or is imported by without an embedding call.
+    """
+
+    def __init__(
+        self,
+        files: Dict[str, List[int]],
+        symbols: Dict[str, List[int]],
+        imports: Dict[str, List[str]],
+    ):
+        self.files = files
+        self.symbols = symbols
+        self.imports = imports
+        self.importers: Dict[str, List[str]] = defaultdict(list)
+        for importer, imported in imports.items():
+            for path in imported:
+                self.importers[path].append(importer)
+        self._row_symbols: Optional[Dict[int, List[str]]] = None
+
+    @classmethod
+    def build(cls, chunks: Iterable[Tuple[Optional[str], str]]) -> "PathIndex":
+        """
+        Build the index from the (file path, text) of every chunk, in row order.
+
+        Args:
+            chunks: The file path and text of each chunk; row i is the i-th pair
+
+        Returns:
+            PathIndex: The lookup index
+        """
+        files: Dict[str, List[int]] = defaultdict(list)
+        symbols: Dict[str, List[int]] = defaultdict(list)
+        specifiers: Dict[str, List[str]] = defaultdict(list)
+        for row, (file_path, text) in enumerate(chunks):
+            path = normalize_path(file_path)
+            if not path:
+                continue
+            files[path].append(row)
+            language = file_language(path)
+            if language is None or not text:
+                continue
+            for name in extract_symbols(text, language):
+                symbols[name].append(row)
+            specifiers[path].extend(extract_imports(text, language))
+
+        resolver = _ModuleResolver(files)
+        imports = {}
+        for path, file_specifiers in specifiers.items():
+            language = file_language(path)
+            imported = []
+            for specifier in dict.fromkeys(file_specifiers):
+                imported.extend(resolver.resolve(specifier, path, language))
+            imported = [target for target in dict.fromkeys(imported) if target != path]
+            if imported:
+                imports[path] = imported
+        return cls(dict(files), dict(symbols), imports)
+
+    def save(self, path: str) -> None:
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump({"files": self.files, "symbols": self.symbols, "imports": self.imports}, f)
+
+    @classmethod
+    def load(cls, path: str) -> "PathIndex":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        return cls(data.get("files", {}), data.get("symbols", {}), data.get("imports", {}))
+
+    @property
+    def nbytes(self) -> int:
+        """Approximate memory used by the path, symbol and import maps."""
+        return sum(
+            sys.getsizeof(mapping) + sum(
+                sys.getsizeof(key) + sys.getsizeof(values) + sum(sys.getsizeof(value) for value in values)
+                for key, values in mapping.items()
+            )
+            for mapping in (self.files, self.symbols, self.imports, self.importers)
+        )
+
+    def resolve_file(self, file_path: str) -> Optional[str]:
+        """Return the indexed path of a file, also matching a unique path suffix such as "src/app.py"."""
+        path = normalize_path(file_path)
+        if not path:
+            return None
+        if path in self.files:
+            return path
+        matches = [indexed for indexed in self.files if indexed.endswith("/" + path)]
+        return matches[0] if len(matches) == 1 else None
+
+    def file_rows(self, file_path: str) -> List[int]:
+        """Return the rows of the chunks of a file, in order."""
+        path = self.resolve_file(file_path)
+        return list(self.files[path]) if path else []
+
+    def symbol_rows(self, name: str) -> List[int]:
+        """Return the rows of the chunks defining a top-level symbol."""
+        return list(self.symbols.get(name, []))
+
+    def related_files(self, file_path: str) -> List[str]:
+        """Return the files imported by a file, then the files importing it."""
+        path = self.resolve_file(file_path)
+        if not path:
+            return []
+        related = list(self.imports.get(path, [])) + list(self.importers.get(path, []))
+        return [other for other in dict.fromkeys(related) if other != path]
+
+    def defined_symbols(self, row: int) -> List[str]:
+        """Return the top-level symbols defined in a chunk."""
+        if self._row_symbols is None:
+            row_symbols: Dict[int, List[str]] = defaultdict(list)
+            for name, rows in self.symbols.items():
+                for symbol_row in rows:
+                    row_symbols[symbol_row].append(name)
+            self._row_symbols = row_symbols
+        return self._row_symbols.get(row, [])
+
+    def lookup(
+        self,
+        file_path: str,
+        limit: int,
+        referenced_names: Optional[Set[str]] = None,
+        allowed: Optional[Any] = None,
+    ) -> Tuple[List[int], List[int]]:
+        """
+        Select the chunks for a file-focused request.
+
+        The chunks of the file come first, then chunks of related files taken round-robin so
+        each related file is represented; related files get at least half of the limit when
+        they have that many chunks. Within a related file, chunks defining a symbol in
+        referenced_names (such as the identifiers used by the focused file) come first.
+
+        Args:
+            file_path: The focused file
+            limit: Maximum number of chunks
+            referenced_names: Identifiers whose definitions should be preferred
+            allowed: Optional boolean mask over rows; rows outside it are skipped
+
+        Returns:
+            Tuple[List[int], List[int]]: The rows of the file's chunks and of related chunks
+        """
+        def is_allowed(row: int) -> bool:
+            return allowed is None or bool(allowed[row])
+
+        queues = []
+        for other in self.related_files(file_path):
+            rows = [row for row in self.files.get(other, []) if is_allowed(row)]
+            if referenced_names:
+                rows.sort(key=lambda row: not any(name in referenced_names for name in self.defined_symbols(row)))
+            if rows:
+                queues.append(rows)
+
+        # The file's own chunks leave at least half of the budget to related files
+        own_limit = limit - min(sum(len(rows) for rows in queues), limit // 2)
+        own = [row for row in self.file_rows(file_path) if is_allowed(row)][:own_limit]
+        related = []
+        depth = 0
+        while len(own) + len(related) < limit and any(depth < len(rows) for rows in queues):
+            for rows in queues:
+                if depth < len(rows) and len(own) + len(related) < limit:
+                    related.append(rows[depth])
+            depth += 1
+        return own, related
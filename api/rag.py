@@ -1,10 +1,13 @@
 import logging
+import os
 import re
 from dataclasses import dataclass
-from typing import Any, List, Tuple, Dict
+from functools import lru_cache
+from typing import Any, List, Optional, Tuple, Dict, Union
 from uuid import uuid4
 
 import adalflow as adal
+from adalflow.core.types import Embedding, EmbedderOutput, RetrieverOutput
 
 from api.tools.embedder import get_embedder
 
@@ -37,9 +40,24 @@ class CustomConversation:
         self.dialog_turns.append(dialog_turn)
 
 # Import other adalflow components
-from adalflow.components.retriever.faiss_retriever import FAISSRetriever
+import numpy as np
 from api.config import configs
+from api.client_pool import client_pool, get_client
 from api.data_pipeline import DatabaseManager
+from api.executors import run_in_pool
+from api.index_jobs import report_progress
+from api.index_store import ChunkStore
+from api.file_filters import file_filters_key, is_default_filters, resolve_file_filters
+from api.adaptive_top_k import adaptive_cutoff, adaptive_top_k_stats, get_adaptive_top_k_config
+from api.file_vectors import coarse_search_stats, get_coarse_search_config
+from api.metadata_filters import metadata_filters_key, resolve_metadata_filters
+from api.lexical_index import extract_identifiers, get_lexical_config, lexical_search_stats, reciprocal_rank_fusion
+from api.retrieval_cache import configure_caches, normalize_query, retrieval_result_cache
+from api.retriever_registry import PreparedIndex, configure_registry, retriever_registry
+from api.storage_manager import get_storage_manager
+from api.ann_index import AnnIndex, build_vector_index, load_vector_index, vector_index_matches
+from api.vector_index import VectorIndex
+from api.vector_retriever import VectorRetriever
 
 # Configure logging
 logger = logging.getLogger(__name__)
@@ -47,6 +65,13 @@ logger = logging.getLogger(__name__)
 # Maximum token limit for embedding models
 MAX_INPUT_TOKENS = 7500  # Safe threshold below 8192 token limit
 
+# Identifiers in a file's code, matched against the symbols defined by the files related to it
+IDENTIFIER_PATTERN = re.compile(r"\b[A-Za-z_][A-Za-z0-9_]{2,}\b")
+
+# Size the shared query embedding and retrieval result caches, and the prepared index registry, from embedder.json
+configure_caches(configs.get("retrieval_cache"))
+configure_registry(configs.get("retrieval_cache"))
+
 class Memory(adal.core.component.DataComponent):
     """Simple conversation management with a list of dialog turns."""
 
@@ -203,6 +228,27 @@ class RAGAnswer(adal.DataClass):
 
     __output_fields__ = ["rationale", "answer"]
 
+
+@lru_cache(maxsize=1)
+def _rag_output_parser() -> Tuple[adal.DataClassParser, str]:
+    """The output parser of RAGAnswer and its format instructions, built once and shared by every RAG."""
+    data_parser = adal.DataClassParser(data_class=RAGAnswer, return_data_class=True)
+
+    # Format instructions to ensure proper output structure
+    format_instructions = data_parser.get_output_format_str() + """
+
+IMPORTANT FORMATTING RULES:
+1. DO NOT include your thinking or reasoning process in the output
+2. Provide only the final, polished answer
+3. DO NOT include ```markdown fences at the beginning or end of your answer
+4. DO NOT wrap your response in any kind of fences
+5. Start your response directly with the content
+6. The content will already be rendered as markdown
+7. Do not use backslashes before special characters like [ ] { } in your answer
+8. When listing tags or similar items, write them as plain text without escape characters
+9. For pipe characters (|) in text, write them directly without escaping them"""
+    return data_parser, format_instructions
+
 class RAG(adal.Component):
     """RAG with one repo.
     If you want to load a new repos, call prepare_retriever(repo_url_or_path) first."""
@@ -222,12 +268,13 @@ class RAG(adal.Component):
         self.model = model
 
         # Import the helper functions
-        from api.config import get_embedder_config, is_ollama_embedder
+        from api.config import get_embedder_config, get_embedder_signature, is_ollama_embedder
 
         # Determine if we're using Ollama embedder based on configuration
         self.is_ollama_embedder = is_ollama_embedder()
+        self.embedder_signature = get_embedder_signature()
 
-        # Check if Ollama model exists before proceeding
+        # Check if Ollama model exists before proceeding; the result is cached for the process
         if self.is_ollama_embedder:
             from api.ollama_patch import check_ollama_model_exists
             from api.config import get_embedder_config
@@ -235,251 +282,438 @@ class RAG(adal.Component):
             embedder_config = get_embedder_config()
             if embedder_config and embedder_config.get("model_kwargs", {}).get("model"):
                 model_name = embedder_config["model_kwargs"]["model"]
-                if not check_ollama_model_exists(model_name):
+                availability_key = ("ollama", os.getenv("OLLAMA_HOST"), model_name)
+                if not client_pool.is_model_available(availability_key, lambda: check_ollama_model_exists(model_name)):
                     raise Exception(f"Ollama model '{model_name}' not found. Please run 'ollama pull {model_name}' to install it.")
 
         # Initialize components
         self.memory = Memory()
         self.embedder = get_embedder()
 
-        # Patch: ensure query embedding is always single string for Ollama
+        # Patch: Ollama embeds a single string per call, so query batches are embedded one string at a time
         def single_string_embedder(query):
-            # Accepts either a string or a list, always returns embedding for a single string
-            if isinstance(query, list):
-                if len(query) != 1:
-                    raise ValueError("Ollama embedder only supports a single string")
-                query = query[0]
-            return self.embedder(input=query)
+            if not isinstance(query, list):
+                return self.embedder(input=query)
+            outputs = [self.embedder(input=text) for text in query]
+            errors = [output.error for output in outputs if output.error]
+            return EmbedderOutput(
+                data=[
+                    Embedding(embedding=output.data[0].embedding, index=i)
+                    for i, output in enumerate(outputs) if output.data
+                ],
+                error="; ".join(errors) or None,
+                input=query,
+            )
 
         # Use single string embedder for Ollama, regular embedder for others
         self.query_embedder = single_string_embedder if self.is_ollama_embedder else self.embedder
 
         self.initialize_db_manager()
-
-        # Set up the output parser
-        data_parser = adal.DataClassParser(data_class=RAGAnswer, return_data_class=True)
-
-        # Format instructions to ensure proper output structure
-        format_instructions = data_parser.get_output_format_str() + """
-
-IMPORTANT FORMATTING RULES:
-1. DO NOT include your thinking or reasoning process in the output
-2. Provide only the final, polished answer
-3. DO NOT include ```markdown fences at the beginning or end of your answer
-4. DO NOT wrap your response in any kind of fences
-5. Start your response directly with the content
-6. The content will already be rendered as markdown
-7. Do not use backslashes before special characters like [ ] { } in your answer
-8. When listing tags or similar items, write them as plain text without escape characters
-9. For pipe characters (|) in text, write them directly without escaping them"""
-
-        # Get model configuration based on provider and model
-        from api.config import get_model_config
-        generator_config = get_model_config(self.provider, self.model)
-
-        # Set up the main generator
-        self.generator = adal.Generator(
-            template=RAG_TEMPLATE,
-            prompt_kwargs={
-                "output_format_str": format_instructions,
-                "conversation_history": self.memory(),
-                "system_prompt": system_prompt,
-                "contexts": None,
-            },
-            model_client=generator_config["model_client"](),
-            model_kwargs=generator_config["model_kwargs"],
-            output_processors=data_parser,
-        )
+        self._generator = None
+
+    @property
+    def generator(self) -> adal.Generator:
+        """The answer generator, built on first use with the pooled provider client."""
+        if self._generator is None:
+            from api.config import get_model_config
+            generator_config = get_model_config(self.provider, self.model)
+            data_parser, format_instructions = _rag_output_parser()
+            self._generator = adal.Generator(
+                template=RAG_TEMPLATE,
+                prompt_kwargs={
+                    "output_format_str": format_instructions,
+                    "conversation_history": self.memory(),
+                    "system_prompt": system_prompt,
+                    "contexts": None,
+                },
+                model_client=get_client(generator_config["model_client"]),
+                model_kwargs=generator_config["model_kwargs"],
+                output_processors=data_parser,
+            )
+        return self._generator
 
 
     def initialize_db_manager(self):
         """Initialize the database manager with local storage"""
         self.db_manager = DatabaseManager()
         self.transformed_docs = []
+        self.prepared_index = None
+        self.file_filters = None
+        self.filter_mask = None
 
-    def _validate_and_filter_embeddings(self, documents: List) -> List:
+    def prepare_retriever(self, repo_url_or_path: str, type: str = "github", access_token: str = None,
+                      excluded_dirs: List[str] = None, excluded_files: List[str] = None,
+                      included_dirs: List[str] = None, included_files: List[str] = None):
         """
-        Validate embeddings and filter out documents with invalid or mismatched embedding sizes.
+        Prepare the retriever for a repository.
+        Will load database from local storage if available.
+
+        The repository is indexed once with the default file filters. The filters given here
+        are turned into a mask over the chunks and applied at search time, so requests with
+        different filters share the same index.
 
         Args:
-            documents: List of documents with embeddings
+            repo_url_or_path: URL or local path to the repository
+            access_token: Optional access token for private repositories
+            excluded_dirs: Optional list of directories to exclude from retrieval
+            excluded_files: Optional list of file patterns to exclude from retrieval
+            included_dirs: Optional list of directories to include exclusively
+            included_files: Optional list of file patterns to include exclusively
+        """
+        self.initialize_db_manager()
+        self.repo_url_or_path = repo_url_or_path
+        # The checkout and index touched while preparing are not evicted by concurrent requests
+        # until the index is in the registry, which keeps it on disk while it is served
+        with get_storage_manager().in_use():
+            store = self.db_manager.prepare_database(
+                repo_url_or_path,
+                type,
+                access_token,
+                is_ollama_embedder=self.is_ollama_embedder,
+            )
+            report_progress("loading", total=len(store))
+
+            # Indexes are prepared once per process and shared by every request for the repository
+            registry_key = (self.db_manager.repo_paths["save_index_dir"], store.manifest.get("version"))
+            # A registry hit returns here; loading an index takes a worker of the "index" pool
+            prepared = retriever_registry.get_or_load(
+                registry_key, lambda: run_in_pool("index", self._prepare_index, store, registry_key)
+            )
+        self.prepared_index = prepared
+        self.transformed_docs = prepared.documents
+
+        try:
+            # Use the appropriate embedder for retrieval
+            retrieve_embedder = self.query_embedder if self.is_ollama_embedder else self.embedder
+            self.retriever = VectorRetriever(
+                index=prepared.vector_index,
+                embedder=retrieve_embedder,
+                embedder_key=self.embedder_signature,
+                **configs["retriever"],
+            )
+        except Exception as e:
+            logger.error(f"Error creating vector retriever: {str(e)}")
+            raise
+
+        self.file_filters = resolve_file_filters(excluded_dirs, excluded_files, included_dirs, included_files)
+        self.filter_mask = None
+        if not is_default_filters(self.file_filters):
+            self.filter_mask = prepared.filter_mask(self.file_filters)
+            logger.info(f"File filters keep {int(self.filter_mask.sum())}/{len(self.filter_mask)} chunks")
+
+    def _prepare_index(self, store: ChunkStore, key) -> PreparedIndex:
+        """
+        Load the vector index of a repository index, ready to search.
+
+        Embeddings are validated once, when the index is written: the stored (N, d) float32
+        matrix has one row per chunk, in chunk row order, so nothing is checked per document here.
+
+        Args:
+            store: The repository index returned by the database manager
+            key: The registry key of the index
 
         Returns:
-            List of documents with valid embeddings of consistent size
+            PreparedIndex: The chunks and vector index, with an estimate of their memory use
         """
-        if not documents:
-            logger.warning("No documents provided for embedding validation")
-            return []
+        if not len(store):
+            raise ValueError("No valid documents with embeddings found. Cannot create retriever.")
+        logger.info(f"Using {len(store)} documents ({store.manifest.get('dimensions')}-dimensional embeddings) for retrieval")
 
-        valid_documents = []
-        embedding_sizes = {}
+        vector_index = self._load_or_build_vector_index(store)
+        logger.info(f"Vector index ready ({len(vector_index)} vectors, {vector_index.engine} engine, stored as {vector_index.dtype})")
 
-        # First pass: collect all embedding sizes and count occurrences
-        for i, doc in enumerate(documents):
-            if not hasattr(doc, 'vector') or doc.vector is None:
-                logger.warning(f"Document {i} has no embedding vector, skipping")
-                continue
+        # Chunk texts stay on disk until retrieved; the lookup structures of the store are added
+        # to the registry's memory estimate as searches load them, see PreparedIndex.memory_bytes
+        return PreparedIndex(key=key, documents=store, vector_index=vector_index, nbytes=vector_index.nbytes)
 
-            try:
-                if isinstance(doc.vector, list):
-                    embedding_size = len(doc.vector)
-                elif hasattr(doc.vector, 'shape'):
-                    embedding_size = doc.vector.shape[0] if len(doc.vector.shape) == 1 else doc.vector.shape[-1]
-                elif hasattr(doc.vector, '__len__'):
-                    embedding_size = len(doc.vector)
-                else:
-                    logger.warning(f"Document {i} has invalid embedding vector type: {type(doc.vector)}, skipping")
-                    continue
+    def _load_or_build_vector_index(self, store: ChunkStore) -> Union[VectorIndex, AnnIndex]:
+        """
+        Load the vector search index saved in the repository index, or build it from the
+        stored embeddings if it is missing, does not match the chunks or was built with
+        another engine or parameters than configured.
 
-                if embedding_size == 0:
-                    logger.warning(f"Document {i} has empty embedding vector, skipping")
-                    continue
+        Args:
+            store: The repository index
 
-                embedding_sizes[embedding_size] = embedding_sizes.get(embedding_size, 0) + 1
+        Returns:
+            Union[VectorIndex, AnnIndex]: The index whose row i is the embedding of chunk i
+        """
+        vector_store_config = configs.get("vector_store", {})
+        vectors_dir = store.vectors_dir
 
-            except Exception as e:
-                logger.warning(f"Error checking embedding size for document {i}: {str(e)}, skipping")
-                continue
+        manifest = VectorIndex.read_manifest(vectors_dir)
+        if vector_index_matches(manifest, len(store), vector_store_config):
+            logger.info(f"Loading {manifest.get('engine', 'numpy')} vector index from {vectors_dir}")
+            return load_vector_index(vectors_dir, vector_store_config)
 
-        if not embedding_sizes:
-            logger.error("No valid embeddings found in any documents")
-            return []
+        logger.info(f"Building vector index for {len(store)} documents")
+        return build_vector_index(store.vectors, vectors_dir, vector_store_config)
 
-        # Find the most common embedding size (this should be the correct one)
-        target_size = max(embedding_sizes.keys(), key=lambda k: embedding_sizes[k])
-        logger.info(f"Target embedding size: {target_size} (found in {embedding_sizes[target_size]} documents)")
+    def search_mask(self, metadata_filters: Optional[Dict[str, Any]] = None) -> Optional[np.ndarray]:
+        """
+        Return the chunk mask of the file filters of this retriever combined with metadata
+        predicates, or None if every chunk is searched. Masks are computed once per index and
+        set of predicates, so a filtered search costs the same as an unfiltered one.
 
-        # Log all embedding sizes found
-        for size, count in embedding_sizes.items():
-            if size != target_size:
-                logger.warning(f"Found {count} documents with incorrect embedding size {size}, will be filtered out")
+        Args:
+            metadata_filters: Optional predicates, see resolve_metadata_filters
 
-        # Second pass: filter documents with the target embedding size
-        for i, doc in enumerate(documents):
-            if not hasattr(doc, 'vector') or doc.vector is None:
-                continue
+        Returns:
+            Optional[np.ndarray]: Boolean mask over the chunks
+        """
+        metadata_filters = resolve_metadata_filters(metadata_filters)
+        if metadata_filters is None:
+            return self.filter_mask
+        return self.prepared_index.filter_mask(self.file_filters, metadata_filters)
 
-            try:
-                if isinstance(doc.vector, list):
-                    embedding_size = len(doc.vector)
-                elif hasattr(doc.vector, 'shape'):
-                    embedding_size = doc.vector.shape[0] if len(doc.vector.shape) == 1 else doc.vector.shape[-1]
-                elif hasattr(doc.vector, '__len__'):
-                    embedding_size = len(doc.vector)
-                else:
-                    continue
+    def _retrieve(self, query: str, metadata_filters: Optional[Dict[str, Any]] = None) -> List[RetrieverOutput]:
+        """
+        Run the retriever for a single query, reusing results cached for the same index version.
 
-                if embedding_size == target_size:
-                    valid_documents.append(doc)
-                else:
-                    # Log which document is being filtered out
-                    file_path = getattr(doc, 'meta_data', {}).get('file_path', f'document_{i}')
-                    logger.warning(f"Filtering out document '{file_path}' due to embedding size mismatch: {embedding_size} != {target_size}")
+        Args:
+            query: The user's query
+            metadata_filters: Optional predicates on the chunks to search
+
+        Returns:
+            List[RetrieverOutput]: A one-element list with doc_indices and doc_scores filled in
+        """
+        return self._retrieve_many([query], metadata_filters)
 
-            except Exception as e:
-                file_path = getattr(doc, 'meta_data', {}).get('file_path', f'document_{i}')
-                logger.warning(f"Error validating embedding for document '{file_path}': {str(e)}, skipping")
+    def _retrieve_many(
+        self, queries: List[str], metadata_filters: Optional[Dict[str, Any]] = None
+    ) -> List[RetrieverOutput]:
+        """
+        Run the retriever for several queries at once, reusing results cached for the same
+        index version. Queries that need a dense search are embedded in a single batched call
+        and searched as one query matrix.
+
+        Args:
+            queries: The queries
+            metadata_filters: Optional predicates on the chunks to search
+
+        Returns:
+            List[RetrieverOutput]: One output per query, with doc_indices and doc_scores filled in
+        """
+        lexical_config = get_lexical_config(configs.get("lexical_search"))
+        hybrid = lexical_config["mode"] == "hybrid"
+        metadata_filters = resolve_metadata_filters(metadata_filters)
+        mask = self.search_mask(metadata_filters)
+        filters = (
+            file_filters_key(self.file_filters) if self.filter_mask is not None else None,
+            metadata_filters_key(metadata_filters),
+        )
+        cache_keys = [
+            (self.retriever.index.version, normalize_query(query), self.retriever.top_k, filters, lexical_config["mode"])
+            for query in queries
+        ]
+
+        adaptive_config = get_adaptive_top_k_config(configs.get("adaptive_top_k"))
+        results: List[Optional[RetrieverOutput]] = [None] * len(queries)
+        # Queries left for the dense search, with their lexical ranking in hybrid mode
+        pending: Dict[int, List[int]] = {}
+        fresh = []
+        for i, query in enumerate(queries):
+            cached = retrieval_result_cache.get(cache_keys[i])
+            if cached is not None:
+                doc_indices, doc_scores = cached
+                results[i] = RetrieverOutput(doc_indices=list(doc_indices), doc_scores=list(doc_scores), query=query)
                 continue
+            fresh.append(i)
+            if hybrid:
+                results[i], lexical_rows = self._lexical_search(query, lexical_config, mask)
+                if results[i] is not None:
+                    continue
+                pending[i] = lexical_rows
+            else:
+                pending[i] = []
+
+        if pending:
+            dense_outputs = self._dense_search([queries[i] for i in pending], mask)
+            for (i, lexical_rows), dense in zip(pending.items(), dense_outputs):
+                if hybrid:
+                    lexical_search_stats.record("hybrid")
+                    if adaptive_config["enabled"]:
+                        # Fused scores only reflect ranks, so the weak tail is cut from the dense
+                        # ranking by cosine similarity before fusion; BM25 rows all match the query
+                        self._apply_adaptive_top_k(dense, adaptive_config)
+                    fused = reciprocal_rank_fusion(
+                        [dense.doc_indices, lexical_rows], k=lexical_config["rrf_k"]
+                    )[:self.retriever.top_k]
+                    results[i] = RetrieverOutput(
+                        doc_indices=[row for row, _ in fused], doc_scores=[score for _, score in fused], query=queries[i]
+                    )
+                else:
+                    lexical_search_stats.record("dense")
+                    results[i] = dense
+
+        for i in fresh:
+            retrieval_result_cache.put(cache_keys[i], (tuple(results[i].doc_indices), tuple(results[i].doc_scores)))
+
+        if adaptive_config["enabled"]:
+            for result in results:
+                if hybrid:
+                    # Dense results were cut before fusion; fused and fast path lists are only capped
+                    result.doc_indices = list(result.doc_indices[:adaptive_config["max_k"]])
+                    result.doc_scores = list(result.doc_scores[:adaptive_config["max_k"]])
+                else:
+                    self._apply_adaptive_top_k(result, adaptive_config)
+        return results
 
-        logger.info(f"Embedding validation complete: {len(valid_documents)}/{len(documents)} documents have valid embeddings")
+    def _dense_search(self, queries: List[str], mask: Optional[np.ndarray] = None) -> List[RetrieverOutput]:
+        """
+        Run the vector search for queries, embedded in a single batched call.
 
-        if len(valid_documents) == 0:
-            logger.error("No documents with valid embeddings remain after filtering")
-        elif len(valid_documents) < len(documents):
-            filtered_count = len(documents) - len(valid_documents)
-            logger.warning(f"Filtered out {filtered_count} documents due to embedding issues")
+        On indexes of at least coarse_search.min_chunks chunks the search is coarse-to-fine:
+        files are ranked by the centroid of their chunk vectors, and only the chunks of the
+        top_files best files are scored, so the cost grows with the number of files rather
+        than the number of chunks.
 
-        return valid_documents
+        Args:
+            queries: The queries
+            mask: Optional boolean mask of the chunks to search
 
-    def prepare_retriever(self, repo_url_or_path: str, type: str = "github", access_token: str = None,
-                      excluded_dirs: List[str] = None, excluded_files: List[str] = None,
-                      included_dirs: List[str] = None, included_files: List[str] = None):
+        Returns:
+            List[RetrieverOutput]: One output per query, empty for empty queries
         """
-        Prepare the retriever for a repository.
-        Will load database from local storage if available.
+        coarse_config = get_coarse_search_config(configs.get("coarse_search"))
+        documents = self.transformed_docs
+        if not (
+            coarse_config["enabled"]
+            and len(documents) >= coarse_config["min_chunks"]
+            and hasattr(documents, "file_vectors")
+        ):
+            return self.retriever(queries, mask=mask)
+
+        outputs = [RetrieverOutput(doc_indices=[], doc_scores=[], query=query) for query in queries]
+        valid = [i for i, query in enumerate(queries) if query]
+        if not valid:
+            return outputs
+        file_vectors = documents.file_vectors
+        embeddings = self.retriever.embed_queries([queries[i] for i in valid])
+        for i, embedding in zip(valid, embeddings):
+            candidates = file_vectors.candidate_mask(
+                embedding, coarse_config["top_files"], min_rows=self.retriever.top_k, mask=mask
+            )
+            coarse_search_stats.record(int(np.count_nonzero(candidates)), len(candidates))
+            result = self.retriever(embedding[None, :], mask=candidates)[0]
+            outputs[i].doc_indices, outputs[i].doc_scores = result.doc_indices, result.doc_scores
+        return outputs
+
+    def _apply_adaptive_top_k(self, result: RetrieverOutput, adaptive_config: Dict[str, Any]) -> None:
+        """
+        Drop the weak tail of a dense result in place, so prompts carry only the chunks that match.
 
         Args:
-            repo_url_or_path: URL or local path to the repository
-            access_token: Optional access token for private repositories
-            excluded_dirs: Optional list of directories to exclude from processing
-            excluded_files: Optional list of file patterns to exclude from processing
-            included_dirs: Optional list of directories to include exclusively
-            included_files: Optional list of file patterns to include exclusively
+            result: A dense retriever output, best first
+            adaptive_config: The merged "adaptive_top_k" configuration
         """
-        self.initialize_db_manager()
-        self.repo_url_or_path = repo_url_or_path
-        self.transformed_docs = self.db_manager.prepare_database(
-            repo_url_or_path,
-            type,
-            access_token,
-            is_ollama_embedder=self.is_ollama_embedder,
-            excluded_dirs=excluded_dirs,
-            excluded_files=excluded_files,
-            included_dirs=included_dirs,
-            included_files=included_files
+        retrieved = len(result.doc_indices)
+        if not retrieved:
+            return
+        kept, reason = adaptive_cutoff(
+            result.doc_scores,
+            adaptive_config["min_k"],
+            adaptive_config["max_k"],
+            # The retriever maps cosine similarities to (cos + 1) / 2, see cosine_to_probability
+            min_score=(adaptive_config["min_score"] + 1) / 2,
+            min_gap_ratio=adaptive_config["min_gap_ratio"],
+        )
+        adaptive_top_k_stats.record(retrieved, kept, reason)
+        logger.info(
+            f"Kept {kept}/{retrieved} chunks (cut by {reason}; top score {float(result.doc_scores[0]):.4f}, "
+            f"last kept {float(result.doc_scores[kept - 1]):.4f}) for query: {result.query!r:.80}"
         )
-        logger.info(f"Loaded {len(self.transformed_docs)} documents for retrieval")
+        result.doc_indices = list(result.doc_indices[:kept])
+        result.doc_scores = list(result.doc_scores[:kept])
 
-        # Validate and filter embeddings to ensure consistent sizes
-        self.transformed_docs = self._validate_and_filter_embeddings(self.transformed_docs)
+    def _lexical_search(
+        self, query: str, lexical_config: Dict[str, Any], mask: Optional[np.ndarray] = None
+    ) -> Tuple[Optional[RetrieverOutput], List[int]]:
+        """
+        Search the BM25 index for a query.
 
-        if not self.transformed_docs:
-            raise ValueError("No valid documents with embeddings found. Cannot create retriever.")
+        Questions naming identifiers that occur in only a few chunks, whose chunks also score
+        clearly above every other match, are answered from the BM25 index alone, with the
+        chunks defining those identifiers first, so no query embedding is computed for them.
+        Other questions are fused with the dense search.
 
-        logger.info(f"Using {len(self.transformed_docs)} documents with valid embeddings for retrieval")
+        Args:
+            query: The user's query
+            lexical_config: The merged "lexical_search" configuration
+            mask: Optional boolean mask of the chunks to search
 
-        try:
-            # Use the appropriate embedder for retrieval
-            retrieve_embedder = self.query_embedder if self.is_ollama_embedder else self.embedder
-            self.retriever = FAISSRetriever(
-                **configs["retriever"],
-                embedder=retrieve_embedder,
-                documents=self.transformed_docs,
-                document_map_func=lambda doc: doc.vector,
-            )
-            logger.info("FAISS retriever created successfully")
-        except Exception as e:
-            logger.error(f"Error creating FAISS retriever: {str(e)}")
-            # Try to provide more specific error information
-            if "All embeddings should be of the same size" in str(e):
-                logger.error("Embedding size validation failed. This suggests there are still inconsistent embedding sizes.")
-                # Log embedding sizes for debugging
-                sizes = []
-                for i, doc in enumerate(self.transformed_docs[:10]):  # Check first 10 docs
-                    if hasattr(doc, 'vector') and doc.vector is not None:
-                        try:
-                            if isinstance(doc.vector, list):
-                                size = len(doc.vector)
-                            elif hasattr(doc.vector, 'shape'):
-                                size = doc.vector.shape[0] if len(doc.vector.shape) == 1 else doc.vector.shape[-1]
-                            elif hasattr(doc.vector, '__len__'):
-                                size = len(doc.vector)
-                            else:
-                                size = "unknown"
-                            sizes.append(f"doc_{i}: {size}")
-                        except:
-                            sizes.append(f"doc_{i}: error")
-                logger.error(f"Sample embedding sizes: {', '.join(sizes)}")
-            raise
+        Returns:
+            Tuple[Optional[RetrieverOutput], List[int]]: The final result when the lexical
+            fast path applies, otherwise None, and the lexical ranking of the chunks
+        """
+        top_k = self.retriever.top_k
+        lexical_index = self.transformed_docs.lexical_index
+        lexical_scores, lexical_rows = lexical_index.search(
+            query, top_k, mask=mask, k1=lexical_config["k1"], b=lexical_config["b"]
+        )
+
+        if not (lexical_config["fast_path"] and len(lexical_rows)):
+            return None, lexical_rows.tolist()
+        identifiers = extract_identifiers(query, known_symbols=self.transformed_docs.path_index.symbols)
+        if not (
+            lexical_index.is_specific(identifiers, top_k, lexical_config["fast_path_max_df"])
+            and lexical_index.score_margin(identifiers, lexical_scores, lexical_rows)
+            >= lexical_config["fast_path_min_margin"]
+        ):
+            return None, lexical_rows.tolist()
+
+        definitions = [
+            row
+            for identifier in identifiers
+            for row in self.transformed_docs.path_index.symbol_rows(identifier)
+            if mask is None or mask[row]
+        ]
+        scores = dict(zip(lexical_rows.tolist(), lexical_scores.tolist()))
+        top_score = float(lexical_scores[0])
+        for row in definitions:
+            scores[row] = scores.get(row, 0.0) + top_score
+        ranked = sorted(scores.items(), key=lambda item: -item[1])[:top_k]
+        lexical_search_stats.record("fast_path")
+        logger.info(f"Answered query naming {identifiers} from the lexical index without embedding it")
+        return RetrieverOutput(
+            doc_indices=[row for row, _ in ranked], doc_scores=[score for _, score in ranked], query=query
+        ), lexical_rows.tolist()
+
+    def retrieve_many(
+        self, queries: List[str], metadata_filters: Optional[Dict[str, Any]] = None
+    ) -> List[RetrieverOutput]:
+        """
+        Retrieve the chunks of many queries in one pass, such as the pages of a wiki structure.
+
+        Args:
+            queries: The queries
+            metadata_filters: Optional predicates on the chunks to search, see resolve_metadata_filters
 
-    def call(self, query: str, language: str = "en") -> Tuple[List]:
+        Returns:
+            List[RetrieverOutput]: One output per query, in order, with documents filled in
+        """
+        results = self._retrieve_many(list(queries), metadata_filters)
+        for result in results:
+            result.documents = self.transformed_docs.take(result.doc_indices)
+        return results
+
+    def call(self, query: str, language: str = "en", metadata_filters: Optional[Dict[str, Any]] = None) -> Tuple[List]:
         """
         Process a query using RAG.
 
         Args:
             query: The user's query
+            metadata_filters: Optional predicates on the chunks to search, such as
+                {"code_only": True, "exclude_tests": True, "path_prefix": "api/", "languages": ["python"]}
 
         Returns:
             Tuple of (RAGAnswer, retrieved_documents)
         """
         try:
-            retrieved_documents = self.retriever(query)
+            retrieved_documents = self._retrieve(query, metadata_filters)
 
             # Fill in the documents
-            retrieved_documents[0].documents = [
-                self.transformed_docs[doc_index]
-                for doc_index in retrieved_documents[0].doc_indices
-            ]
+            retrieved_documents[0].documents = self.transformed_docs.take(retrieved_documents[0].doc_indices)
 
             return retrieved_documents
 
@@ -492,3 +726,40 @@ IMPORTANT FORMATTING RULES:
                 answer=f"I apologize, but I encountered an error while processing your question. Please try again or rephrase your question."
             )
             return error_response, []
+
+    def lookup_file(self, file_path: str, metadata_filters: Optional[Dict[str, Any]] = None) -> List[RetrieverOutput]:
+        """
+        Retrieve the chunks of a file and of the files it imports or is imported by, through
+        the path index of the repository instead of an embedding search.
+
+        Args:
+            file_path: Repository-relative path of the file the request is about
+            metadata_filters: Optional predicates on the chunks to return, as for call()
+
+        Returns:
+            List[RetrieverOutput]: A one-element list like call(), or an empty list if the
+            file is not in the index (or left out by the file or metadata filters)
+        """
+        path_index = self.transformed_docs.path_index
+        mask = self.search_mask(metadata_filters)
+        own_rows = [row for row in path_index.file_rows(file_path) if mask is None or mask[row]][:self.retriever.top_k]
+        if not own_rows:
+            return []
+
+        own_documents = self.transformed_docs.take(own_rows)
+        # Prefer the chunks of related files that define names the focused file uses
+        referenced_names = set(IDENTIFIER_PATTERN.findall("\n".join(doc.text for doc in own_documents)))
+        own_rows, related_rows = path_index.lookup(
+            file_path, limit=self.retriever.top_k, referenced_names=referenced_names, allowed=mask
+        )
+        # The file's chunks are cut to leave room for related files, keeping their order
+        documents = own_documents[:len(own_rows)] + self.transformed_docs.take(related_rows)
+        logger.info(
+            f"Looked up {len(own_rows)} chunks of {file_path} and {len(related_rows)} of related files without embedding"
+        )
+        return [RetrieverOutput(
+            doc_indices=own_rows + related_rows,
+            doc_scores=[1.0] * len(own_rows) + [0.5] * len(related_rows),
+            query=file_path,
+            documents=documents,
+        )]
@@ -0,0 +1,105 @@
+import logging
+import threading
+import unicodedata
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def normalize_query(query: str) -> str:
+    """
+    Normalize a query string for use as a cache key.
+    Applies NFKC, case folding and collapses whitespace so trivially different spellings
+    of the same question share an entry.
+    """
+    return " ".join(unicodedata.normalize("NFKC", query).casefold().split())
+
+
+class LRUCache:
+    """
+    Thread-safe least-recently-used cache with hit/miss counters.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Return the cached value for key and mark it as recently used, or default on a miss."""
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                self.hits += 1
+                return self._data[key]
+            self.misses += 1
+            return default
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Store a value, evicting the least recently used entries beyond maxsize."""
+        if self.maxsize <= 0:
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size, hit/miss counts and the hit rate."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._data),
+                "maxsize": self.maxsize,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+            }
+
+
+# Query embeddings keyed by (embedder model, normalized query)
+query_embedding_cache = LRUCache(maxsize=2048)
+
+# Retrieval results keyed by (index version, normalized query, top_k, filters)
+retrieval_result_cache = LRUCache(maxsize=1024)
+
+
+def configure_caches(cache_config: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Resize the shared caches from the "retrieval_cache" configuration section.
+
+    Args:
+        cache_config: Mapping with optional "query_embeddings" and "results" sizes (0 disables a cache)
+    """
+    cache_config = cache_config or {}
+    if "query_embeddings" in cache_config:
+        query_embedding_cache.maxsize = int(cache_config["query_embeddings"])
+    if "results" in cache_config:
+        retrieval_result_cache.maxsize = int(cache_config["results"])
+    logger.info(
+        f"Retrieval caches configured: query_embeddings={query_embedding_cache.maxsize}, "
+        f"results={retrieval_result_cache.maxsize}"
+    )
+
+
+def get_cache_stats() -> Dict[str, Dict[str, Any]]:
+    """Return hit-rate metrics for both retrieval caches."""
+    return {
+        "query_embeddings": query_embedding_cache.stats(),
+        "retrieval_results": retrieval_result_cache.stats(),
+    }
@@ -0,0 +1,222 @@
+import logging
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Hashable, List, Optional, Sequence
+
+import numpy as np
+
+from api.file_filters import file_filter_mask, file_filters_key, is_default_filters
+from api.metadata_filters import metadata_columns, metadata_filter_mask, metadata_filters_key
+from api.vector_index import VectorIndex
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Filter masks kept per prepared index; wiki generation reuses one set of filters for every page
+MAX_CACHED_MASKS = 16
+
+
+@dataclass
+class PreparedIndex:
+    """
+    A repository index that is ready to search: its chunks (usually a ChunkStore) and the
+    loaded vector index. nbytes is the memory of the vector index; memory_bytes adds the
+    lookup structures of the chunks and the cached filter masks, which are loaded as they are used.
+    """
+
+    key: Hashable
+    documents: Sequence[Any]
+    vector_index: VectorIndex
+    nbytes: int
+    load_seconds: float = 0.0
+    _masks: "OrderedDict[tuple, np.ndarray]" = field(default_factory=OrderedDict, repr=False)
+    _masks_lock: threading.Lock = field(default_factory=threading.Lock, repr=False)
+
+    @property
+    def memory_bytes(self) -> int:
+        """Estimated memory of the vector index, the loaded lexical, path and file vector indexes, metadata columns and masks."""
+        with self._masks_lock:
+            masks = sum(mask.nbytes for mask in self._masks.values())
+        return int(self.nbytes + getattr(self.documents, "nbytes", 0) + masks)
+
+    def filter_mask(
+        self, file_filters: Optional[Dict[str, Any]], metadata_filters: Optional[Dict[str, Any]] = None
+    ) -> np.ndarray:
+        """
+        Return the chunk mask of a set of file filters and resolved metadata predicates,
+        computed once per index and combined with AND.
+        """
+        mask_key = (file_filters_key(file_filters) if file_filters else None, metadata_filters_key(metadata_filters))
+        with self._masks_lock:
+            mask = self._masks.get(mask_key)
+            if mask is not None:
+                self._masks.move_to_end(mask_key)
+                return mask
+        mask = np.ones(len(self.documents), dtype=bool)
+        if file_filters and not is_default_filters(file_filters):
+            if hasattr(self.documents, "file_paths"):
+                file_paths = self.documents.file_paths()
+            else:
+                file_paths = [doc.meta_data.get("file_path") for doc in self.documents]
+            mask &= file_filter_mask(file_paths, file_filters)
+        if metadata_filters:
+            if hasattr(self.documents, "metadata_columns"):
+                columns = self.documents.metadata_columns
+            else:
+                columns = metadata_columns(
+                    (doc.meta_data.get("file_path"), doc.meta_data.get("type"), doc.meta_data.get("is_code"),
+                     doc.meta_data.get("is_implementation"))
+                    for doc in self.documents
+                )
+            mask &= metadata_filter_mask(columns, metadata_filters)
+        mask.setflags(write=False)
+        with self._masks_lock:
+            self._masks[mask_key] = mask
+            while len(self._masks) > MAX_CACHED_MASKS:
+                self._masks.popitem(last=False)
+        return mask
+
+
+class RetrieverRegistry:
+    """
+    Process-wide, thread-safe LRU of prepared repository indexes, bounded both by the number
+    of entries and by their estimated memory. Concurrent requests for an index that is not
+    loaded yet wait for a single load instead of each loading it.
+    """
+
+    def __init__(self, max_entries: int = 8, max_memory_mb: float = 2048):
+        self.max_entries = max_entries
+        self.max_memory_bytes = int(max_memory_mb * 1024 * 1024)
+        self._entries: "OrderedDict[Hashable, PreparedIndex]" = OrderedDict()
+        self._loading: Dict[Hashable, threading.Lock] = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.load_seconds = 0.0
+
+    @property
+    def memory_bytes(self) -> int:
+        return sum(entry.memory_bytes for entry in self._entries.values())
+
+    def _lookup(self, key: Hashable) -> Optional[PreparedIndex]:
+        entry = self._entries.get(key)
+        if entry is not None:
+            self._entries.move_to_end(key)
+        return entry
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], PreparedIndex]) -> PreparedIndex:
+        """
+        Return the prepared index for key, calling loader to prepare it on a miss.
+
+        Args:
+            key: Identifies the index version, so a rebuilt index is loaded again
+            loader: Prepares the index; called at most once per key at a time
+
+        Returns:
+            PreparedIndex: The shared prepared index
+        """
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is not None:
+                self.hits += 1
+                # Lookup structures loaded since the last check count against the budget
+                self._evict()
+                return entry
+            loading_lock = self._loading.setdefault(key, threading.Lock())
+
+        with loading_lock:
+            # Requests that waited for another request's load are hits
+            with self._lock:
+                entry = self._lookup(key)
+                if entry is not None:
+                    self.hits += 1
+                    return entry
+                self.misses += 1
+
+            started_at = time.time()
+            try:
+                entry = loader()
+                entry.load_seconds = time.time() - started_at
+                self.put(entry)
+            finally:
+                # Released only once the entry is in the registry, so no request starts a second load
+                with self._lock:
+                    self._loading.pop(key, None)
+            logger.info(
+                f"Prepared index {key} in {entry.load_seconds:.2f}s ({entry.memory_bytes / 1024 / 1024:.1f} MB)"
+            )
+            return entry
+
+    def put(self, entry: PreparedIndex) -> None:
+        """Store a prepared index, evicting least recently used ones beyond the limits."""
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[entry.key] = entry
+            self._entries.move_to_end(entry.key)
+            self.load_seconds += entry.load_seconds
+            self._evict()
+
+    def _evict(self) -> None:
+        """Evict least recently used entries beyond the limits; called with the lock held."""
+        # The most recently used entry is always kept, even when it alone exceeds the memory budget
+        while len(self._entries) > 1 and (
+            len(self._entries) > self.max_entries or self.memory_bytes > self.max_memory_bytes
+        ):
+            evicted_key, evicted = self._entries.popitem(last=False)
+            self.evictions += 1
+            logger.info(f"Evicted prepared index {evicted_key} ({evicted.memory_bytes / 1024 / 1024:.1f} MB)")
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def index_dirs(self) -> List[str]:
+        """Return the index directories of the loaded indexes, which must stay on disk while they are served."""
+        with self._lock:
+            entries = list(self._entries.values())
+        return [entry.documents.index_dir for entry in entries if getattr(entry.documents, "index_dir", None)]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def stats(self) -> Dict[str, Any]:
+        """Return size, memory use, hit/miss counts and the time spent loading."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "max_entries": self.max_entries,
+                "memory_bytes": self.memory_bytes,
+                "max_memory_bytes": self.max_memory_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_rate": round(self.hits / lookups, 4) if lookups else 0.0,
+                "load_seconds": round(self.load_seconds, 3),
+            }
+
+
+retriever_registry = RetrieverRegistry()
+
+
+def configure_registry(cache_config: Optional[Dict[str, Any]] = None) -> None:
+    """
+    Size the shared registry from the "retrieval_cache" configuration section.
+
+    Args:
+        cache_config: Mapping with optional "retrievers" (0 disables the registry) and "retriever_memory_mb"
+    """
+    cache_config = cache_config or {}
+    if "retrievers" in cache_config:
+        retriever_registry.max_entries = int(cache_config["retrievers"])
+    if "retriever_memory_mb" in cache_config:
+        retriever_registry.max_memory_bytes = int(float(cache_config["retriever_memory_mb"]) * 1024 * 1024)
+
+
+def get_registry_stats() -> Dict[str, Any]:
+    """Return the metrics of the shared retriever registry."""
+    return retriever_registry.stats()
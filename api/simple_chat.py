@@ -1,6 +1,6 @@
 import logging
 import os
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
 from urllib.parse import unquote
 
 import google.generativeai as genai
@@ -13,11 +13,16 @@ from pydantic import BaseModel, Field
 
 from api.config import get_model_config, configs, OPENROUTER_API_KEY, OPENAI_API_KEY, AWS_ACCESS_KEY_ID, AWS_SECRET_ACCESS_KEY
 from api.data_pipeline import count_tokens, get_file_content
+from api.context_merge import merge_chunks
 from api.openai_client import OpenAIClient
 from api.openrouter_client import OpenRouterClient
 from api.bedrock_client import BedrockClient
 from api.azureai_client import AzureAIClient
 from api.rag import RAG
+from api.client_pool import get_client
+from api.executors import iterate_blocking, run_blocking
+from api.index_jobs import index_jobs
+from api.metadata_filters import resolve_metadata_filters
 
 # Configure logging
 from api.logging_config import setup_logging
@@ -65,25 +70,42 @@ class ChatCompletionRequest(BaseModel):
     excluded_files: Optional[str] = Field(None, description="Comma-separated list of file patterns to exclude from processing")
     included_dirs: Optional[str] = Field(None, description="Comma-separated list of directories to include exclusively")
     included_files: Optional[str] = Field(None, description="Comma-separated list of file patterns to include exclusively")
+    metadata_filters: Optional[Dict[str, Any]] = Field(
+        None, description="Predicates on the chunks to search: code_only, implementation_only, exclude_tests, path_prefix, languages"
+    )
 
 @app.post("/chat/completions/stream")
 async def chat_completions_stream(request: ChatCompletionRequest):
     """Stream a chat completion response directly using Google Generative AI"""
     try:
+        # Invalid metadata filters are rejected here rather than answered without any context
+        try:
+            resolve_metadata_filters(request.metadata_filters)
+        except ValueError as e:
+            raise HTTPException(status_code=400, detail=str(e))
+
         # Check if request contains very large input
         input_too_large = False
         if request.messages and len(request.messages) > 0:
             last_message = request.messages[-1]
             if hasattr(last_message, 'content') and last_message.content:
-                tokens = count_tokens(last_message.content, request.provider == "ollama")
+                tokens = await run_blocking("cpu", count_tokens, last_message.content, request.provider == "ollama")
                 logger.info(f"Request size: {tokens} tokens")
                 if tokens > 8000:
                     logger.warning(f"Request exceeds recommended token limit ({tokens} > 7500)")
                     input_too_large = True
 
+        # A repository that an indexing job is still building is not built a second time here
+        indexing_job = await index_jobs.wait_for_repo(request.repo_url, request.type)
+        if indexing_job is not None:
+            raise HTTPException(
+                status_code=409,
+                detail=f"Repository is still being indexed by job {indexing_job.id} ({indexing_job.stage}), see GET /index/{indexing_job.id}",
+            )
+
         # Create a new RAG instance for this request
         try:
-            request_rag = RAG(provider=request.provider, model=request.model)
+            request_rag = await run_blocking("io", RAG, provider=request.provider, model=request.model)
 
             # Extract custom file filter parameters if provided
             excluded_dirs = None
@@ -104,7 +126,12 @@ async def chat_completions_stream(request: ChatCompletionRequest):
                 included_files = [unquote(file_pattern) for file_pattern in request.included_files.split('\n') if file_pattern.strip()]
                 logger.info(f"Using custom included files: {included_files}")
 
-            request_rag.prepare_retriever(request.repo_url, request.type, request.token, excluded_dirs, excluded_files, included_dirs, included_files)
+            # Loaded indexes are served from "io" workers; only loading or building one takes
+            # a worker of the bounded "index" pool, so other requests never queue behind a build
+            await run_blocking(
+                "io", request_rag.prepare_retriever,
+                request.repo_url, request.type, request.token, excluded_dirs, excluded_files, included_dirs, included_files,
+            )
             logger.info(f"Retriever prepared for {request.repo_url}")
         except ValueError as e:
             if "No valid documents with embeddings found" in str(e):
@@ -192,13 +219,25 @@ async def chat_completions_stream(request: ChatCompletionRequest):
 
                 # Try to perform RAG retrieval
                 try:
-                    # This will use the actual RAG implementation
-                    retrieved_documents = request_rag(rag_query, language=request.language)
+                    # A file named in the request is looked up in the path index, without an embedding call
+                    if request.filePath:
+                        retrieved_documents = await run_blocking(
+                            "io", request_rag.lookup_file, request.filePath, metadata_filters=request.metadata_filters
+                        )
+                    if not retrieved_documents:
+                        # This will use the actual RAG implementation
+                        retrieved_documents = await run_blocking(
+                            "io", request_rag, rag_query, language=request.language, metadata_filters=request.metadata_filters
+                        )
 
                     if retrieved_documents and retrieved_documents[0].documents:
                         # Format context for the prompt in a more structured way
                         documents = retrieved_documents[0].documents
                         logger.info(f"Retrieved {len(documents)} documents")
+                        # Merge overlapping chunks of the same file so repeated text is sent once
+                        documents = (await run_blocking(
+                            "cpu", merge_chunks, documents, lambda text: count_tokens(text, request.provider == "ollama")
+                        )).documents
 
                         # Group documents by file path
                         docs_by_file = {}
@@ -388,7 +427,9 @@ This file contains...
         file_content = ""
         if request.filePath:
             try:
-                file_content = get_file_content(request.repo_url, request.filePath, request.type, request.token)
+                file_content = await run_blocking(
+                    "io", get_file_content, request.repo_url, request.filePath, request.type, request.token
+                )
                 logger.info(f"Successfully retrieved content for file: {request.filePath}")
             except Exception as e:
                 logger.error(f"Error retrieving file content: {str(e)}")
@@ -428,7 +469,7 @@ This file contains...
         if request.provider == "ollama":
             prompt += " /no_think"
 
-            model = OllamaClient()
+            model = get_client(OllamaClient)
             model_kwargs = {
                 "model": model_config["model"],
                 "stream": True,
@@ -452,7 +493,7 @@ This file contains...
                 logger.warning("OPENROUTER_API_KEY not configured, but continuing with request")
                 # We'll let the OpenRouterClient handle this and return a friendly error message
 
-            model = OpenRouterClient()
+            model = get_client(OpenRouterClient)
             model_kwargs = {
                 "model": request.model,
                 "stream": True,
@@ -475,8 +516,8 @@ This file contains...
                 logger.warning("OPENAI_API_KEY not configured, but continuing with request")
                 # We'll let the OpenAIClient handle this and return an error message
 
-            # Initialize Openai client
-            model = OpenAIClient()
+            # Reuse the pooled Openai client
+            model = get_client(OpenAIClient)
             model_kwargs = {
                 "model": request.model,
                 "stream": True,
@@ -499,8 +540,8 @@ This file contains...
                 logger.warning("AWS_ACCESS_KEY_ID or AWS_SECRET_ACCESS_KEY not configured, but continuing with request")
                 # We'll let the BedrockClient handle this and return an error message
 
-            # Initialize Bedrock client
-            model = BedrockClient()
+            # Reuse the pooled Bedrock client
+            model = get_client(BedrockClient)
             model_kwargs = {
                 "model": request.model,
                 "temperature": model_config["temperature"],
@@ -515,8 +556,8 @@ This file contains...
         elif request.provider == "azure":
             logger.info(f"Using Azure AI with model: {request.model}")
 
-            # Initialize Azure AI client
-            model = AzureAIClient()
+            # Reuse the pooled Azure AI client
+            model = get_client(AzureAIClient)
             model_kwargs = {
                 "model": request.model,
                 "stream": True,
@@ -613,9 +654,9 @@ This file contains...
                         yield f"\nError with Azure AI API: {str(e_azure)}\n\nPlease check that you have set the AZURE_OPENAI_API_KEY, AZURE_OPENAI_ENDPOINT, and AZURE_OPENAI_VERSION environment variables with valid values."
                 else:
                     # Generate streaming response
-                    response = model.generate_content(prompt, stream=True)
-                    # Stream the response
-                    for chunk in response:
+                    response = await run_blocking("io", model.generate_content, prompt, stream=True)
+                    # Stream the response, fetching each chunk off the event loop
+                    async for chunk in iterate_blocking("io", response):
                         if hasattr(chunk, 'text'):
                             yield chunk.text
 
@@ -758,9 +799,11 @@ This file contains...
                             )
 
                             # Get streaming response using simplified prompt
-                            fallback_response = fallback_model.generate_content(simplified_prompt, stream=True)
+                            fallback_response = await run_blocking(
+                                "io", fallback_model.generate_content, simplified_prompt, stream=True
+                            )
                             # Stream the fallback response
-                            for chunk in fallback_response:
+                            async for chunk in iterate_blocking("io", fallback_response):
                                 if hasattr(chunk, 'text'):
                                     yield chunk.text
                     except Exception as e2:
@@ -0,0 +1,299 @@
+import contextvars
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from collections import Counter
+from contextlib import contextmanager
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Set
+
+from adalflow.utils import get_adalflow_default_root_path
+
+from api.config import configs
+from api.index_catalog import CATALOG_FILE, IndexCatalog
+from api.retriever_registry import retriever_registry
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Artifact kinds in eviction order: the cheapest to rebuild goes first. Staging directories
+# left behind by interrupted writes ("orphan") and pickled databases of earlier versions
+# ("legacy") are not needed to serve anything. A checkout is one clone away, an index needs
+# the checkout plus a full embedding run, and a wiki needs the index plus one LLM call per page.
+EVICTION_ORDER = ("orphan", "legacy", "repo", "index", "wiki")
+
+# Suffixes of the directories an index is written to before it is renamed into place
+STAGING_SUFFIXES = (".tmp", ".legacy")
+
+# Seconds since its last write after which a staging directory is left over from an interrupted write
+STAGING_TIMEOUT = 3600
+
+ACCESS_FILE = "storage_access.json"
+
+# Minimum seconds between two recorded accesses of the same artifact
+TOUCH_INTERVAL = 60
+
+
+@dataclass
+class StorageArtifact:
+    """One evictable item under the storage root."""
+
+    path: str
+    kind: str
+    size_bytes: int
+    last_access: float
+
+
+def get_path_size(path: str) -> int:
+    """Return the size in bytes of a file, or of all files below a directory."""
+    if os.path.isfile(path):
+        return os.path.getsize(path)
+    total = 0
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                total += os.lstat(os.path.join(dirpath, filename)).st_size
+            except OSError:
+                continue
+    return total
+
+
+def get_last_modified(path: str) -> float:
+    """Return the latest modification time of a file, or of a directory and all files below it."""
+    latest = os.path.getmtime(path)
+    for dirpath, _, filenames in os.walk(path):
+        for filename in filenames:
+            try:
+                latest = max(latest, os.lstat(os.path.join(dirpath, filename)).st_mtime)
+            except OSError:
+                continue
+    return latest
+
+
+class StorageManager:
+    """
+    Tracks the disk usage of cloned repositories, repository indexes and wiki caches under
+    the adalflow root, and keeps it under a quota by evicting the least recently used
+    artifacts, cheapest to rebuild first.
+
+    Local repositories are indexed in place and are never counted or deleted. Artifacts in
+    use are never evicted: indexes loaded in the retriever registry, and the checkouts and
+    indexes touched by requests and indexing jobs that are still preparing them (see in_use).
+    """
+
+    def __init__(self, root_path: str, quota_mb: Optional[float] = None):
+        """
+        Args:
+            root_path: The adalflow root holding repos/, databases/ and wikicache/
+            quota_mb: Maximum total size in megabytes, None or 0 for no limit
+        """
+        self.root_path = os.path.abspath(root_path)
+        root_path = self.root_path
+        self.quota_bytes = int(quota_mb * 1024 * 1024) if quota_mb else None
+        self.repos_dir = os.path.join(root_path, "repos")
+        self.databases_dir = os.path.join(root_path, "databases")
+        self.wikicache_dir = os.path.join(root_path, "wikicache")
+        self.access_path = os.path.join(root_path, ACCESS_FILE)
+        self._lock = threading.Lock()
+        self._pinned: Counter = Counter()
+        # The in_use blocks enclosing the current context, innermost last; carried over to
+        # the pools a request runs its index build on (see api.executors.run_in_pool)
+        self._scopes: contextvars.ContextVar = contextvars.ContextVar(f"storage_scopes_{id(self)}", default=())
+        self.evictions = 0
+        self.evicted_bytes = 0
+
+    def _read_access(self) -> Dict[str, float]:
+        try:
+            with open(self.access_path, "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def _write_access(self, access: Dict[str, float]) -> None:
+        os.makedirs(self.root_path, exist_ok=True)
+        tmp_path = f"{self.access_path}.{os.getpid()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(access, f)
+        os.replace(tmp_path, self.access_path)
+
+    @contextmanager
+    def in_use(self, *paths: str) -> Iterator[None]:
+        """
+        Protect artifacts from eviction while the current context uses them: the given paths,
+        and every artifact touched in this context until the innermost block exits, such as
+        the checkout and index of a repository that is being indexed or loaded.
+        """
+        scope: List[str] = []
+        token = self._scopes.set(self._scopes.get() + (scope,))
+        self._pin(scope, paths)
+        try:
+            yield
+        finally:
+            self._scopes.reset(token)
+            with self._lock:
+                self._pinned.subtract(scope)
+                self._pinned += Counter()
+
+    def _pin(self, scope: List[str], paths: Iterable[str]) -> None:
+        paths = [os.path.abspath(path) for path in paths if path]
+        with self._lock:
+            self._pinned.update(paths)
+            scope.extend(paths)
+
+    def in_use_paths(self) -> Set[str]:
+        """Return the paths that are never evicted: pinned artifacts and loaded indexes."""
+        with self._lock:
+            pinned = set(self._pinned)
+        return pinned | {os.path.abspath(path) for path in retriever_registry.index_dirs()}
+
+    def touch(self, *paths: str) -> None:
+        """Record that artifacts were used, for least-recently-used eviction."""
+        scopes = self._scopes.get()
+        if scopes:
+            self._pin(scopes[-1], paths)
+        now = time.time()
+        with self._lock:
+            access = self._read_access()
+            updated = False
+            for path in paths:
+                path = os.path.abspath(path)
+                if now - access.get(path, 0) >= TOUCH_INTERVAL:
+                    access[path] = now
+                    updated = True
+            if updated:
+                self._write_access(access)
+
+    def _kind_of(self, path: str) -> Optional[str]:
+        parent = os.path.dirname(path)
+        name = os.path.basename(path)
+        if name.endswith(STAGING_SUFFIXES):
+            # Staging directories still being written are skipped
+            try:
+                stale = time.time() - get_last_modified(path) > STAGING_TIMEOUT
+            except OSError:
+                return None
+            return "orphan" if stale and parent == self.databases_dir else None
+        if parent == self.repos_dir and os.path.isdir(path):
+            return "repo"
+        if parent == self.databases_dir:
+            if name.endswith(".index") and os.path.isdir(path):
+                return "index"
+            if name.endswith(".pkl"):
+                return "legacy"
+            return None
+        if parent == self.wikicache_dir and name.endswith(".json"):
+            return "wiki"
+        return None
+
+    def list_artifacts(self) -> List[StorageArtifact]:
+        """Return every artifact with its size and last access time."""
+        access = self._read_access()
+        artifacts = []
+        for directory in (self.repos_dir, self.databases_dir, self.wikicache_dir):
+            if not os.path.isdir(directory):
+                continue
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                kind = self._kind_of(path)
+                if kind is None:
+                    continue
+                try:
+                    last_access = access.get(path) or os.path.getmtime(path)
+                    artifacts.append(StorageArtifact(path, kind, get_path_size(path), last_access))
+                except OSError:
+                    continue
+        return artifacts
+
+    def usage(self) -> Dict[str, Any]:
+        """Return total and per-kind usage, the quota and the artifacts in eviction order."""
+        artifacts = self._eviction_order(self.list_artifacts())
+        by_kind = {kind: {"count": 0, "size_bytes": 0} for kind in EVICTION_ORDER}
+        for artifact in artifacts:
+            by_kind[artifact.kind]["count"] += 1
+            by_kind[artifact.kind]["size_bytes"] += artifact.size_bytes
+        total = sum(artifact.size_bytes for artifact in artifacts)
+        return {
+            "root": self.root_path,
+            "total_bytes": total,
+            "quota_bytes": self.quota_bytes,
+            "usage_ratio": round(total / self.quota_bytes, 4) if self.quota_bytes else None,
+            "by_kind": by_kind,
+            "evictions": self.evictions,
+            "evicted_bytes": self.evicted_bytes,
+            "artifacts": [asdict(artifact) for artifact in artifacts],
+        }
+
+    @staticmethod
+    def _eviction_order(artifacts: List[StorageArtifact]) -> List[StorageArtifact]:
+        return sorted(artifacts, key=lambda artifact: (EVICTION_ORDER.index(artifact.kind), artifact.last_access))
+
+    def evict(self, artifact: StorageArtifact) -> None:
+        """Delete an artifact and forget its access record and catalog entry."""
+        if os.path.isdir(artifact.path):
+            shutil.rmtree(artifact.path, ignore_errors=True)
+        elif os.path.exists(artifact.path):
+            os.remove(artifact.path)
+
+        if artifact.kind == "index":
+            catalog = IndexCatalog(self.databases_dir)
+            name = os.path.basename(artifact.path)
+            for key, entry in catalog.entries().items():
+                if entry.get("path") == name:
+                    catalog.remove(key)
+
+        with self._lock:
+            access = self._read_access()
+            if access.pop(artifact.path, None) is not None:
+                self._write_access(access)
+            self.evictions += 1
+            self.evicted_bytes += artifact.size_bytes
+        logger.info(f"Evicted {artifact.kind} {artifact.path} ({artifact.size_bytes / 1024 / 1024:.1f} MB)")
+
+    def enforce_quota(self, protect: Iterable[str] = ()) -> List[StorageArtifact]:
+        """
+        Evict artifacts until the total size fits the quota.
+
+        Args:
+            protect: Paths in use by the current request, which are never evicted, like
+                the paths returned by in_use_paths
+
+        Returns:
+            List[StorageArtifact]: The evicted artifacts
+        """
+        if not self.quota_bytes:
+            return []
+        protected = {os.path.abspath(path) for path in protect if path} | self.in_use_paths()
+        artifacts = self.list_artifacts()
+        total = sum(artifact.size_bytes for artifact in artifacts)
+        evicted = []
+        for artifact in self._eviction_order(artifacts):
+            if total <= self.quota_bytes:
+                break
+            if artifact.path in protected:
+                continue
+            self.evict(artifact)
+            total -= artifact.size_bytes
+            evicted.append(artifact)
+        if total > self.quota_bytes:
+            logger.warning(
+                f"Storage usage {total / 1024 / 1024:.1f} MB still exceeds the quota of "
+                f"{self.quota_bytes / 1024 / 1024:.1f} MB after eviction"
+            )
+        return evicted
+
+
+_storage_manager: Optional[StorageManager] = None
+_storage_manager_lock = threading.Lock()
+
+
+def get_storage_manager() -> StorageManager:
+    """Return the process-wide storage manager, with the quota from repo.json's storage.quota_mb."""
+    global _storage_manager
+    with _storage_manager_lock:
+        if _storage_manager is None:
+            quota_mb = configs.get("storage", {}).get("quota_mb")
+            _storage_manager = StorageManager(get_adalflow_default_root_path(), quota_mb)
+        return _storage_manager
@@ -1,17 +1,22 @@
+import inspect
+
 import adalflow as adal
 
+from api.client_pool import get_client
 from api.config import configs
 
 
-def get_embedder() -> adal.Embedder:
+def get_embedder(ingestion: bool = False) -> adal.Embedder:
     embedder_config = configs["embedder"]
 
     # --- Initialize Embedder ---
-    model_client_class = embedder_config["model_client"]
-    if "initialize_kwargs" in embedder_config:
-        model_client = model_client_class(**embedder_config["initialize_kwargs"])
-    else:
-        model_client = model_client_class()
+    # The model client (and its HTTP transport) is shared by every embedder of the process
+    client_class = embedder_config["model_client"]
+    initialize_kwargs = dict(embedder_config.get("initialize_kwargs", {}))
+    if ingestion and "max_retries" in inspect.signature(client_class).parameters:
+        # Ingestion paces and retries its own requests, see api.embedding_throughput
+        initialize_kwargs["max_retries"] = 0
+    model_client = get_client(client_class, **initialize_kwargs)
     embedder = adal.Embedder(
         model_client=model_client,
         model_kwargs=embedder_config["model_kwargs"],
@@ -0,0 +1,126 @@
+"""
+Load test showing that requests keep being served while a repository index is built.
+
+It measures the latency of GET /health and, with --chat-repo, the time to first token and the
+longest pause between streamed chunks of /chat/completions/stream on an already indexed
+repository: first on an idle server, then while POST /retrieve builds the index of
+--index-repo. With blocking work kept off the event loop both phases should look the same.
+
+Usage:
+    python -m api.tools.load_test --index-repo https://github.com/owner/large-repo \\
+        --chat-repo https://github.com/owner/indexed-repo --base-url http://localhost:8001
+"""
+
+import argparse
+import asyncio
+import statistics
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+
+async def probe_health(client: httpx.AsyncClient, stop: asyncio.Event, interval: float) -> List[float]:
+    """Time GET /health every interval seconds until stop is set."""
+    latencies = []
+    while not stop.is_set():
+        started_at = time.perf_counter()
+        await client.get("/health")
+        latencies.append(time.perf_counter() - started_at)
+        try:
+            await asyncio.wait_for(stop.wait(), timeout=interval)
+        except asyncio.TimeoutError:
+            pass
+    return latencies
+
+
+async def stream_chat(client: httpx.AsyncClient, args: argparse.Namespace) -> Dict[str, float]:
+    """Stream one chat completion and time its first token and the longest pause between chunks."""
+    payload = {
+        "repo_url": args.chat_repo,
+        "type": args.type,
+        "provider": args.provider,
+        "model": args.model,
+        "messages": [{"role": "user", "content": args.question}],
+    }
+    started_at = time.perf_counter()
+    first_token, previous, longest_gap = None, started_at, 0.0
+    async with client.stream("POST", "/chat/completions/stream", json=payload) as response:
+        async for _ in response.aiter_text():
+            now = time.perf_counter()
+            if first_token is None:
+                first_token = now - started_at
+            else:
+                longest_gap = max(longest_gap, now - previous)
+            previous = now
+    return {"first_token": first_token or 0.0, "longest_gap": longest_gap, "total": time.perf_counter() - started_at}
+
+
+async def stream_chats(client: httpx.AsyncClient, args: argparse.Namespace, stop: asyncio.Event) -> List[Dict[str, float]]:
+    """Stream chat completions one after another until stop is set."""
+    results = []
+    while args.chat_repo and not stop.is_set():
+        results.append(await stream_chat(client, args))
+    return results
+
+
+async def run_phase(
+    client: httpx.AsyncClient, args: argparse.Namespace, duration: float, build: Optional[asyncio.Task] = None
+) -> Dict[str, Any]:
+    """Measure for duration seconds, or until the index build finishes."""
+    stop = asyncio.Event()
+    probes = asyncio.create_task(probe_health(client, stop, args.interval))
+    chats = asyncio.create_task(stream_chats(client, args, stop))
+    waiters = [asyncio.create_task(asyncio.sleep(duration))] + ([build] if build else [])
+    await asyncio.wait(waiters, return_when=asyncio.FIRST_COMPLETED)
+    stop.set()
+    return {"health": await probes, "chats": await chats}
+
+
+def summarize(name: str, phase: Dict[str, Any]) -> None:
+    health = sorted(phase["health"])
+    if health:
+        p95 = health[min(len(health) - 1, int(0.95 * len(health)))]
+        print(
+            f"{name:>14}  /health  n={len(health):<4} p50={statistics.median(health) * 1000:8.1f} ms  "
+            f"p95={p95 * 1000:8.1f} ms  max={health[-1] * 1000:8.1f} ms"
+        )
+    for key in ("first_token", "longest_gap"):
+        values = [chat[key] for chat in phase["chats"]]
+        if values:
+            print(
+                f"{name:>14}  {key:<12} n={len(values):<4} p50={statistics.median(values) * 1000:8.1f} ms  "
+                f"max={max(values) * 1000:8.1f} ms"
+            )
+
+
+async def main(args: argparse.Namespace) -> None:
+    async with httpx.AsyncClient(base_url=args.base_url, timeout=None) as client:
+        idle = await run_phase(client, args, args.idle_duration)
+        build = asyncio.create_task(client.post("/retrieve", json={
+            "repo_url": args.index_repo, "type": args.type, "queries": [args.question], "provider": args.provider,
+        }))
+        building_started_at = time.perf_counter()
+        loaded = await run_phase(client, args, args.duration, build)
+        if build.done():
+            print(f"Index build finished in {time.perf_counter() - building_started_at:.1f}s ({build.result().status_code})")
+        else:
+            print(f"Index build still running after {args.duration:.0f}s")
+            build.cancel()
+    summarize("idle", idle)
+    summarize("during build", loaded)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--base-url", default="http://localhost:8001")
+    parser.add_argument("--index-repo", required=True, help="Repository whose index is built during the test")
+    parser.add_argument("--chat-repo", help="Already indexed repository used for streaming chats")
+    parser.add_argument("--type", default="github", help="Repository type of both repositories")
+    parser.add_argument("--provider", default="google")
+    parser.add_argument("--model", default=None)
+    parser.add_argument("--question", default="How is this project structured?")
+    parser.add_argument("--idle-duration", type=float, default=10.0, help="Seconds measured before the build")
+    parser.add_argument("--duration", type=float, default=300.0, help="Maximum seconds measured during the build")
+    parser.add_argument("--interval", type=float, default=0.1, help="Seconds between /health probes")
+    asyncio.run(main(parser.parse_args()))
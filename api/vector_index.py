@@ -0,0 +1,370 @@
+import json
+import logging
+import os
+import shutil
+from typing import Optional, Tuple
+from uuid import uuid4
+
+import numpy as np
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+# Storage precisions supported for the in-memory copy of the embeddings
+SUPPORTED_VECTOR_DTYPES = ("float32", "float16", "int8")
+# Precisions of the full vectors kept next to a compact copy, for rescoring and as the chunk vectors
+FULL_VECTORS_DTYPES = ("float16", "float32")
+
+# Rows scored per block when scanning the compact vectors, bounds temporary float32 memory
+SCAN_BLOCK_SIZE = 16384
+# Masks keeping at most this share of the rows are searched by scoring only those rows
+SPARSE_MASK_RATIO = 0.25
+
+MANIFEST_FILE = "manifest.json"
+FULL_VECTORS_FILE = "vectors.f32.npy"
+HALF_VECTORS_FILE = "vectors.f16.npy"
+CODES_FILE = "vectors.codes.npy"
+SCALES_FILE = "vectors.scales.npy"
+
+
+def normalize_rows(matrix: np.ndarray) -> np.ndarray:
+    """
+    L2-normalize every row of a matrix so that inner products become cosine similarities.
+
+    Args:
+        matrix: A (N, d) array of vectors
+
+    Returns:
+        np.ndarray: A float32 (N, d) array with unit-length rows (zero rows are left as zeros)
+    """
+    matrix = np.asarray(matrix, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def quantize_vectors(vectors: np.ndarray, dtype: str = "int8") -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """
+    Convert float32 vectors into a compact storage representation.
+
+    float16 keeps the values as half precision. int8 uses symmetric per-vector scaling:
+    each row is divided by max(|x|) / 127 and rounded, and the scale is returned so rows
+    can be reconstructed as codes * scale.
+
+    Args:
+        vectors: A (N, d) float array
+        dtype: One of "float32", "float16" or "int8"
+
+    Returns:
+        Tuple of (codes, scales). scales is None unless dtype is "int8".
+    """
+    if dtype not in SUPPORTED_VECTOR_DTYPES:
+        raise ValueError(f"Unsupported vector dtype '{dtype}', expected one of {SUPPORTED_VECTOR_DTYPES}")
+
+    vectors = np.asarray(vectors, dtype=np.float32)
+    if dtype == "float32":
+        return np.ascontiguousarray(vectors), None
+    if dtype == "float16":
+        return vectors.astype(np.float16), None
+
+    max_abs = np.abs(vectors).max(axis=1) if len(vectors) else np.zeros(0, dtype=np.float32)
+    scales = (max_abs / 127.0).astype(np.float32)
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales
+
+
+def dequantize_vectors(codes: np.ndarray, scales: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Reconstruct float32 vectors from their compact storage representation.
+
+    Args:
+        codes: The stored (N, d) array
+        scales: Per-row scales for int8 codes, None otherwise
+
+    Returns:
+        np.ndarray: A float32 (N, d) array
+    """
+    matrix = np.asarray(codes).astype(np.float32)
+    if scales is not None:
+        matrix *= np.asarray(scales, dtype=np.float32)[:, None]
+    return matrix
+
+
+def save_full_vectors(index_dir: str, vectors: np.ndarray, dtype: str = "float16") -> None:
+    """
+    Persist the normalized vectors an index is rescored against, as float16 (half the size of
+    float32, and far more precise than int8 or product quantization codes) or float32.
+    """
+    if dtype not in FULL_VECTORS_DTYPES:
+        raise ValueError(f"Unsupported full vectors dtype '{dtype}', expected one of {FULL_VECTORS_DTYPES}")
+    if dtype == "float32":
+        np.save(os.path.join(index_dir, FULL_VECTORS_FILE), np.asarray(vectors, dtype=np.float32))
+    else:
+        np.save(os.path.join(index_dir, HALF_VECTORS_FILE), np.asarray(vectors, dtype=np.float16))
+
+
+def load_full_vectors(index_dir: str, include_codes: bool = True) -> Optional[np.ndarray]:
+    """
+    Memory-map the most precise copy of the normalized vectors stored in index_dir: the float32
+    or float16 full vectors, else (with include_codes) the searchable copy when it is stored
+    as float16 or float32.
+
+    Returns:
+        np.ndarray: A (N, d) memory-mapped array, or None if only quantized codes are stored
+    """
+    for filename in (FULL_VECTORS_FILE, HALF_VECTORS_FILE):
+        path = os.path.join(index_dir, filename)
+        if os.path.exists(path):
+            return np.load(path, mmap_mode="r")
+    codes_path = os.path.join(index_dir, CODES_FILE)
+    if include_codes and os.path.exists(codes_path):
+        codes = np.load(codes_path, mmap_mode="r")
+        if codes.dtype in (np.float16, np.float32):
+            return codes
+    return None
+
+
+class VectorIndex:
+    """
+    Exact inner-product search over embeddings kept in a compact dtype.
+
+    The searchable copy is stored as float16 or int8 (with one scale per vector). It is
+    memory-mapped by default, so opening an index takes constant time and its pages live in
+    the OS page cache, shared by every process serving the same repository. When rescoring
+    is enabled, the top candidates from the int8 scan are re-ranked against the float16 (or,
+    if configured, float32) full vectors, which are memory-mapped as well so only the candidate
+    rows are paged in. A float16 copy is searched as is: its only more precise counterpart
+    would be a float32 copy, which is not kept unless asked for.
+    """
+
+    def __init__(
+        self,
+        codes: np.ndarray,
+        scales: Optional[np.ndarray] = None,
+        full_vectors: Optional[np.ndarray] = None,
+        rescore: bool = True,
+        rescore_factor: int = 4,
+        version: Optional[str] = None,
+    ):
+        self.codes = codes
+        self.scales = scales
+        self.full_vectors = full_vectors
+        # Rescoring only helps against vectors more precise than the ones scanned
+        self.rescore = (
+            rescore and full_vectors is not None and full_vectors.dtype.itemsize > codes.dtype.itemsize
+        )
+        self.rescore_factor = max(1, int(rescore_factor))
+        # Changes whenever the index is rebuilt, so cached search results can be keyed on it
+        self.version = version or uuid4().hex
+        self.engine = "numpy"
+
+    @property
+    def dtype(self) -> str:
+        return str(self.codes.dtype)
+
+    @property
+    def dimensions(self) -> int:
+        return int(self.codes.shape[1]) if self.codes.ndim == 2 else 0
+
+    def __len__(self) -> int:
+        return int(self.codes.shape[0])
+
+    @property
+    def nbytes(self) -> int:
+        """Size of the compact vectors (the full vectors used for rescoring are memory-mapped and not counted)."""
+        return int(self.codes.nbytes + (self.scales.nbytes if self.scales is not None else 0))
+
+    @classmethod
+    def build(
+        cls,
+        vectors: np.ndarray,
+        index_dir: str,
+        dtype: str = "int8",
+        rescore: bool = True,
+        rescore_factor: int = 4,
+        mmap: bool = True,
+        full_vectors_dtype: str = "float16",
+    ) -> "VectorIndex":
+        """
+        Normalize and quantize the vectors, persist them to index_dir and return the loaded index.
+
+        Args:
+            vectors: A (N, d) array of embeddings
+            index_dir: Directory the vector files are written to (replaced if it exists)
+            dtype: Storage dtype for the searchable copy
+            rescore: Whether to re-rank the top candidates with the full vectors
+            rescore_factor: Candidates kept for rescoring, as a multiple of top_k
+            mmap: Whether the loaded index memory-maps the compact vectors
+            full_vectors_dtype: Precision of the full vectors kept next to a less precise
+                searchable copy, "float16" or "float32"
+
+        Returns:
+            VectorIndex: The index, loaded back from disk
+        """
+        full_vectors = normalize_rows(vectors)
+        codes, scales = quantize_vectors(full_vectors, dtype)
+
+        tmp_dir = f"{index_dir}.{uuid4().hex}.tmp"
+        os.makedirs(tmp_dir, exist_ok=True)
+        try:
+            # The searchable copy doubles as the full vectors when it is at least as precise
+            if np.dtype(full_vectors_dtype).itemsize > codes.dtype.itemsize:
+                save_full_vectors(tmp_dir, full_vectors, full_vectors_dtype)
+            np.save(os.path.join(tmp_dir, CODES_FILE), codes)
+            if scales is not None:
+                np.save(os.path.join(tmp_dir, SCALES_FILE), scales)
+            with open(os.path.join(tmp_dir, MANIFEST_FILE), "w", encoding="utf-8") as f:
+                json.dump({
+                    "count": int(full_vectors.shape[0]),
+                    "dimensions": int(full_vectors.shape[1]),
+                    "engine": "numpy",
+                    "dtype": dtype,
+                    "version": uuid4().hex,
+                }, f)
+
+            shutil.rmtree(index_dir, ignore_errors=True)
+            os.replace(tmp_dir, index_dir)
+        except BaseException:
+            shutil.rmtree(tmp_dir, ignore_errors=True)
+            raise
+        logger.info(f"Saved {full_vectors.shape[0]} vectors as {dtype} to {index_dir}")
+        return cls.load(index_dir, rescore=rescore, rescore_factor=rescore_factor, mmap=mmap)
+
+    @classmethod
+    def load(
+        cls, index_dir: str, rescore: bool = True, rescore_factor: int = 4, mmap: bool = True
+    ) -> "VectorIndex":
+        """
+        Load an index written by build(). The full vectors are memory-mapped for rescoring,
+        and so are the compact vectors unless mmap is False, in which case they are read into
+        process memory (for example when index_dir is on a network filesystem).
+        """
+        mmap_mode = "r" if mmap else None
+        codes = np.load(os.path.join(index_dir, CODES_FILE), mmap_mode=mmap_mode)
+        scales_path = os.path.join(index_dir, SCALES_FILE)
+        scales = np.load(scales_path, mmap_mode=mmap_mode) if os.path.exists(scales_path) else None
+        full_vectors = load_full_vectors(index_dir, include_codes=False) if rescore else None
+        manifest = cls.read_manifest(index_dir) or {}
+        return cls(
+            codes,
+            scales=scales,
+            full_vectors=full_vectors,
+            rescore=rescore,
+            rescore_factor=rescore_factor,
+            version=manifest.get("version"),
+        )
+
+    @staticmethod
+    def read_manifest(index_dir: str) -> Optional[dict]:
+        """Return the manifest of an index directory, or None if it is missing or unreadable."""
+        try:
+            with open(os.path.join(index_dir, MANIFEST_FILE), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _scan(self, queries: np.ndarray, rows: Optional[np.ndarray] = None) -> np.ndarray:
+        """
+        Score the stored vectors against the queries using the compact copy, block by block.
+        When rows (ascending) is given, only those rows are scored, in that order.
+        """
+        count = len(self) if rows is None else len(rows)
+        scores = np.empty((count, queries.shape[0]), dtype=np.float32)
+        for start in range(0, count, SCAN_BLOCK_SIZE):
+            end = min(start + SCAN_BLOCK_SIZE, count)
+            block_rows = slice(start, end) if rows is None else rows[start:end]
+            block_scores = self.codes[block_rows].astype(np.float32) @ queries.T
+            if self.scales is not None:
+                block_scores *= self.scales[block_rows, None]
+            scores[start:end] = block_scores
+        return scores
+
+    def search(
+        self, queries: np.ndarray, top_k: int, mask: Optional[np.ndarray] = None
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Find the top_k most similar vectors for each query.
+
+        Args:
+            queries: A (m, d) or (d,) array of query embeddings
+            top_k: Number of results per query
+            mask: Optional boolean array of length len(self); only rows where it is True are returned
+
+        Returns:
+            Tuple of (scores, indices), both shaped (m, k) with k = min(top_k, number of
+            searchable rows). Scores are cosine similarities.
+        """
+        queries = normalize_rows(np.atleast_2d(queries))
+        if queries.shape[1] != self.dimensions:
+            raise ValueError(f"Query dimension {queries.shape[1]} does not match index dimension {self.dimensions}")
+        if mask is not None and len(mask) != len(self):
+            raise ValueError(f"Mask length {len(mask)} does not match index size {len(self)}")
+
+        searchable = len(self) if mask is None else int(np.count_nonzero(mask))
+        k = min(top_k, searchable)
+        if k <= 0:
+            empty = np.zeros((queries.shape[0], 0))
+            return empty.astype(np.float32), empty.astype(np.int64)
+
+        n_candidates = min(searchable, k * self.rescore_factor) if self.rescore else k
+        # Column i of scores belongs to row rows[i], or to row i when every row is scanned
+        rows = None
+        if mask is not None and searchable <= SPARSE_MASK_RATIO * len(self):
+            rows = np.flatnonzero(mask)
+            scores = self._scan(queries, rows)
+        else:
+            scores = self._scan(queries)
+            if mask is not None:
+                # Excluded rows sort last, so they are never among the top n_candidates < searchable
+                scores[~mask] = -np.inf
+
+        all_scores = np.empty((queries.shape[0], k), dtype=np.float32)
+        all_indices = np.empty((queries.shape[0], k), dtype=np.int64)
+        for qi in range(queries.shape[0]):
+            column = scores[:, qi]
+            if n_candidates < searchable:
+                positions = np.argpartition(-column, n_candidates - 1)[:n_candidates]
+            elif mask is None or rows is not None:
+                positions = np.arange(len(column))
+            else:
+                positions = np.flatnonzero(mask)
+
+            if self.rescore:
+                positions = np.sort(positions)
+            candidates = positions if rows is None else rows[positions]
+            if self.rescore:
+                candidate_scores = np.asarray(self.full_vectors[candidates], dtype=np.float32) @ queries[qi]
+            else:
+                candidate_scores = column[positions]
+
+            order = np.argsort(-candidate_scores, kind="stable")[:k]
+            all_indices[qi] = candidates[order]
+            all_scores[qi] = candidate_scores[order]
+        return all_scores, all_indices
+
+    def measure_recall(self, queries: np.ndarray, top_k: int) -> float:
+        """
+        Measure recall@top_k of this index against exact search over the full vectors.
+
+        Args:
+            queries: A (m, d) array of sample query embeddings
+            top_k: Cutoff used for both searches
+
+        Returns:
+            float: Fraction of the exact top_k results that this index also returns
+        """
+        if self.full_vectors is not None:
+            reference = np.asarray(self.full_vectors, dtype=np.float32)
+        elif self.codes.dtype in (np.float16, np.float32):
+            reference = np.asarray(self.codes, dtype=np.float32)
+        else:
+            raise ValueError("Recall can only be measured when the full vectors are available")
+
+        queries = normalize_rows(np.atleast_2d(queries))
+        k = min(top_k, len(self))
+        exact_scores = queries @ reference.T
+        exact = np.argsort(-exact_scores, axis=1)[:, :k]
+        _, approx = self.search(queries, top_k)
+        hits = sum(len(set(exact[i]) & set(approx[i])) for i in range(queries.shape[0]))
+        return hits / float(exact.size) if exact.size else 1.0
@@ -0,0 +1,136 @@
+import logging
+from typing import Any, Callable, Dict, List, Optional, Sequence, Union
+
+import numpy as np
+from adalflow.core.retriever import Retriever
+from adalflow.core.types import RetrieverOutput, RetrieverOutputType
+
+from api.retrieval_cache import normalize_query, query_embedding_cache
+from api.ann_index import AnnIndex
+from api.vector_index import VectorIndex
+
+# Configure logging
+logger = logging.getLogger(__name__)
+
+
+def cosine_to_probability(scores: np.ndarray) -> np.ndarray:
+    """Map cosine similarities in [-1, 1] to [0, 1], matching adalflow's FAISSRetriever "prob" metric."""
+    return np.round((np.clip(scores, -1, 1) + 1) / 2, 3)
+
+
+class VectorRetriever(Retriever):
+    """
+    Retriever over a VectorIndex or an AnnIndex.
+    Drop-in replacement for adalflow's FAISSRetriever: string queries are embedded with the
+    given embedder, and the output is a list of RetrieverOutput with doc_indices and
+    doc_scores in the same "prob" scale.
+    """
+
+    def __init__(
+        self,
+        index: Union[VectorIndex, AnnIndex],
+        embedder: Optional[Callable] = None,
+        top_k: int = 5,
+        embedder_key: Optional[str] = None,
+    ):
+        """
+        Args:
+            index: The vector index to search, exact or approximate
+            embedder: Embedder used to turn string queries into vectors
+            top_k: Default number of chunks to retrieve
+            embedder_key: Identifies the embedding model; query embeddings are cached under it when set
+        """
+        super().__init__()
+        self.index = index
+        self.embedder = embedder
+        self.top_k = top_k
+        self.embedder_key = embedder_key
+        self.indexed = len(index) > 0
+
+    def embed_queries(self, queries: List[str]) -> np.ndarray:
+        """
+        Embed string queries and return a (m, d) float32 matrix.
+        Embeddings are looked up in the shared query embedding cache first, and only the
+        misses are sent to the embedder, in a single call.
+        """
+        embeddings: List[Optional[np.ndarray]] = [None] * len(queries)
+        missing: Dict[str, List[int]] = {}
+        for i, query in enumerate(queries):
+            cached = query_embedding_cache.get((self.embedder_key, normalize_query(query))) if self.embedder_key else None
+            if cached is not None:
+                embeddings[i] = cached
+            else:
+                missing.setdefault(query, []).append(i)
+
+        if missing:
+            if not self.embedder:
+                raise ValueError("Embedder is not provided")
+            missing_queries = list(missing.keys())
+            output = self.embedder(missing_queries)
+            if output.error:
+                raise ValueError(f"Error embedding queries: {output.error}")
+            for query, data in zip(missing_queries, output.data):
+                embedding = np.asarray(data.embedding, dtype=np.float32)
+                embedding.setflags(write=False)
+                if self.embedder_key:
+                    query_embedding_cache.put((self.embedder_key, normalize_query(query)), embedding)
+                for i in missing[query]:
+                    embeddings[i] = embedding
+            if any(embedding is None for embedding in embeddings):
+                raise ValueError("Embedder returned fewer embeddings than queries")
+
+        return np.stack(embeddings).astype(np.float32, copy=False)
+
+    def retrieve_embedding_queries(
+        self, input: Any, top_k: Optional[int] = None, mask: Optional[np.ndarray] = None
+    ) -> RetrieverOutputType:
+        """Retrieve the top k chunks for queries already in embedding form, among the rows allowed by mask."""
+        queries = np.atleast_2d(np.asarray(input, dtype=np.float32))
+        scores, indices = self.index.search(queries, top_k or self.top_k, mask=mask)
+        scores = cosine_to_probability(scores)
+        # Approximate engines mark missing neighbors with -1
+        return [
+            RetrieverOutput(doc_indices=row_indices[found].tolist(), doc_scores=row_scores[found].tolist())
+            for row_indices, row_scores, found in zip(indices, scores, indices >= 0)
+        ]
+
+    def retrieve_string_queries(
+        self, input: Union[str, List[str]], top_k: Optional[int] = None, mask: Optional[np.ndarray] = None
+    ) -> RetrieverOutputType:
+        """Retrieve the top k chunks for one or more string queries. Empty queries get empty results."""
+        queries = [input] if isinstance(input, str) else list(input)
+        output: RetrieverOutputType = [RetrieverOutput(doc_indices=[], doc_scores=[], query=query) for query in queries]
+
+        record_map: Dict[int, int] = {}
+        valid_queries: List[str] = []
+        for i, query in enumerate(queries):
+            if not query:
+                logger.warning("Empty query found, skipping")
+                continue
+            record_map[len(valid_queries)] = i
+            valid_queries.append(query)
+        if not valid_queries:
+            return output
+
+        retrieved = self.retrieve_embedding_queries(self.embed_queries(valid_queries), top_k, mask)
+        for i, per_query_output in enumerate(retrieved):
+            initial_index = record_map[i]
+            output[initial_index].doc_indices = per_query_output.doc_indices
+            output[initial_index].doc_scores = per_query_output.doc_scores
+        return output
+
+    def call(
+        self, input: Union[str, Sequence[str], Any], top_k: Optional[int] = None, mask: Optional[np.ndarray] = None
+    ) -> RetrieverOutputType:
+        """
+        Retrieve the top k chunks given the query or queries in string or embedding format.
+        When mask is given, only the chunks whose entry is True can be returned.
+        """
+        if not self.indexed:
+            raise ValueError("Index is empty. Please set the chunks to build the index from")
+        if isinstance(input, str) or (isinstance(input, Sequence) and len(input) > 0 and isinstance(input[0], str)):
+            return self.retrieve_string_queries(input, top_k, mask)
+        return self.retrieve_embedding_queries(input, top_k, mask)
+
+    def _extra_repr(self) -> str:
+        return f"top_k={self.top_k}, engine={self.index.engine}, dtype={self.index.dtype}, rescore={self.index.rescore}"
@@ -11,10 +11,15 @@ from pydantic import BaseModel, Field
 
 from api.config import get_model_config, configs, OPENROUTER_API_KEY, OPENAI_API_KEY
 from api.data_pipeline import count_tokens, get_file_content
+from api.context_merge import merge_chunks
 from api.openai_client import OpenAIClient
 from api.openrouter_client import OpenRouterClient
 from api.azureai_client import AzureAIClient
 from api.rag import RAG
+from api.client_pool import get_client
+from api.executors import iterate_blocking, run_blocking
+from api.index_jobs import index_jobs
+from api.metadata_filters import resolve_metadata_filters
 
 # Configure logging
 from api.logging_config import setup_logging
@@ -47,6 +52,9 @@ class ChatCompletionRequest(BaseModel):
     excluded_files: Optional[str] = Field(None, description="Comma-separated list of file patterns to exclude from processing")
     included_dirs: Optional[str] = Field(None, description="Comma-separated list of directories to include exclusively")
     included_files: Optional[str] = Field(None, description="Comma-separated list of file patterns to include exclusively")
+    metadata_filters: Optional[Dict[str, Any]] = Field(
+        None, description="Predicates on the chunks to search: code_only, implementation_only, exclude_tests, path_prefix, languages"
+    )
 
 async def handle_websocket_chat(websocket: WebSocket):
     """
@@ -60,20 +68,37 @@ async def handle_websocket_chat(websocket: WebSocket):
         request_data = await websocket.receive_json()
         request = ChatCompletionRequest(**request_data)
 
+        # 元数据过滤条件无效时直接返回错误，而不是在没有上下文的情况下生成回答
+        try:
+            resolve_metadata_filters(request.metadata_filters)
+        except ValueError as e:
+            await websocket.send_text(f"Error: {str(e)}")
+            await websocket.close()
+            return
+
         # 检查请求是否包含过大输入内容
         input_too_large = False
         if request.messages and len(request.messages) > 0:
             last_message = request.messages[-1]
             if hasattr(last_message, 'content') and last_message.content:
-                tokens = count_tokens(last_message.content, request.provider == "ollama")
+                tokens = await run_blocking("cpu", count_tokens, last_message.content, request.provider == "ollama")
                 logger.info(f"Request size: {tokens} tokens")
                 if tokens > 8000:
                     logger.warning(f"Request exceeds recommended token limit ({tokens} > 7500)")
                     input_too_large = True
 
+        # 仓库仍在由索引任务构建时，等待该任务一段时间；超时则直接拒绝，不再重复构建索引
+        indexing_job = await index_jobs.wait_for_repo(request.repo_url, request.type)
+        if indexing_job is not None:
+            await websocket.send_text(
+                f"Error: Repository is still being indexed by job {indexing_job.id} ({indexing_job.stage}), see GET /index/{indexing_job.id}"
+            )
+            await websocket.close()
+            return
+
         # 创建一个新的 RAG 实例用于当前请求处理
         try:
-            request_rag = RAG(provider=request.provider, model=request.model)
+            request_rag = await run_blocking("io", RAG, provider=request.provider, model=request.model)
 
             # 提取用户提供的文件过滤参数（如存在）
             excluded_dirs = None
@@ -98,8 +123,12 @@ async def handle_websocket_chat(websocket: WebSocket):
                 included_files = [unquote(file_pattern) for file_pattern in request.included_files.split('\n') if file_pattern.strip()]
                 logger.info(f"Using custom included files: {included_files}")
 
-            # 使用给定参数初始化检索器
-            request_rag.prepare_retriever(request.repo_url, request.type, request.token, excluded_dirs, excluded_files, included_dirs, included_files)
+            # 使用给定参数初始化检索器；已加载的索引直接在 io 线程池中返回，
+            # 只有索引的加载或构建才占用容量有限的索引线程池，不阻塞其他连接
+            await run_blocking(
+                "io", request_rag.prepare_retriever,
+                request.repo_url, request.type, request.token, excluded_dirs, excluded_files, included_dirs, included_files,
+            )
             logger.info(f"Retriever prepared for {request.repo_url}")
         except ValueError as e:
             if "No valid documents with embeddings found" in str(e):
@@ -207,13 +236,25 @@ async def handle_websocket_chat(websocket: WebSocket):
 
                 # 尝试执行 RAG 检索
                 try:
-                    # 调用 RAG 实例进行检索
-                    retrieved_documents = request_rag(rag_query, language=request.language)
+                    # 请求指定的文件直接在路径索引中查找，无需调用嵌入模型
+                    if request.filePath:
+                        retrieved_documents = await run_blocking(
+                            "io", request_rag.lookup_file, request.filePath, metadata_filters=request.metadata_filters
+                        )
+                    if not retrieved_documents:
+                        # 调用 RAG 实例进行检索
+                        retrieved_documents = await run_blocking(
+                            "io", request_rag, rag_query, language=request.language, metadata_filters=request.metadata_filters
+                        )
 
                     if retrieved_documents and retrieved_documents[0].documents:
                         # 获取检索到的文档列表
                         documents = retrieved_documents[0].documents
                         logger.info(f"Retrieved {len(documents)} documents")
+                        # 合并同一文件中相邻或重叠的片段，避免重复文本进入提示词
+                        documents = (await run_blocking(
+                            "cpu", merge_chunks, documents, lambda text: count_tokens(text, request.provider == "ollama")
+                        )).documents
 
                         # 按文件路径对文档分组
                         docs_by_file = {}
@@ -405,7 +446,9 @@ This file contains...
         file_content = ""
         if request.filePath:
             try:
-                file_content = get_file_content(request.repo_url, request.filePath, request.type, request.token)
+                file_content = await run_blocking(
+                    "io", get_file_content, request.repo_url, request.filePath, request.type, request.token
+                )
                 logger.info(f"Successfully retrieved content for file: {request.filePath}")
             except Exception as e:
                 logger.error(f"Error retrieving file content: {str(e)}")
@@ -456,8 +499,8 @@ This file contains...
             # 在 Ollama 提示末尾添加 /no_think 指令，避免模型提前思考
             prompt += " /no_think"
 
-            # 初始化 Ollama 客户端实例
-            model = OllamaClient()
+            # 复用进程内共享的 Ollama 客户端实例
+            model = get_client(OllamaClient)
             # 构建 Ollama 的参数字典，包含模型名称、是否流式输出、以及选项参数如温度、top_p、上下文长度等
             model_kwargs = {
                 "model": model_config["model"],
@@ -483,8 +526,8 @@ This file contains...
                 logger.warning("OPENROUTER_API_KEY not configured, but continuing with request")
                 # OpenRouterClient 会处理该情况并返回友好的错误信息
 
-            # 初始化 OpenRouter 客户端实例
-            model = OpenRouterClient()
+            # 复用进程内共享的 OpenRouter 客户端实例
+            model = get_client(OpenRouterClient)
             # 构建 OpenRouter 的参数字典，包括模型名称、是否流式输出、温度等
             model_kwargs = {
                 "model": request.model,
@@ -510,8 +553,8 @@ This file contains...
                 logger.warning("OPENAI_API_KEY not configured, but continuing with request")
                 # OpenAIClient 会处理该情况并返回错误信息
 
-            # 初始化 OpenAI 客户端实例
-            model = OpenAIClient()
+            # 复用进程内共享的 OpenAI 客户端实例
+            model = get_client(OpenAIClient)
             # 构建 OpenAI 的参数字典，包括模型名称、是否流式输出、温度等
             model_kwargs = {
                 "model": request.model,
@@ -532,8 +575,8 @@ This file contains...
             # 记录日志：使用 Azure AI 及指定模型
             logger.info(f"Using Azure AI with model: {request.model}")
 
-            # 初始化 Azure AI 客户端实例
-            model = AzureAIClient()
+            # 复用进程内共享的 Azure AI 客户端实例
+            model = get_client(AzureAIClient)
             # 构建 Azure AI 的参数字典，包括模型名称、是否流式输出、温度、top_p 等
             model_kwargs = {
                 "model": request.model,
@@ -636,9 +679,9 @@ This file contains...
                     await websocket.close()
             else:
                 # Generate streaming response
-                response = model.generate_content(prompt, stream=True)
-                # Stream the response
-                for chunk in response:
+                response = await run_blocking("io", model.generate_content, prompt, stream=True)
+                # Stream the response, fetching each chunk off the event loop
+                async for chunk in iterate_blocking("io", response):
                     if hasattr(chunk, 'text'):
                         await websocket.send_text(chunk.text)
                 # Explicitly close the WebSocket connection after the response is complete
@@ -768,9 +811,11 @@ This file contains...
                         )
 
                         # Get streaming response using simplified prompt
-                        fallback_response = fallback_model.generate_content(simplified_prompt, stream=True)
+                        fallback_response = await run_blocking(
+                            "io", fallback_model.generate_content, simplified_prompt, stream=True
+                        )
                         # Stream the fallback response
-                        for chunk in fallback_response:
+                        async for chunk in iterate_blocking("io", fallback_response):
                             if hasattr(chunk, 'text'):
                                 await websocket.send_text(chunk.text)
                 except Exception as e2:
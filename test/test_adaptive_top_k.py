@@ -0,0 +1,51 @@
+#!/usr/bin/env python3
+"""
+Tests for the score-adaptive cutoff of retrieved results.
+
+Usage: python -m pytest test/test_adaptive_top_k.py
+"""
+
+import os
+import sys
+
+import pytest
+
+# Add the parent directory to the path to import the api package
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.adaptive_top_k import AdaptiveTopKStats, adaptive_cutoff, get_adaptive_top_k_config
+
+
+class TestAdaptiveCutoff:
+    """Tests for adaptive_cutoff"""
+
+    def test_cuts_at_largest_gap(self):
+        scores = [0.82, 0.8, 0.79, 0.41, 0.4, 0.38, 0.37]
+        assert adaptive_cutoff(scores, min_k=2, max_k=10, min_gap_ratio=0.3) == (3, "gap")
+        # A gap smaller than the ratio of the range is not a cut point
+        assert adaptive_cutoff(scores, min_k=2, max_k=10, min_gap_ratio=0.9) == (7, "max_k")
+
+    def test_min_score_then_gap(self):
+        scores = [0.7, 0.69, 0.68, 0.5, 0.49, 0.1, 0.05]
+        assert adaptive_cutoff(scores, min_k=1, max_k=10, min_score=0.2) == (5, "min_score")
+        assert adaptive_cutoff(scores, min_k=1, max_k=10, min_score=0.2, min_gap_ratio=0.5) == (3, "gap")
+
+    def test_bounds(self):
+        scores = [0.9, 0.1, 0.09, 0.08, 0.07, 0.06]
+        # Never fewer than min_k, never more than max_k
+        assert adaptive_cutoff(scores, min_k=3, max_k=10, min_score=0.5, min_gap_ratio=0.3)[0] == 3
+        assert adaptive_cutoff(scores, min_k=1, max_k=4) == (4, "max_k")
+        assert adaptive_cutoff(scores[:2], min_k=3, max_k=10, min_score=0.5) == (2, "max_k")
+        # Equal scores have no gap to cut at
+        assert adaptive_cutoff([0.5] * 6, min_k=2, max_k=10, min_gap_ratio=0.1) == (6, "max_k")
+
+    def test_config_and_stats(self):
+        assert get_adaptive_top_k_config({"min_k": 2})["max_k"] == 20
+        with pytest.raises(ValueError):
+            get_adaptive_top_k_config({"min_k": 8, "max_k": 4})
+        stats = AdaptiveTopKStats()
+        stats.record(20, 5, "gap")
+        stats.record(20, 9, "min_score")
+        assert stats.stats() == {
+            "queries": 2, "average_retrieved": 20.0, "average_kept": 7.0, "cut_by": {"gap": 1, "min_score": 1}
+        }
@@ -0,0 +1,108 @@
+#!/usr/bin/env python3
+"""
+Tests for the approximate nearest-neighbor engines and their selection.
+
+Usage: python -m pytest test/test_ann_index.py
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Add the parent directory to the path to import the api package
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api import ann_index
+from api.ann_index import (
+    AnnIndex,
+    benchmark,
+    build_vector_index,
+    load_vector_index,
+    resolve_ann_params,
+    select_engine,
+    vector_index_matches,
+)
+from api.vector_index import VectorIndex
+
+
+class TestEngineSelection:
+    """Tests for engine and parameter resolution"""
+
+    def test_auto_picks_by_count(self):
+        assert select_engine(1000) == "numpy"
+        assert select_engine(200000) == "hnsw"
+        assert select_engine(5000000) == "ivfpq"
+        assert select_engine(1000, auto_thresholds={"numpy": 500}) == "hnsw"
+        assert select_engine(10, "ivf") == "ivf"
+        with pytest.raises(ValueError):
+            select_engine(10, "annoy")
+
+    def test_default_parameters(self):
+        params = resolve_ann_params("ivfpq", 1000000, 1536)
+        assert params["nlist"] == 4000
+        assert params["pq_m"] == 384 and 1536 % params["pq_m"] == 0
+        assert params["pq_nbits"] == 8
+        # Small corpora get fewer lists and centroids than they have training points for
+        small = resolve_ann_params("ivfpq", 100, 64)
+        assert small["nlist"] == 2
+        assert small["pq_nbits"] == 1
+
+
+class TestAnnIndex:
+    """Tests for building, loading and searching FAISS indexes"""
+
+    def setup_method(self):
+        rng = np.random.default_rng(0)
+        centers = rng.normal(size=(20, 32))
+        self.vectors = (centers[rng.integers(20, size=2000)] + 0.3 * rng.normal(size=(2000, 32))).astype(np.float32)
+        self.queries = self.vectors[:20] + 0.05 * rng.normal(size=(20, 32)).astype(np.float32)
+
+    @pytest.mark.parametrize("engine", ["flat", "hnsw", "ivf", "ivfpq"])
+    def test_recall_and_reload(self, tmp_path, engine):
+        index_dir = str(tmp_path / engine)
+        # Product quantization is coarse, so IVF-PQ relies on rescoring a larger candidate pool
+        index = AnnIndex.build(self.vectors, index_dir, engine=engine, params={"nprobe": 8}, rescore_factor=10)
+        assert len(index) == 2000 and index.dimensions == 32
+        assert index.measure_recall(self.queries, top_k=10) >= 0.9
+
+        loaded = load_vector_index(index_dir, {"ann": {"nprobe": 8, "rescore_factor": 10}})
+        assert isinstance(loaded, AnnIndex) and loaded.engine == engine
+        np.testing.assert_array_equal(loaded.search(self.queries, 5)[1], index.search(self.queries, 5)[1])
+
+    @pytest.mark.parametrize("engine", ["hnsw", "ivfpq"])
+    def test_mask_restricts_results(self, tmp_path, engine, monkeypatch):
+        index = AnnIndex.build(self.vectors, str(tmp_path / engine), engine=engine)
+        mask = np.zeros(2000, dtype=bool)
+        mask[::4] = True
+        exact_scores, exact = index.search(self.queries, 5, mask=mask)
+        assert (exact % 4 == 0).all()
+
+        # Larger masks are applied inside the FAISS search
+        monkeypatch.setattr(ann_index, "EXACT_MASK_MAX_ROWS", 0)
+        _, filtered = index.search(self.queries, 5, mask=mask)
+        found = filtered[filtered >= 0]
+        assert len(found) and (found % 4 == 0).all()
+
+    def test_build_follows_configuration(self, tmp_path):
+        tiny = build_vector_index(self.vectors[:100], str(tmp_path / "tiny"), {"engine": "auto", "dtype": "int8"})
+        assert isinstance(tiny, VectorIndex) and tiny.dtype == "int8"
+
+        config = {"engine": "auto", "auto_thresholds": {"numpy": 1000}, "ann": {"hnsw_m": 16}}
+        index_dir = str(tmp_path / "large")
+        large = build_vector_index(self.vectors, index_dir, config)
+        assert large.engine == "hnsw"
+
+        manifest = VectorIndex.read_manifest(index_dir)
+        assert vector_index_matches(manifest, 2000, config)
+        # Search-time parameters do not require a rebuild, build-time ones do
+        assert vector_index_matches(manifest, 2000, dict(config, ann={"hnsw_m": 16, "ef_search": 256}))
+        assert not vector_index_matches(manifest, 2000, dict(config, ann={"hnsw_m": 32}))
+        assert not vector_index_matches(manifest, 2000, dict(config, engine="ivf"))
+
+    def test_benchmark_reports_each_engine(self, tmp_path):
+        rows = benchmark(self.vectors, self.queries, ["numpy", "hnsw"], top_k=10, work_dir=str(tmp_path))
+        assert [row["engine"] for row in rows] == ["numpy", "hnsw"]
+        assert rows[0]["recall@10"] == 1.0
+        assert all(row["p50_ms"] >= 0 for row in rows)
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+"""
+Tests for publishing and pulling repository indexes through a shared artifact store.
+
+Usage: python -m pytest test/test_artifact_store.py
+"""
+
+import io
+import os
+import sys
+
+import numpy as np
+import pytest
+from adalflow.core.types import Document
+
+# Add the parent directory to the path to import the api package
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.artifact_store import (
+    ArtifactStore,
+    LocalArtifactStore,
+    S3ArtifactStore,
+    create_artifact_store,
+)
+from api.index_store import open_index, write_index
+
+
+class InMemoryS3Client:
+    """Stand-in for the subset of the boto3 S3 client used by S3ArtifactStore"""
+
+    class NotFound(Exception):
+        response = {"Error": {"Code": "NoSuchKey"}}
+
+    def __init__(self):
+        self.objects = {}
+
+    def get_object(self, Bucket, Key):
+        if (Bucket, Key) not in self.objects:
+            raise self.NotFound(Key)
+        return {"Body": io.BytesIO(self.objects[(Bucket, Key)])}
+
+    def put_object(self, Bucket, Key, Body, ContentType=None):
+        self.objects[(Bucket, Key)] = Body
+
+    def upload_file(self, Filename, Bucket, Key):
+        with open(Filename, "rb") as f:
+            self.objects[(Bucket, Key)] = f.read()
+
+    def download_file(self, Bucket, Key, Filename):
+        with open(Filename, "wb") as f:
+            f.write(self.objects[(Bucket, Key)])
+
+
+@pytest.fixture
+def index_dir(tmp_path):
+    rng = np.random.default_rng(3)
+    documents = [
+        Document(
+            text=f"chunk {i}",
+            meta_data={"file_path": f"src/file_{i % 2}.py"},
+            vector=rng.normal(size=8).astype(np.float32).tolist(),
+        )
+        for i in range(6)
+    ]
+    path = str(tmp_path / "node-a" / "repo-abc.index")
+    write_index(documents, path)
+    return path
+
+
+def _check_pulled(store, tmp_path, source_dir):
+    target_dir = str(tmp_path / "node-b" / "repo-abc.index")
+    os.makedirs(os.path.dirname(target_dir))
+    artifact = store.pull("abc", target_dir)
+    assert artifact["entry"] == {"repo": "github:github.com/o/r"}
+    pulled, source = open_index(target_dir), open_index(source_dir)
+    assert len(pulled) == len(source) == 6
+    assert pulled[4].text == "chunk 4"
+    np.testing.assert_array_equal(pulled.vectors, source.vectors)
+    # Only the downloaded index is left in the databases directory
+    assert os.listdir(os.path.dirname(target_dir)) == ["repo-abc.index"]
+
+
+class TestArtifactStore:
+    """Tests for the directory and S3 artifact stores"""
+
+    def test_local_store_roundtrip(self, tmp_path, index_dir):
+        store = LocalArtifactStore(str(tmp_path / "shared"))
+        assert store.pull("abc", str(tmp_path / "missing.index")) is None
+        assert store.publish("abc", index_dir, {"repo": "github:github.com/o/r"})
+        # A key is published once
+        assert not store.publish("abc", index_dir, {"repo": "github:github.com/o/r"})
+        _check_pulled(store, tmp_path, index_dir)
+
+    def test_s3_store_roundtrip(self, tmp_path, index_dir):
+        client = InMemoryS3Client()
+        store = S3ArtifactStore("bucket", prefix="/deepwiki/indexes/", client=client)
+        assert store.get_artifact("abc") is None
+        assert store.publish("abc", index_dir, {"repo": "github:github.com/o/r"})
+        assert ("bucket", "deepwiki/indexes/abc/artifact.json") in client.objects
+        assert ("bucket", "deepwiki/indexes/abc/vectors/vectors.codes.npy") in client.objects
+        _check_pulled(store, tmp_path, index_dir)
+
+    def test_incomplete_download_is_discarded(self, tmp_path, index_dir):
+        store = LocalArtifactStore(str(tmp_path / "shared"))
+        store.publish("abc", index_dir, {})
+        os.remove(str(tmp_path / "shared" / "abc" / "manifest.json"))
+        target_dir = str(tmp_path / "node-b" / "repo-abc.index")
+        with pytest.raises(ValueError):
+            store.pull("abc", target_dir)
+        assert not os.path.exists(os.path.dirname(target_dir)) or not os.listdir(os.path.dirname(target_dir))
+
+    def test_create_from_url(self, tmp_path):
+        assert create_artifact_store({"url": ""}) is None
+        assert isinstance(create_artifact_store({"url": str(tmp_path)}), LocalArtifactStore)
+        assert create_artifact_store({"url": f"file://{tmp_path}"}).root_path == str(tmp_path)
+        with pytest.raises(ValueError):
+            create_artifact_store({"url": "ftp://host/indexes"})
+        # Stores implement the lookup, upload and download of artifacts
+        with pytest.raises(TypeError):
+            ArtifactStore()
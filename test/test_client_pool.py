@@ -0,0 +1,103 @@
+#!/usr/bin/env python3
+"""
+Tests for the process-wide pool of model clients.
+
+Usage: python -m pytest test/test_client_pool.py
+"""
+
+import os
+import sys
+import threading
+
+# Add the parent directory to the path to import the api package
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from adalflow.core.types import ModelType
+from openai import Stream
+from openai.types.chat import ChatCompletion
+
+from api import client_pool as client_pool_module
+from api import openai_client as openai_client_module
+from api.client_pool import ClientPool
+from api.openai_client import OpenAIClient
+
+
+class FakeClient:
+    """Counts how many instances are created"""
+
+    instances = 0
+
+    def __init__(self, api_key=None, base_url=None):
+        FakeClient.instances += 1
+        self.api_key = api_key
+        self.base_url = base_url
+
+
+class TestClientPool:
+    """Tests for ClientPool"""
+
+    def setup_method(self):
+        FakeClient.instances = 0
+
+    def test_clients_are_reused_per_arguments(self):
+        pool = ClientPool()
+        first = pool.get(FakeClient)
+        assert pool.get(FakeClient) is first
+        other = pool.get(FakeClient, api_key="k", base_url="https://example.com")
+        assert other is not first and other.api_key == "k"
+        assert pool.get(FakeClient, base_url="https://example.com", api_key="k") is other
+        assert FakeClient.instances == 2
+        assert pool.stats() == {"clients": 2, "created": 2, "reused": 2, "availability_checks": 0}
+
+    def test_concurrent_first_use_creates_one_client(self):
+        pool = ClientPool()
+        clients = []
+        threads = [threading.Thread(target=lambda: clients.append(pool.get(FakeClient))) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert FakeClient.instances == 1 and all(client is clients[0] for client in clients)
+
+    def test_availability_is_cached(self, monkeypatch):
+        pool = ClientPool()
+        now = [1000.0]
+        monkeypatch.setattr(client_pool_module.time, "monotonic", lambda: now[0])
+        checks = []
+
+        def check(result):
+            checks.append(result)
+            return result
+
+        assert pool.is_model_available(("ollama", None, "nomic"), lambda: check(True))
+        now[0] += client_pool_module.AVAILABLE_TTL_SECONDS - 1
+        assert pool.is_model_available(("ollama", None, "nomic"), lambda: check(False))
+        assert checks == [True]
+
+        # Missing models are checked again after the shorter TTL
+        assert not pool.is_model_available(("ollama", None, "other"), lambda: check(False))
+        now[0] += client_pool_module.UNAVAILABLE_TTL_SECONDS
+        assert pool.is_model_available(("ollama", None, "other"), lambda: check(True))
+        assert checks == [True, False, True]
+
+
+class TestSharedOpenAIClient:
+    """Tests that calls leave no per-request state on a pooled client"""
+
+    def test_streaming_call_keeps_the_parser_of_other_requests(self, monkeypatch):
+        client = OpenAIClient(api_key="test")
+        parser = client.chat_completion_parser
+        stream = Stream.__new__(Stream)
+        monkeypatch.setattr(client.sync_client.chat.completions, "create", lambda **kwargs: stream)
+        monkeypatch.setattr(openai_client_module, "handle_streaming_response", lambda completion: "streamed")
+        monkeypatch.setattr(client, "track_completion_usage", lambda completion: None)
+
+        assert client.call({"model": "m", "messages": [], "stream": True}, ModelType.LLM) is stream
+        assert client.chat_completion_parser is parser and not hasattr(client, "_api_kwargs")
+        assert client.parse_chat_completion(stream).raw_response == "streamed"
+        completion = ChatCompletion.model_validate({
+            "id": "c", "model": "m", "created": 0, "object": "chat.completion",
+            "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "answer"}}],
+        })
+        # A concurrent non-streaming request still gets its message content
+        assert client.parse_chat_completion(completion).raw_response == "answer"
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""
+Tests for merging retrieved chunks into contiguous spans before prompt assembly.
+
+Usage: python -m pytest test/test_context_merge.py
+"""
+
+import os
+import sys
+
+from adalflow.core.types import Document
+
+# Add the parent directory to the path to import the api package
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.context_merge import _overlap_length, get_context_merge_stats, merge_chunks
+
+
+def split_words(text: str, size: int, overlap: int):
+    """Split like the word text splitter: chunks of size words, each repeating the last overlap words."""
+    words = text.split(" ")
+    step = size - overlap
+    return [" ".join(words[start:start + size]) + " " for start in range(0, len(words) - overlap, step)]
+
+
+def make_chunk(path: str, order: int, text: str) -> Document:
+    return Document(text=text, meta_data={"file_path": path}, parent_doc_id=path, order=order, id=f"{path}-{order}")
+
+
+class TestContextMerge:
+    """Tests for merge_chunks"""
+
+    def test_overlapping_neighbours_become_one_span(self):
+        source = " ".join(f"word{i}" for i in range(40))
+        chunks = [make_chunk("a.py", i, text) for i, text in enumerate(split_words(source, 10, 4))]
+        # Retrieved out of order, with another file in between and a duplicate
+        retrieved = [chunks[2], make_chunk("b.py", 0, "other file"), chunks[1], chunks[2], chunks[3], chunks[5]]
+
+        merged = merge_chunks(retrieved)
+        texts = [doc.text for doc in merged.documents]
+        assert texts[0] == " ".join(f"word{i}" for i in range(6, 28)) + " "
+        assert texts[1] == "other file"
+        assert texts[2] == chunks[5].text
+        assert merged.documents[0].meta_data["merged_chunks"] == [1, 2, 3]
+        assert merged.chunk_count == 6
+        retrieved_text = len(chunks[1].text) + 2 * len(chunks[2].text) + len(chunks[3].text)
+        assert merged.chars_saved == retrieved_text - len(texts[0])
+        assert merged.tokens_saved == merged.chars_saved // 4
+
+    def test_adjacent_chunks_without_overlap(self):
+        merged = merge_chunks([make_chunk("a.py", 0, "def f(): "), make_chunk("a.py", 1, "fine = 1")], len)
+        assert [doc.text for doc in merged.documents] == ["def f(): fine = 1"]
+        assert merged.tokens_saved == 0
+
+    def test_overlap_must_be_whole_words(self):
+        assert _overlap_length("alpha beta ", "beta gamma") == len("beta ")
+        assert _overlap_length("alphabet ", "bet a") == 0
+        assert _overlap_length("alpha beta gamma ", "beta gamma delta") == len("beta gamma ")
+        assert _overlap_length("x = ab", "abc") == 0
+
+    def test_stats_accumulate(self):
+        before = get_context_merge_stats()
+        merge_chunks([make_chunk("a.py", 0, "one two "), make_chunk("a.py", 1, "two three")])
+        after = get_context_merge_stats()
+        assert after["merges"] == before["merges"] + 1
+        assert after["spans"] == before["spans"] + 1
@@ -0,0 +1,143 @@
+#!/usr/bin/env python3
+"""
+Tests for the adaptive embedding throughput controller.
+
+Usage: python -m pytest test/test_embedding_throughput.py
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+import adalflow as adal
+from adalflow.core.types import Document, ModelType
+
+# Add the parent directory to the path to import the api package
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.embedding_throughput import (
+    AdaptiveBatchEmbedder,
+    AIMDController,
+    get_retry_after,
+    is_retryable_error,
+)
+from api.local_embedder_client import LocalEmbedderClient
+from api.openai_client import OpenAIClient
+
+
+class FakeStatusError(Exception):
+    """Provider error carrying a status code and response headers"""
+
+    def __init__(self, status_code, headers=None):
+        super().__init__(f"status {status_code}")
+        self.status_code = status_code
+        self.response = SimpleNamespace(status_code=status_code, headers=headers or {})
+
+
+class ThrottledClient(LocalEmbedderClient):
+    """Local client that answers the first request with a 429"""
+
+    def __init__(self):
+        super().__init__(dimensions=16)
+        self.calls = 0
+
+    def call(self, api_kwargs={}, model_type=None):
+        self.calls += 1
+        if self.calls == 1:
+            raise FakeStatusError(429, {"retry-after": "0"})
+        return super().call(api_kwargs=api_kwargs, model_type=model_type)
+
+
+class SelfRetryingClient(LocalEmbedderClient):
+    """Local client whose call() hides a 429 by retrying, like a backoff-decorated provider client"""
+
+    def __init__(self):
+        super().__init__(dimensions=16)
+        self.requests = 0
+        self.calls = 0
+
+    def embed_once(self, api_kwargs={}):
+        self.requests += 1
+        if self.requests == 1:
+            raise FakeStatusError(429, {"retry-after": "0"})
+        return super().call(api_kwargs=api_kwargs, model_type=ModelType.EMBEDDER)
+
+    def call(self, api_kwargs={}, model_type=None):
+        self.calls += 1
+        try:
+            return self.embed_once(api_kwargs)
+        except FakeStatusError:
+            return self.embed_once(api_kwargs)
+
+
+class TestAIMDController:
+    """Tests for limit adaptation"""
+
+    def test_error_classification(self):
+        assert is_retryable_error(FakeStatusError(429))
+        assert is_retryable_error(FakeStatusError(503))
+        assert not is_retryable_error(FakeStatusError(400))
+        assert get_retry_after(FakeStatusError(429, {"retry-after": "3"})) == 3.0
+        assert get_retry_after(FakeStatusError(429, {"retry-after-ms": "250"})) == 0.25
+        assert get_retry_after(FakeStatusError(429)) is None
+
+    def test_ramps_up_while_healthy(self):
+        controller = AIMDController("test", batch_size=8, max_batch_size=32, max_concurrency=4)
+        for _ in range(50):
+            controller.record_success(controller.try_acquire(), 8)
+        assert controller.batch_size == 32
+        assert controller.concurrency == 4
+
+    def test_throttling_halves_limits_and_pauses(self):
+        controller = AIMDController("test", batch_size=32, concurrency=4, max_concurrency=4)
+        first = controller.try_acquire()
+        second = controller.try_acquire()
+        controller.record_failure(first, FakeStatusError(429, {"retry-after": "30"}))
+        # A request started before the decrease does not reduce the limits again
+        controller.record_failure(second, FakeStatusError(429, {"retry-after": "30"}))
+        assert controller.batch_size == 16
+        assert controller.concurrency == 2
+        assert controller.delay() > 25
+        assert controller.try_acquire() is None
+        assert controller.stats()["throttled"] == 2
+
+    def test_client_errors_do_not_back_off(self):
+        controller = AIMDController("test", batch_size=32)
+        controller.record_failure(controller.try_acquire(), FakeStatusError(400))
+        assert controller.batch_size == 32
+        assert controller.delay() == 0
+        assert controller.stats()["failed"] == 1
+
+
+class TestAdaptiveBatchEmbedder:
+    """Tests for batch embedding with retries"""
+
+    def test_retries_throttled_batch(self):
+        client = ThrottledClient()
+        embedder = adal.Embedder(model_client=client, model_kwargs={"model": "hashed-ngram", "dimensions": 16})
+        controller = AIMDController("test", batch_size=4, max_concurrency=2, base_backoff=0.01)
+        documents = [Document(text=f"def function_{i}(): return {i}") for i in range(10)]
+
+        output = AdaptiveBatchEmbedder(embedder=embedder, controller=controller)(documents)
+
+        assert len(output) == 10
+        assert all(len(doc.vector) == 16 for doc in output)
+        assert controller.stats()["throttled"] == 1
+        assert client.calls > 3
+
+    def test_throttling_reaches_controller_past_client_retries(self):
+        client = SelfRetryingClient()
+        embedder = adal.Embedder(model_client=client, model_kwargs={"model": "hashed-ngram", "dimensions": 16})
+        controller = AIMDController("test", batch_size=4, max_concurrency=1, base_backoff=0.01)
+        documents = [Document(text=f"def function_{i}(): return {i}") for i in range(6)]
+
+        output = AdaptiveBatchEmbedder(embedder=embedder, controller=controller)(documents)
+
+        assert all(len(doc.vector) == 16 for doc in output)
+        # The batch went through embed_once(), so the 429 was seen and paced by the controller
+        assert client.calls == 0
+        assert controller.stats()["throttled"] == 1
+
+    def test_ingestion_client_does_not_retry(self):
+        assert OpenAIClient(api_key="test", max_retries=0).sync_client.max_retries == 0
+        assert OpenAIClient(api_key="test").sync_client.max_retries > 0
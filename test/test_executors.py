@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tests for the thread pools that keep blocking work off the event loop.
+
+Usage: python -m pytest test/test_executors.py
+"""
+
+import asyncio
+import contextvars
+import os
+import sys
+import threading
+import time
+
+import pytest
+
+# Add the parent directory to the path to import the api package
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.executors import get_executor, get_executor_stats, iterate_blocking, run_blocking, run_in_pool
+
+
+class TestExecutors:
+    """Tests for run_blocking, run_in_pool and iterate_blocking"""
+
+    def test_results_and_errors(self):
+        async def main():
+            assert await run_blocking("cpu", sum, [1, 2, 3]) == 6
+            assert await run_blocking("io", dict, a=1) == {"a": 1}
+            with pytest.raises(ZeroDivisionError):
+                await run_blocking("io", lambda: 1 / 0)
+
+        asyncio.run(main())
+        with pytest.raises(ValueError):
+            get_executor("gpu")
+
+    def test_event_loop_keeps_running_during_blocking_work(self):
+        async def main():
+            ticks = []
+
+            async def ticker():
+                while True:
+                    ticks.append(time.monotonic())
+                    await asyncio.sleep(0.01)
+
+            task = asyncio.create_task(ticker())
+            await run_blocking("index", time.sleep, 0.3)
+            task.cancel()
+            return ticks
+
+        ticks = asyncio.run(main())
+        # The loop ticked throughout the blocking call instead of stalling for its duration
+        assert len(ticks) > 10
+        assert max(b - a for a, b in zip(ticks, ticks[1:])) < 0.15
+        assert get_executor_stats()["index"]["completed"] >= 1
+
+    def test_iterate_blocking(self):
+        def stream():
+            for i in range(3):
+                time.sleep(0.01)
+                yield i
+
+        async def main():
+            return [item async for item in iterate_blocking("io", stream())]
+
+        assert asyncio.run(main()) == [0, 1, 2]
+
+    def test_run_in_pool_carries_the_context(self):
+        job = contextvars.ContextVar("job", default=None)
+
+        def build():
+            return threading.current_thread().name, job.get()
+
+        def request():
+            job.set("job-1")
+            return run_in_pool("index", build)
+
+        thread_name, current_job = asyncio.run(run_blocking("io", request))
+        assert thread_name.startswith("deepwiki-index_") and current_job == "job-1"
+
+    def test_run_in_pool_runs_inline_on_its_own_pool(self):
+        # Every worker of the pool waits on a nested task: queued, they would never run
+        workers = get_executor("index").max_workers
+
+        def nested():
+            return run_in_pool("index", threading.current_thread)
+
+        futures = [get_executor("index").submit_background(lambda: (threading.current_thread(), nested())) for _ in range(workers)]
+        for future in futures:
+            outer, inner = future.result(timeout=5)
+            assert outer is inner
+
+    def test_indexing_jobs_build_on_their_own_pool(self):
+        name = get_executor("build").submit_background(lambda: run_in_pool("index", lambda: threading.current_thread().name))
+        assert name.result(timeout=5).startswith("deepwiki-build_")
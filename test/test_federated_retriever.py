@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Tests for searching several repository indexes as one corpus.
+
+Usage: python -m pytest test/test_federated_retriever.py
+"""
+
+import os
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+from adalflow.core.types import Document, Embedding, EmbedderOutput
+
+# Add the parent directory to the path to import the api package
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api import federated_retriever
+from api.executors import get_executor_stats
+from api.federated_retriever import FederatedRetriever
+from api.index_store import open_index, write_index
+from api.vector_index import VectorIndex
+from api.vector_retriever import VectorRetriever
+
+
+class QueryEmbedder:
+    """Embeds each query as a fixed vector, counting calls"""
+
+    def __init__(self, vectors):
+        self.vectors = vectors
+        self.calls = 0
+
+    def __call__(self, input):
+        self.calls += 1
+        return EmbedderOutput(data=[Embedding(embedding=self.vectors[query], index=i) for i, query in enumerate(input)])
+
+
+def make_shard(tmp_path, name, vectors, embedder, texts=None):
+    texts = texts or [f"{name} chunk {i}" for i in range(len(vectors))]
+    documents = [
+        Document(text=text, meta_data={"file_path": f"{name}/file_{i}.py"}, vector=vector.tolist())
+        for i, (text, vector) in enumerate(zip(texts, vectors))
+    ]
+    index_dir = str(tmp_path / f"{name}.index")
+    write_index(documents, index_dir, {"dtype": "float32"})
+    store = open_index(index_dir)
+    retriever = VectorRetriever(VectorIndex.load(store.vectors_dir), embedder, top_k=3)
+    return SimpleNamespace(retriever=retriever, transformed_docs=store, filter_mask=None)
+
+
+class TestFederatedRetriever:
+    """Tests for the parallel shard search and the global merge"""
+
+    @pytest.fixture(autouse=True)
+    def dense_mode(self, monkeypatch):
+        monkeypatch.setitem(federated_retriever.configs, "lexical_search", {"mode": "dense"})
+
+    def test_merges_shards_by_score(self, tmp_path):
+        rng = np.random.default_rng(2)
+        vectors = rng.normal(size=(6, 8)).astype(np.float32)
+        vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+        embedder = QueryEmbedder({"near billing": vectors[4].tolist(), "near auth": vectors[1].tolist()})
+        shards = {
+            "github.com/o/auth": make_shard(tmp_path, "auth", vectors[:3], embedder),
+            "github.com/o/billing": make_shard(tmp_path, "billing", vectors[3:], embedder),
+        }
+
+        searched = get_executor_stats().get("cpu", {}).get("completed", 0)
+        results = FederatedRetriever(shards).search(["near billing", "", "near auth"], top_k=4)
+        assert embedder.calls == 1
+        # Each shard is searched as one task of the shared cpu pool
+        assert get_executor_stats()["cpu"]["completed"] == searched + len(shards)
+        assert (results[0][0].repo, results[0][0].row) == ("github.com/o/billing", 1)
+        assert (results[2][0].repo, results[2][0].row) == ("github.com/o/auth", 1)
+        assert results[1] == []
+        # Four hits drawn from both shards, best first, each tagged with its repository
+        assert len(results[0]) == 4 and {hit.repo for hit in results[0]} == set(shards)
+        assert [hit.score for hit in results[0]] == sorted((hit.score for hit in results[0]), reverse=True)
+        assert results[0][0].document.text == "billing chunk 1"
+        assert results[0][0].document.meta_data["repo"] == "github.com/o/billing"
+
+    def test_requires_a_shard(self):
+        with pytest.raises(ValueError):
+            FederatedRetriever({})
+
+
+class TestFederatedHybridSearch:
+    """Tests for fusing the BM25 rankings of shards with different term statistics"""
+
+    def test_bm25_rankings_are_fused_per_shard(self, tmp_path, monkeypatch):
+        monkeypatch.setitem(federated_retriever.configs, "lexical_search", {"mode": "hybrid"})
+        # Every chunk is as close to the query, so the dense ranking follows shard order
+        vectors = np.tile(np.eye(8, dtype=np.float32)[0], (6, 1))
+        embedder = QueryEmbedder({"retry": vectors[0].tolist()})
+        # "retry" is rare in auth, so its raw BM25 scores there dwarf those of billing, where
+        # every chunk mentions it
+        auth_texts = ["retry the login", "retry the token", "session", "cookie", "password", "logout"]
+        billing_texts = ["retry retry retry invoices"] + [f"retry charge {i}" for i in range(5)]
+        shards = {
+            "github.com/o/billing": make_shard(tmp_path, "billing", vectors, embedder, billing_texts),
+            "github.com/o/auth": make_shard(tmp_path, "auth", vectors, embedder, auth_texts),
+        }
+        hits = FederatedRetriever(shards).search(["retry"], top_k=3)[0]
+        scores = {(hit.repo, hit.row): hit.score for hit in hits}
+        # The best match of billing tops its own BM25 ranking, as in a search of billing alone
+        assert scores[("github.com/o/billing", 0)] == pytest.approx(2 / 61)
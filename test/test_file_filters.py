@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Tests for query-time file filters.
+
+Usage: python -m pytest test/test_file_filters.py
+"""
+
+import os
+import sys
+
+# Add the parent directory to the path to import the api package
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.file_filters import file_filter_mask, file_filters_key, is_default_filters, resolve_file_filters
+
+
+class TestFileFilters:
+    """Tests for filter resolution and chunk masks"""
+
+    def setup_method(self):
+        self.file_paths = [
+            "api/rag.py",
+            "api/rag.py",
+            "api/tools/embedder.py",
+            "src/components/Ask.tsx",
+            "docs/setup.md",
+            "README.md",
+        ]
+
+    def test_default_filters(self):
+        filters = resolve_file_filters()
+        assert is_default_filters(filters)
+        assert not filters["use_inclusion"]
+        assert not is_default_filters(resolve_file_filters(excluded_dirs=["./src/"]))
+        assert file_filters_key(resolve_file_filters()) == file_filters_key(filters)
+
+    def test_exclusion_mask(self):
+        filters = resolve_file_filters(excluded_dirs=["./src/"], excluded_files=["README.md"])
+        mask = file_filter_mask(self.file_paths, filters)
+        assert mask.tolist() == [True, True, True, False, False, False]
+
+    def test_inclusion_mask(self):
+        mask = file_filter_mask(self.file_paths, resolve_file_filters(included_dirs=["api"]))
+        assert mask.tolist() == [True, True, True, False, False, False]
+
+        mask = file_filter_mask(self.file_paths, resolve_file_filters(included_files=[".tsx"]))
+        assert mask.tolist() == [False, False, False, True, False, False]
+
+    def test_empty(self):
+        assert len(file_filter_mask([], resolve_file_filters())) == 0
@@ -0,0 +1,59 @@
+#!/usr/bin/env python3
+"""
+Tests for the file-level vectors of the coarse-to-fine search.
+
+Usage: python -m pytest test/test_file_vectors.py
+"""
+
+import os
+import sys
+
+import numpy as np
+from adalflow.core.types import Document
+
+# Add the parent directory to the path to import the api package
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.file_vectors import FileVectorIndex
+from api.index_store import open_index, write_index
+
+
+class TestFileVectorIndex:
+    """Tests for building file centroids and narrowing a search to the best files"""
+
+    def setup_method(self):
+        # Three files whose chunks point roughly along the x, y and z axes
+        self.file_paths = ["x.py", "y.py", "x.py", "z.py", "y.py", "x.py"]
+        axes = {"x.py": [1, 0, 0], "y.py": [0, 1, 0], "z.py": [0, 0, 1]}
+        rng = np.random.default_rng(5)
+        self.vectors = np.asarray([axes[path] for path in self.file_paths], dtype=np.float32)
+        self.vectors += rng.normal(scale=0.05, size=self.vectors.shape).astype(np.float32)
+
+    def test_centroids_and_rows(self):
+        index = FileVectorIndex.build(self.vectors, self.file_paths)
+        assert len(index) == 3 and index.chunk_count == 6
+        assert [index.rows[index.offsets[f]:index.offsets[f + 1]].tolist() for f in range(3)] == [[0, 2, 5], [1, 4], [3]]
+        assert np.argmax(np.abs(index.centroids), axis=1).tolist() == [0, 1, 2]
+        assert np.allclose(np.linalg.norm(index.centroids, axis=1), 1.0)
+
+    def test_candidate_mask(self):
+        index = FileVectorIndex.build(self.vectors, self.file_paths)
+        query = np.asarray([0.1, 1.0, 0.0], dtype=np.float32)
+        assert np.flatnonzero(index.candidate_mask(query, top_files=1)).tolist() == [1, 4]
+        # Further files are added until there are enough candidates
+        assert np.flatnonzero(index.candidate_mask(query, top_files=1, min_rows=3)).tolist() == [0, 1, 2, 4, 5]
+        # Files without any allowed chunk are skipped
+        mask = np.asarray([True, False, True, True, False, True])
+        assert np.flatnonzero(index.candidate_mask(query, top_files=1, mask=mask)).tolist() == [0, 2, 5]
+
+    def test_written_with_the_index(self, tmp_path):
+        documents = [
+            Document(text=f"chunk {i}", meta_data={"file_path": path}, vector=vector.tolist())
+            for i, (path, vector) in enumerate(zip(self.file_paths, self.vectors))
+        ]
+        write_index(documents, str(tmp_path / "index"), {"dtype": "float32"})
+        store = open_index(str(tmp_path / "index"))
+        built = FileVectorIndex.build(self.vectors, self.file_paths)
+        assert np.allclose(store.file_vectors.centroids, built.centroids)
+        assert store.file_vectors.rows.tolist() == built.rows.tolist()
+        store.close()
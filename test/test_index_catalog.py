@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""
+Tests for content-addressed index keys and the index catalog.
+
+Usage: python -m pytest test/test_index_catalog.py
+"""
+
+import os
+import sys
+import threading
+
+# Add the parent directory to the path to import the api package
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.index_catalog import IndexCatalog, compute_index_key, get_repo_commit, get_repo_identity
+
+
+class TestIndexKey:
+    """Tests for index identity"""
+
+    def setup_method(self):
+        self.base = dict(
+            repo_identity="github:github.com/owner/repo",
+            commit="abc123",
+            file_filters={"use_inclusion": False, "excluded_dirs": ["node_modules"]},
+            splitter_config={"split_by": "word", "chunk_size": 350, "chunk_overlap": 100},
+            embedder_signature='{"model": "text-embedding-3-small"}',
+        )
+
+    def test_key_is_stable(self):
+        assert compute_index_key(**self.base) == compute_index_key(**dict(self.base))
+        assert len(compute_index_key(**self.base)) == 24
+
+    def test_every_input_changes_the_key(self):
+        key = compute_index_key(**self.base)
+        changes = {
+            "commit": "def456",
+            "file_filters": {"use_inclusion": False, "excluded_dirs": ["node_modules", "dist"]},
+            "splitter_config": {"split_by": "word", "chunk_size": 500, "chunk_overlap": 100},
+            "embedder_signature": '{"model": "text-embedding-3-large"}',
+        }
+        for name, value in changes.items():
+            assert compute_index_key(**dict(self.base, **{name: value})) != key, name
+
+    def test_repo_identity(self):
+        assert get_repo_identity("https://GitHub.com/owner/repo.git/", "github") == get_repo_identity(
+            "https://github.com/owner/repo", "github"
+        )
+        assert get_repo_identity("/srv/a/project", "local") != get_repo_identity("/srv/b/project", "local")
+
+    def test_commit_of_non_git_dir(self, tmp_path):
+        assert get_repo_commit(str(tmp_path)) is None
+
+
+class TestIndexCatalog:
+    """Tests for the catalog file"""
+
+    def test_register_find_remove(self, tmp_path):
+        catalog = IndexCatalog(str(tmp_path))
+        catalog.register("key1", {"repo": "local:/a", "path": "a-key1.index"})
+        catalog.register("key2", {"repo": "local:/b", "path": "b-key2.index"})
+
+        reopened = IndexCatalog(str(tmp_path))
+        assert reopened.get("key1")["path"] == "a-key1.index"
+        assert [entry["key"] for entry in reopened.find("local:/b")] == ["key2"]
+        assert reopened.remove("key1")["repo"] == "local:/a"
+        assert reopened.get("key1") is None
+        assert set(reopened.entries()) == {"key2"}
+
+    def test_touch_updates_last_use(self, tmp_path):
+        catalog = IndexCatalog(str(tmp_path))
+        catalog.register("key", {"repo": "local:/a"})
+        entries = catalog.entries()
+        entries["key"]["last_used_at"] -= 3600
+        catalog._write(entries)
+        catalog.touch("key")
+        assert catalog.get("key")["last_used_at"] > entries["key"]["last_used_at"]
+
+    def test_concurrent_registrations_from_separate_catalogs(self, tmp_path):
+        # Every request opens its own catalog of the shared databases directory
+        def register(i):
+            IndexCatalog(str(tmp_path)).register(f"key{i}", {"repo": f"local:/{i}"})
+
+        threads = [threading.Thread(target=register, args=(i,)) for i in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert set(IndexCatalog(str(tmp_path)).entries()) == {f"key{i}" for i in range(16)}
+        assert os.listdir(tmp_path) == ["catalog.json"]
@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Tests for the background indexing jobs of POST /index.
+
+Usage: python -m pytest test/test_index_jobs.py
+"""
+
+import asyncio
+import os
+import sys
+import threading
+
+# Add the parent directory to the path to import the api package
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.index_jobs import IndexJobManager, report_progress
+
+REPO_URL = "https://github.com/owner/repo"
+
+
+class TestIndexJobs:
+    """Tests for IndexJobManager"""
+
+    def test_progress_and_deduplication(self):
+        release = threading.Event()
+        embedding = threading.Event()
+
+        def build(job):
+            report_progress("reading", 10)
+            report_progress("embedding", 0, 40)
+            report_progress("embedding", 25)
+            embedding.set()
+            release.wait(5)
+            return {"chunks": 40}
+
+        manager = IndexJobManager(build=build)
+        job = manager.submit(REPO_URL)
+        assert embedding.wait(5)
+
+        snapshot = job.snapshot()
+        assert snapshot["status"] == "running" and snapshot["stage"] == "embedding"
+        assert snapshot["progress"] == {"done": 25, "total": 40}
+        assert snapshot["throughput"] > 0
+
+        # The same repository, spelled differently, joins the running job
+        assert manager.submit(REPO_URL + ".git/") is job
+        assert manager.active_job(REPO_URL) is job
+        assert manager.get(job.id) is job
+
+        release.set()
+        assert asyncio.run(job.wait(5))
+        snapshot = job.snapshot()
+        assert snapshot["status"] == "done" and snapshot["stage"] == "done"
+        assert snapshot["result"] == {"chunks": 40} and snapshot["error"] is None
+        assert manager.active_job(REPO_URL) is None
+        assert manager.stats() == {
+            "queued": 0, "running": 0, "submitted": 1, "deduplicated": 1, "succeeded": 1, "failed": 0,
+        }
+
+    def test_failed_job_is_reported_and_can_be_retried(self):
+        def build(job):
+            report_progress("cloning")
+            raise ValueError("clone failed")
+
+        manager = IndexJobManager(build=build)
+        job = manager.submit(REPO_URL, token="secret")
+        assert asyncio.run(job.wait(5))
+        snapshot = job.snapshot()
+        assert snapshot["status"] == "failed" and snapshot["stage"] == "cloning"
+        assert snapshot["error"] == "clone failed"
+        assert "token" not in snapshot and job.token is None
+
+        retry = manager.submit(REPO_URL)
+        assert retry is not job
+        asyncio.run(retry.wait(5))
+        assert manager.stats()["failed"] == 2
+
+    def test_requests_wait_for_the_job_of_their_repository(self):
+        release = threading.Event()
+        manager = IndexJobManager(build=lambda job: release.wait(5) and {})
+
+        async def main():
+            assert await manager.wait_for_repo("https://github.com/owner/other", timeout=1) is None
+            job = manager.submit(REPO_URL)
+            # Still indexing when the wait expires: the request is rejected instead of building
+            assert await manager.wait_for_repo(REPO_URL, timeout=0.05) is job
+            threading.Timer(0.05, release.set).start()
+            # Finished within the wait: the request goes on and loads the index
+            assert await manager.wait_for_repo(REPO_URL, timeout=5) is None
+
+        asyncio.run(main())
+
+    def test_finished_jobs_are_evicted(self):
+        manager = IndexJobManager(build=lambda job: {}, max_finished_jobs=2)
+        jobs = []
+        for i in range(4):
+            jobs.append(manager.submit(f"{REPO_URL}{i}"))
+            asyncio.run(jobs[-1].wait(5))
+        assert [manager.get(job.id) for job in jobs] == [None, None, jobs[2], jobs[3]]
+
+    def test_report_progress_outside_a_job_is_ignored(self):
+        report_progress("embedding", 1, 2)
@@ -0,0 +1,230 @@
+#!/usr/bin/env python3
+"""
+Tests for the on-disk repository index format.
+
+Usage: python -m pytest test/test_index_store.py
+"""
+
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+import pytest
+from adalflow.core.types import Document
+
+# Add the parent directory to the path to import the api package
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.index_store import ChunkStore, is_index, open_index, read_index_manifest, write_index
+from api.vector_index import FULL_VECTORS_FILE, VectorIndex
+
+
+def make_chunks(count: int, dimensions: int = 8):
+    rng = np.random.default_rng(7)
+    return [
+        Document(
+            text=f"chunk {i} – ünïcode text",
+            meta_data={"file_path": f"src/file_{i % 3}.py", "is_code": True},
+            vector=rng.normal(size=dimensions).astype(np.float32).tolist(),
+            id=f"chunk-{i}",
+            parent_doc_id=f"doc-{i % 3}",
+            order=i // 3,
+        )
+        for i in range(count)
+    ]
+
+
+class TestIndexStore:
+    """Tests for writing and lazily reading an index directory"""
+
+    def test_roundtrip(self, tmp_path):
+        index_dir = str(tmp_path / "repo.index")
+        chunks = make_chunks(10)
+        write_index(chunks, index_dir, {"dtype": "int8"})
+
+        assert is_index(index_dir)
+        store = open_index(index_dir)
+        assert isinstance(store, ChunkStore)
+        assert len(store) == 10
+        assert store[3].text == chunks[3].text
+        assert store[3].meta_data == chunks[3].meta_data
+        assert store[-1].id == "chunk-9"
+        assert (store[4].parent_doc_id, store[4].order) == ("doc-1", 1)
+        assert [doc.id for doc in store] == [doc.id for doc in chunks]
+        assert store.file_paths()[:3] == ["src/file_0.py", "src/file_1.py", "src/file_2.py"]
+
+        vector = np.asarray(chunks[5].vector)
+        # Chunk vectors are read back from the float16 full vectors of the int8 index
+        np.testing.assert_allclose(store[5].vector, vector / np.linalg.norm(vector), atol=1e-3)
+        assert len(VectorIndex.load(store.vectors_dir)) == 10
+        store.close()
+
+    def test_inconsistent_vectors_are_left_out(self, tmp_path):
+        index_dir = str(tmp_path / "repo.index")
+        chunks = make_chunks(5)
+        chunks[1].vector = []
+        chunks[2].vector = [0.1, 0.2]
+        write_index(chunks, index_dir)
+
+        store = open_index(index_dir)
+        assert [doc.id for doc in store] == ["chunk-0", "chunk-3", "chunk-4"]
+        assert read_index_manifest(index_dir)["dimensions"] == 8
+
+    def test_vectors_are_one_matrix_in_row_order(self, tmp_path):
+        index_dir = str(tmp_path / "repo.index")
+        chunks = make_chunks(6)
+        chunks[2].vector = [0.1, 0.2]
+        write_index(chunks, index_dir)
+
+        store = open_index(index_dir)
+        assert store.vectors.shape == (5, 8) and store.vectors.dtype == np.float32
+        assert store.vectors.flags["C_CONTIGUOUS"]
+        # Row i of the matrix is the embedding of chunk i
+        taken = store.take([3, 0, 3])
+        assert [doc.id for doc in taken] == ["chunk-4", "chunk-0", "chunk-4"]
+        np.testing.assert_array_equal(taken[0].vector, store.vectors[3])
+        with pytest.raises(IndexError):
+            store.take([5])
+
+    def test_vectors_must_match_chunks(self, tmp_path):
+        index_dir = str(tmp_path / "repo.index")
+        write_index(make_chunks(4), index_dir)
+        store = open_index(index_dir)
+        np.save(os.path.join(store.vectors_dir, FULL_VECTORS_FILE), np.zeros((3, 8), dtype=np.float32))
+        with pytest.raises(ValueError):
+            store.vectors
+
+    def test_rewrite_replaces_index(self, tmp_path):
+        index_dir = str(tmp_path / "repo.index")
+        write_index(make_chunks(6), index_dir)
+        write_index(make_chunks(2), index_dir)
+        assert len(open_index(index_dir)) == 2
+        assert os.listdir(tmp_path) == ["repo.index"]
+
+    def test_writers_stage_in_their_own_directories(self, tmp_path):
+        index_dir = str(tmp_path / "repo.index")
+        # Staging directory of a concurrent write of the same index
+        os.makedirs(f"{index_dir}.tmp")
+        (tmp_path / "repo.index.tmp" / "chunks.sqlite").write_bytes(b"partial")
+        write_index(make_chunks(4), index_dir)
+        assert (tmp_path / "repo.index.tmp" / "chunks.sqlite").read_bytes() == b"partial"
+        assert sorted(os.listdir(tmp_path)) == ["repo.index", "repo.index.tmp"]
+
+    def test_missing_index_raises(self, tmp_path):
+        assert not is_index(str(tmp_path))
+        with pytest.raises(ValueError):
+            open_index(str(tmp_path))
+        with pytest.raises(ValueError):
+            write_index([Document(text="no vector")], str(tmp_path / "empty.index"))
+
+    def test_manifest_records_embedder(self, tmp_path):
+        index_dir = str(tmp_path / "repo.index")
+        write_index(make_chunks(3), index_dir, embedder="signature")
+        assert read_index_manifest(index_dir)["embedder"] == "signature"
+
+
+class TestLegacyAdoption:
+    """Tests for adopting databases of earlier versions under the current index key"""
+
+    @pytest.fixture
+    def manager(self, tmp_path, monkeypatch):
+        from api import data_pipeline
+        from api.data_pipeline import DatabaseManager
+
+        monkeypatch.setattr(data_pipeline, "get_embedder_config", lambda: {"model_kwargs": {"dimensions": 8}})
+        monkeypatch.setattr(data_pipeline, "get_embedder_signature", lambda: "current")
+        repo_dir = tmp_path / "repos" / "repo"
+        (repo_dir / "src").mkdir(parents=True)
+        for i in range(3):
+            (repo_dir / "src" / f"file_{i}.py").write_text("pass\n")
+        (tmp_path / "databases").mkdir()
+        manager = DatabaseManager()
+        manager.repo_name = "repo"
+        manager.repo_paths = {"save_repo_dir": str(repo_dir), "save_db_file": str(tmp_path / "databases" / "repo.pkl")}
+        return manager
+
+    def adopt(self, manager, tmp_path):
+        index_dir = str(tmp_path / "databases" / "repo-key.index")
+        manager._adopt_legacy_database(index_dir, {})
+        return is_index(index_dir)
+
+    def test_migrated_index_of_this_repository_is_adopted(self, manager, tmp_path):
+        write_index(make_chunks(6), str(tmp_path / "databases" / "repo.index"))
+        assert self.adopt(manager, tmp_path)
+        assert not os.path.exists(tmp_path / "databases" / "repo.index")
+
+    def test_index_of_another_repository_with_the_same_name_is_rebuilt(self, manager, tmp_path):
+        write_index(make_chunks(6), str(tmp_path / "databases" / "repo.index"))
+        for path in (tmp_path / "repos" / "repo" / "src").iterdir():
+            path.unlink()
+        assert not self.adopt(manager, tmp_path)
+        assert is_index(str(tmp_path / "databases" / "repo.index"))
+
+    def test_index_of_another_embedder_is_rebuilt(self, manager, tmp_path):
+        write_index(make_chunks(6, dimensions=16), str(tmp_path / "databases" / "repo.index"))
+        assert not self.adopt(manager, tmp_path)
+        write_index(make_chunks(6), str(tmp_path / "databases" / "repo.index"), embedder="previous")
+        assert not self.adopt(manager, tmp_path)
+
+    def test_pickle_is_kept_until_its_migration_is_adopted(self, manager, tmp_path):
+        from adalflow.core.db import LocalDB
+
+        pickle_path = manager.repo_paths["save_db_file"]
+        db = LocalDB()
+        db.transformed_items = {"split_and_embed": make_chunks(6, dimensions=16)}
+        db.save_state(filepath=pickle_path)
+        assert not self.adopt(manager, tmp_path)
+        assert os.path.exists(pickle_path)
+
+        db.transformed_items = {"split_and_embed": make_chunks(6)}
+        db.save_state(filepath=pickle_path)
+        assert self.adopt(manager, tmp_path)
+        assert not os.path.exists(pickle_path)
+
+
+class TestIndexBuild:
+    """Tests for building the index of a repository on its first requests"""
+
+    def test_concurrent_first_requests_build_once(self, tmp_path, monkeypatch):
+        from api import data_pipeline
+        from api.data_pipeline import DatabaseManager
+        from api.storage_manager import StorageManager
+
+        reads = []
+
+        def read_all_documents(repo_dir, **kwargs):
+            reads.append(repo_dir)
+            time.sleep(0.2)
+            return make_chunks(6)
+
+        def transform_documents_and_save_to_index(documents, index_dir, **kwargs):
+            write_index(documents, index_dir)
+            return open_index(index_dir)
+
+        monkeypatch.setattr(data_pipeline, "read_all_documents", read_all_documents)
+        monkeypatch.setattr(data_pipeline, "transform_documents_and_save_to_index", transform_documents_and_save_to_index)
+        monkeypatch.setattr(data_pipeline, "get_artifact_store", lambda: None)
+        monkeypatch.setattr(data_pipeline, "get_storage_manager", lambda: StorageManager(str(tmp_path)))
+        repo_dir = tmp_path / "repo"
+        repo_dir.mkdir()
+        (tmp_path / "databases").mkdir()
+
+        def prepare():
+            manager = DatabaseManager()
+            manager.repo_name = "repo"
+            manager.repo_identity = manager.repo_url_or_path = str(repo_dir)
+            manager.repo_paths = {"save_repo_dir": str(repo_dir), "save_db_file": str(tmp_path / "databases" / "repo.pkl")}
+            counts.append(len(manager.prepare_db_index()))
+
+        counts = []
+        threads = [threading.Thread(target=prepare) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert counts == [6, 6, 6]
+        assert len(reads) == 1
+        # One index next to the catalog, and no staging directory left behind
+        assert sorted(name.rsplit(".", 1)[-1] for name in os.listdir(tmp_path / "databases")) == ["index", "json"]
@@ -0,0 +1,95 @@
+#!/usr/bin/env python3
+"""
+Tests for the BM25 lexical index, identifier extraction and rank fusion.
+
+Usage: python -m pytest test/test_lexical_index.py
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Add the parent directory to the path to import the api package
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.lexical_index import (
+    LexicalIndex,
+    extract_identifiers,
+    get_lexical_config,
+    reciprocal_rank_fusion,
+    tokenize,
+)
+
+TEXTS = [
+    "def prepare_db_index(repo):\n    return build_index(repo)",
+    "class VectorIndex:\n    def search(self, query):\n        pass",
+    "index = prepare_db_index(repo_url)\nprint(index)",
+    "The README explains how to install the project",
+    "def build_index(repo):\n    pass",
+]
+
+
+class TestLexicalIndex:
+    """Tests for tokenizing, building and searching the BM25 index"""
+
+    def test_tokenize_keeps_identifiers_and_parts(self):
+        assert tokenize("prepare_db_index(x)") == ["prepare_db_index", "prepare", "db", "index"]
+        assert tokenize("VectorIndex.search") == ["vectorindex", "vector", "index", "search"]
+
+    def test_extract_identifiers(self):
+        assert extract_identifiers("what does `prepare_db_index` do") == ["prepare_db_index"]
+        assert extract_identifiers("how is VectorIndex.search used by getEmbedder()?") == [
+            "VectorIndex", "search", "getEmbedder"
+        ]
+        assert extract_identifiers("How does the project work?") == []
+
+    def test_product_names_are_not_identifiers(self):
+        query = "How does the GitHub integration use OpenAI and FastAPI?"
+        assert extract_identifiers(query) == []
+        # CamelCase words count when the repository defines them
+        assert extract_identifiers(query, known_symbols={"FastAPI", "VectorIndex"}) == ["FastAPI"]
+
+    def test_search_ranks_and_masks(self, tmp_path):
+        index = LexicalIndex.build(TEXTS)
+        scores, rows = index.search("what does prepare_db_index do", top_k=3)
+        assert set(rows.tolist()) == {0, 2, 4}
+        assert rows[0] in (0, 2) and (np.diff(scores) <= 0).all()
+        assert index.document_frequency("prepare_db_index") == 2
+
+        mask = np.ones(len(TEXTS), dtype=bool)
+        mask[0] = False
+        assert 0 not in index.search("prepare_db_index", top_k=5, mask=mask)[1]
+        assert len(index.search("kubernetes", top_k=5)[1]) == 0
+
+        index.save(str(tmp_path / "lexical"))
+        loaded = LexicalIndex.load(str(tmp_path / "lexical"))
+        np.testing.assert_array_equal(loaded.search("build index", top_k=5)[1], index.search("build index", top_k=5)[1])
+
+    def test_specific_identifiers(self):
+        index = LexicalIndex.build(TEXTS * 20)
+        assert index.is_specific(["VectorIndex"], top_k=20, max_df=0.05)
+        assert not index.is_specific(["prepare_db_index"], top_k=20, max_df=0.05)
+        assert not index.is_specific(["missing_name"], top_k=20, max_df=0.05)
+        assert not index.is_specific([], top_k=20, max_df=0.05)
+
+    def test_score_margin(self):
+        index = LexicalIndex.build(TEXTS)
+        scores, rows = index.search("what does build_index do", top_k=5)
+        assert index.score_margin(["build_index"], scores, rows) > 5
+        # The rest of the question matches another chunk better than the identifier's chunks
+        scores, rows = index.search("how do I install the project README with build_index", top_k=5)
+        assert rows[0] == 3 and index.score_margin(["build_index"], scores, rows) < 1
+        assert index.score_margin(["missing_name"], scores, rows) == 0.0
+        scores, rows = index.search("prepare_db_index", top_k=2)
+        assert index.score_margin(["prepare_db_index"], scores, rows) == float("inf")
+
+    def test_reciprocal_rank_fusion(self):
+        fused = reciprocal_rank_fusion([[1, 2, 3], [3, 1]], k=60)
+        assert [row for row, _ in fused] == [1, 3, 2]
+
+    def test_config_validation(self):
+        assert get_lexical_config({"rrf_k": 10})["mode"] == "hybrid"
+        with pytest.raises(ValueError):
+            get_lexical_config({"mode": "sparse"})
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Tests for the in-process hashed n-gram embedding client.
+
+Usage: python -m pytest test/test_local_embedder_client.py
+"""
+
+import os
+import sys
+
+import numpy as np
+
+# Add the parent directory to the path to import the api package
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from adalflow.core.types import ModelType
+
+from api.local_embedder_client import LocalEmbedderClient, tokenize_identifiers
+
+
+class TestLocalEmbedderClient:
+    """Tests for LocalEmbedderClient"""
+
+    def setup_method(self):
+        self.client = LocalEmbedderClient()
+
+    def test_tokenize_identifiers(self):
+        tokens = tokenize_identifiers("def prepare_db_index(self): return getHTTPResponse")
+        assert "prepare_db_index" in tokens
+        assert {"prepare", "db", "index", "get", "http", "response"} <= set(tokens)
+
+    def test_embeddings_are_deterministic_and_normalized(self):
+        texts = ["class DatabaseManager:", "def count_tokens(text)", ""]
+        first = self.client.embed(texts, dimensions=128)
+        second = LocalEmbedderClient().embed(texts, dimensions=128)
+        assert first.shape == (3, 128)
+        assert first.dtype == np.float32
+        np.testing.assert_array_equal(first, second)
+        np.testing.assert_allclose(np.linalg.norm(first[:2], axis=1), 1.0, rtol=1e-5)
+        assert not first[2].any()
+
+    def test_lexically_similar_texts_score_higher(self):
+        vectors = self.client.embed([
+            "def prepare_db_index(self, excluded_dirs)",
+            "prepare the db index for the repository",
+            "The weather is sunny in the afternoon",
+        ])
+        assert vectors[0] @ vectors[1] > vectors[0] @ vectors[2]
+
+    def test_embedder_interface(self):
+        api_kwargs = self.client.convert_inputs_to_api_kwargs(
+            input="hello world", model_kwargs={"model": "hashed-ngram", "dimensions": 64}, model_type=ModelType.EMBEDDER
+        )
+        response = self.client.call(api_kwargs=api_kwargs, model_type=ModelType.EMBEDDER)
+        output = self.client.parse_embedding_response(response)
+        assert output.error is None
+        assert len(output.data) == 1
+        assert len(output.data[0].embedding) == 64
@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+"""
+Tests for retrieval-time metadata predicates evaluated as precomputed chunk masks.
+
+Usage: python -m pytest test/test_metadata_filters.py
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+from adalflow.core.types import Document
+
+# Add the parent directory to the path to import the api package
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.index_store import open_index, write_index
+from api.metadata_filters import metadata_filter_mask, metadata_filters_key, resolve_metadata_filters
+from api.retriever_registry import PreparedIndex
+from api.vector_index import VectorIndex
+
+CHUNKS = [
+    ("api/rag.py", "py", True, True),
+    ("api/tests/test_rag.py", "py", True, False),
+    ("src/app.tsx", "tsx", True, True),
+    ("README.md", "md", False, False),
+    ("api/README.md", "md", False, False),
+]
+
+
+def make_documents():
+    return [
+        Document(
+            text=f"chunk {i}",
+            meta_data={"file_path": path, "type": file_type, "is_code": is_code, "is_implementation": is_implementation},
+            vector=np.eye(len(CHUNKS), dtype=np.float32)[i].tolist(),
+        )
+        for i, (path, file_type, is_code, is_implementation) in enumerate(CHUNKS)
+    ]
+
+
+class TestMetadataFilters:
+    """Tests for resolving and evaluating metadata predicates"""
+
+    @pytest.fixture(autouse=True)
+    def setup_store(self, tmp_path):
+        index_dir = str(tmp_path / "index")
+        write_index(make_documents(), index_dir, {"dtype": "float32"})
+        self.store = open_index(index_dir)
+        yield
+        self.store.close()
+
+    def mask(self, **filters):
+        return metadata_filter_mask(self.store.metadata_columns, resolve_metadata_filters(filters)).tolist()
+
+    def test_resolve(self):
+        assert resolve_metadata_filters(None) is None
+        assert resolve_metadata_filters({"code_only": False, "path_prefix": []}) is None
+        resolved = resolve_metadata_filters({"languages": ["Python", ".md"], "path_prefix": "./api/"})
+        assert resolved == {"languages": ["md", "py", "pyi"], "path_prefix": ["api/"]}
+        assert metadata_filters_key(resolved) == metadata_filters_key(dict(reversed(list(resolved.items()))))
+        with pytest.raises(ValueError):
+            resolve_metadata_filters({"tests_only": True})
+
+    def test_predicates(self):
+        assert self.mask(code_only=True) == [True, True, True, False, False]
+        assert self.mask(implementation_only=True) == [True, False, True, False, False]
+        # Excluding tests keeps documentation
+        assert self.mask(exclude_tests=True) == [True, False, True, True, True]
+        assert self.mask(path_prefix="api/") == [True, True, False, False, True]
+        assert self.mask(path_prefix=["src", "README"]) == [False, False, True, True, False]
+        assert self.mask(languages=["python", "typescript"]) == [True, True, True, False, False]
+        assert self.mask(exclude_tests=True, path_prefix="api", languages="py") == [True, False, False, False, False]
+
+    def test_masks_are_combined_with_file_filters_and_cached(self):
+        prepared = PreparedIndex(key="a", documents=self.store, vector_index=VectorIndex.load(self.store.vectors_dir), nbytes=0)
+        file_filters = {"use_inclusion": True, "included_dirs": ["api"], "included_files": [], "excluded_dirs": [], "excluded_files": []}
+        code_only = resolve_metadata_filters({"code_only": True})
+        mask = prepared.filter_mask(file_filters, code_only)
+        assert mask.tolist() == [True, True, False, False, False]
+        assert prepared.filter_mask(dict(file_filters), dict(code_only)) is mask
+        assert prepared.filter_mask(None, code_only).tolist() == [True, True, True, False, False]
+
+        # Plain document lists are evaluated from each chunk's metadata
+        listed = PreparedIndex(key="b", documents=make_documents(), vector_index=prepared.vector_index, nbytes=0)
+        assert listed.filter_mask(file_filters, code_only).tolist() == mask.tolist()
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""
+Tests for decoding base64 embedding responses in OpenAIClient.
+
+Usage: python -m pytest test/test_openai_embeddings.py
+"""
+
+import base64
+import os
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+# Add the parent directory to the path to import the api package
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.openai_client import EmbeddingMatrixResponse, OpenAIClient, decode_base64_embeddings
+
+
+def encode(vector: np.ndarray) -> str:
+    return base64.b64encode(np.asarray(vector, dtype="<f4").tobytes()).decode("ascii")
+
+
+class TestBase64Embeddings:
+    """Tests for the base64 embedding decoder"""
+
+    def setup_method(self):
+        rng = np.random.default_rng(0)
+        self.vectors = rng.normal(size=(4, 8)).astype(np.float32)
+
+    def test_decode_matrix(self):
+        matrix = decode_base64_embeddings([encode(v) for v in self.vectors])
+        assert matrix.dtype == np.float32
+        assert matrix.shape == (4, 8)
+        np.testing.assert_array_equal(matrix, self.vectors)
+
+    def test_decode_float_lists(self):
+        matrix = decode_base64_embeddings([v.tolist() for v in self.vectors])
+        np.testing.assert_allclose(matrix, self.vectors)
+
+    def test_inconsistent_dimensions_raise(self):
+        with pytest.raises(ValueError):
+            decode_base64_embeddings([encode(self.vectors[0]), encode(self.vectors[1][:3])])
+
+    def test_response_is_ordered_by_index(self):
+        data = [SimpleNamespace(index=i, embedding=encode(self.vectors[i])) for i in (2, 0, 3, 1)]
+        response = SimpleNamespace(data=data, model="test", usage=SimpleNamespace(prompt_tokens=5, total_tokens=5))
+        matrix_response = OpenAIClient._to_embedding_matrix(response)
+        assert isinstance(matrix_response, EmbeddingMatrixResponse)
+        np.testing.assert_array_equal(matrix_response.embeddings, self.vectors)
+
+        output = OpenAIClient(api_key="test").parse_embedding_response(matrix_response)
+        assert output.error is None
+        assert [item.index for item in output.data] == [0, 1, 2, 3]
+        assert output.usage.prompt_tokens == 5
+        np.testing.assert_array_equal(output.data[1].embedding, self.vectors[1])
@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Tests for the file path and symbol lookup index and its import graph.
+
+Usage: python -m pytest test/test_path_index.py
+"""
+
+import os
+import sys
+
+import numpy as np
+from adalflow.core.types import Document
+
+# Add the parent directory to the path to import the api package
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.index_store import open_index, write_index
+from api.path_index import PATH_INDEX_FILE, PathIndex, extract_imports, extract_symbols
+
+CHUNKS = [
+    ("api/rag.py", "import re\nfrom api.vector_index import VectorIndex\nfrom .retrieval_cache import normalize_query\n"),
+    ("api/rag.py", "class RAG:\n    def call(self):\n        return VectorIndex.load(normalize_query(q))\n"),
+    ("api/vector_index.py", "import numpy as np\n\ndef quantize(vectors):\n    pass\n"),
+    ("api/vector_index.py", "class VectorIndex:\n    def load(self):\n        pass\n"),
+    ("api/retrieval_cache.py", "def normalize_query(query):\n    return query.strip()\n"),
+    ("api/api.py", "from api.rag import RAG\n\napp = None\n"),
+    ("web/src/app.tsx", "import { Page } from './components/page'\nexport default function App() {}\n"),
+    ("web/src/components/page.tsx", "export const Page = () => null\n"),
+    ("README.md", "# Project\n"),
+]
+
+
+class TestPathIndex:
+    """Tests for building and querying the path index"""
+
+    def test_extracts_top_level_symbols_and_imports(self):
+        assert extract_symbols(CHUNKS[1][1], "python") == ["RAG"]
+        assert extract_symbols(CHUNKS[6][1], "javascript") == ["App"]
+        assert extract_symbols("func (s *Server) Serve() {}\ntype Config struct {}\n", "go") == ["Serve", "Config"]
+        assert extract_imports(CHUNKS[0][1], "python") == ["api.vector_index", ".retrieval_cache", "re"]
+        assert extract_imports(CHUNKS[6][1], "javascript") == ["./components/page"]
+
+    def test_build_maps_files_symbols_and_imports(self):
+        index = PathIndex.build(CHUNKS)
+        assert index.files["api/rag.py"] == [0, 1]
+        assert index.symbol_rows("VectorIndex") == [3]
+        assert index.symbol_rows("quantize") == [2]
+        # Standard library and third-party imports are not part of the graph
+        assert index.imports["api/rag.py"] == ["api/vector_index.py", "api/retrieval_cache.py"]
+        assert index.imports["web/src/app.tsx"] == ["web/src/components/page.tsx"]
+        assert index.related_files("api/rag.py") == ["api/vector_index.py", "api/retrieval_cache.py", "api/api.py"]
+
+    def test_resolves_path_variants(self):
+        index = PathIndex.build(CHUNKS)
+        assert index.file_rows("./api/rag.py") == [0, 1]
+        assert index.file_rows("/components/page.tsx") == [7]
+        assert index.file_rows("missing.py") == []
+
+    def test_lookup_orders_and_limits_chunks(self):
+        index = PathIndex.build(CHUNKS)
+        own, related = index.lookup("api/rag.py", limit=5, referenced_names={"VectorIndex"})
+        assert own == [0, 1]
+        # Related files are taken round-robin, definitions of referenced names first
+        assert related == [3, 4, 5]
+        assert index.lookup("api/rag.py", limit=1) == ([0], [])
+
+        allowed = np.ones(len(CHUNKS), dtype=bool)
+        allowed[[3, 4]] = False
+        assert index.lookup("api/rag.py", limit=5, allowed=allowed) == ([0, 1], [2, 5])
+
+    def test_saved_with_the_index(self, tmp_path):
+        rng = np.random.default_rng(5)
+        documents = [
+            Document(text=text, meta_data={"file_path": path}, vector=rng.normal(size=8).astype(np.float32).tolist())
+            for path, text in CHUNKS
+        ]
+        index_dir = str(tmp_path / "repo.index")
+        write_index(documents, index_dir)
+        assert os.path.exists(os.path.join(index_dir, PATH_INDEX_FILE))
+        assert open_index(index_dir).path_index.imports == PathIndex.build(CHUNKS).imports
+
+        # Indexes written before the path index existed build it from their chunks
+        os.remove(os.path.join(index_dir, PATH_INDEX_FILE))
+        assert open_index(index_dir).path_index.files == PathIndex.build(CHUNKS).files
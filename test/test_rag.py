@@ -0,0 +1,211 @@
+#!/usr/bin/env python3
+"""
+Tests for retrieval through the RAG component, on a small in-memory index.
+
+Usage: python -m pytest test/test_rag.py
+"""
+
+import json
+import os
+import sys
+
+import adalflow as adal
+import numpy as np
+import pytest
+from adalflow.core.types import Document, Embedding, EmbedderOutput
+
+# Add the parent directory to the path to import the api package
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api import rag as rag_module
+from api.file_filters import resolve_file_filters
+from api.lexical_index import LexicalIndex, lexical_search_stats
+from api.path_index import PathIndex
+from api.rag import RAG
+from api.retrieval_cache import query_embedding_cache, retrieval_result_cache
+from api.retriever_registry import PreparedIndex, retriever_registry
+from api.vector_index import VectorIndex
+from api.vector_retriever import VectorRetriever
+
+# Cosine similarity of each chunk to the query, best first
+COSINES = [0.9, 0.8, 0.7, 0.6, 0.5, 0.4, 0.3, 0.15, 0.1, 0.05, 0.0, -0.05, -0.1, -0.15, -0.2]
+
+
+class QueryEmbedder:
+    """Embeds every query as the first basis vector"""
+
+    def __init__(self, dimensions):
+        self.dimensions = dimensions
+
+    def __call__(self, input):
+        embedding = np.eye(self.dimensions, dtype=np.float32)[0].tolist()
+        return EmbedderOutput(data=[Embedding(embedding=embedding, index=i) for i, _ in enumerate(input)])
+
+
+class Chunks(list):
+    """Chunk list carrying the lexical and path indexes of a ChunkStore"""
+
+    lexical_index = None
+    path_index = None
+
+    def take(self, rows):
+        return [self[row] for row in rows]
+
+
+def make_rag(tmp_path, texts, file_paths=None):
+    """Build a RAG over chunks whose cosine similarities to every query are COSINES."""
+    query_embedding_cache.clear()
+    retrieval_result_cache.clear()
+    dimensions = len(COSINES) + 1
+    vectors = np.zeros((len(COSINES), dimensions), dtype=np.float32)
+    for row, cosine in enumerate(COSINES):
+        vectors[row, 0] = cosine
+        vectors[row, row + 1] = np.sqrt(1 - cosine ** 2)
+
+    rag = RAG.__new__(RAG)
+    adal.Component.__init__(rag)
+    file_paths = file_paths or [f"src/module_{row}.py" for row in range(len(texts))]
+    rag.transformed_docs = Chunks(
+        Document(text=text, meta_data={"file_path": file_path, "type": "py", "is_code": True})
+        for text, file_path in zip(texts, file_paths)
+    )
+    rag.transformed_docs.lexical_index = LexicalIndex.build(texts)
+    rag.transformed_docs.path_index = PathIndex.build(zip(file_paths, texts))
+    rag.retriever = VectorRetriever(
+        VectorIndex.build(vectors, str(tmp_path / "vectors"), dtype="float32"),
+        QueryEmbedder(dimensions),
+        top_k=len(COSINES),
+    )
+    rag.file_filters = resolve_file_filters()
+    rag.filter_mask = None
+    rag.prepared_index = PreparedIndex(
+        key=str(tmp_path), documents=rag.transformed_docs, vector_index=rag.retriever.index, nbytes=0
+    )
+    return rag
+
+
+class TestRAGAdaptiveTopK:
+    """Tests for the adaptive cutoff applied to real retriever scores"""
+
+    @pytest.fixture
+    def rag(self, tmp_path, monkeypatch):
+        monkeypatch.setitem(rag_module.configs, "adaptive_top_k", {"min_k": 2, "max_k": 20})
+        monkeypatch.setitem(rag_module.configs, "coarse_search", {"enabled": False})
+        # Only the three best dense chunks mention the query terms
+        return make_rag(tmp_path, ["retry backoff" if row < 3 else f"unrelated text {row}" for row in range(len(COSINES))])
+
+    def test_min_score_is_a_cosine_threshold(self, rag, monkeypatch):
+        monkeypatch.setitem(rag_module.configs, "lexical_search", {"mode": "dense"})
+        result = rag._retrieve("retry backoff")[0]
+        # Chunks under the default cosine similarity of 0.2 are dropped, although their
+        # retriever scores, (cos + 1) / 2, are all above 0.2
+        assert result.doc_indices == [0, 1, 2, 3, 4, 5, 6]
+        assert min(result.doc_scores) == pytest.approx((0.3 + 1) / 2, abs=1e-3)
+
+    def test_hybrid_results_are_trimmed_with_the_shipped_config(self, tmp_path, monkeypatch):
+        config_path = os.path.join(os.path.dirname(__file__), "..", "api", "config", "embedder.json")
+        with open(config_path, encoding="utf-8") as f:
+            shipped = json.load(f)
+        monkeypatch.setitem(rag_module.configs, "adaptive_top_k", shipped["adaptive_top_k"])
+        monkeypatch.setitem(rag_module.configs, "lexical_search", shipped["lexical_search"])
+        # A BM25 match far down the dense ranking, in chunk 12
+        rag = make_rag(tmp_path, ["retry backoff" if row in (0, 1, 12) else f"unrelated text {row}" for row in range(len(COSINES))])
+        result = rag._retrieve("retry backoff")[0]
+        # Dense results under the cosine similarity of 0.2 are cut before fusion; the BM25 match stays
+        assert result.doc_indices[:2] == [0, 1]
+        assert sorted(result.doc_indices) == [0, 1, 2, 3, 4, 5, 6, 12]
+
+
+class TestRAGLexicalFastPath:
+    """Tests for answering questions from the lexical index without embedding them"""
+
+    @pytest.fixture
+    def rag(self, tmp_path, monkeypatch):
+        monkeypatch.setitem(rag_module.configs, "adaptive_top_k", {"enabled": False})
+        monkeypatch.setitem(rag_module.configs, "coarse_search", {"enabled": False})
+        monkeypatch.setitem(rag_module.configs, "lexical_search", {"mode": "hybrid"})
+        texts = [f"def handler_{row}(request):\n    return respond(request)\n" for row in range(len(COSINES))]
+        texts[5] = "def verify_signature(payload):\n    # GitHub signs webhook payloads\n    return check(payload)\n"
+        return make_rag(tmp_path, texts)
+
+    def searches(self, rag, query):
+        before = lexical_search_stats.stats()
+        result = rag._retrieve(query)[0]
+        after = lexical_search_stats.stats()
+        return result, {kind: after[kind] - before[kind] for kind in ("fast_path", "hybrid")}
+
+    def test_question_naming_an_identifier_skips_the_embedding(self, rag):
+        result, searches = self.searches(rag, "what does `verify_signature` do")
+        assert searches == {"fast_path": 1, "hybrid": 0}
+        assert result.doc_indices[0] == 5
+
+    def test_question_with_a_product_name_uses_hybrid_retrieval(self, rag):
+        # GitHub occurs in a single chunk, but is a product name rather than a symbol of the repository
+        result, searches = self.searches(rag, "How does the GitHub webhook integration work?")
+        assert searches == {"fast_path": 0, "hybrid": 1}
+        # The dense ranking is fused in, so chunks without the words still come back
+        assert result.doc_indices[0] == 5 and len(result.doc_indices) == len(COSINES)
+
+
+class TestRAGPrepareRetriever:
+    """Tests for serving prepared indexes from the retriever registry"""
+
+    def test_registry_hit_does_not_take_an_index_worker(self, tmp_path, monkeypatch):
+        rag = make_rag(tmp_path, [f"text {row}" for row in range(len(COSINES))])
+        store = rag.transformed_docs
+        store.manifest = {"version": 1}
+
+        class DatabaseManager:
+            repo_paths = {"save_index_dir": str(tmp_path / "index")}
+
+            def prepare_database(self, *args, **kwargs):
+                return store
+
+        pools = []
+        monkeypatch.setattr(rag_module, "DatabaseManager", DatabaseManager)
+        monkeypatch.setattr(rag_module, "run_in_pool", lambda kind, func, *args: pools.append(kind) or func(*args))
+        monkeypatch.setattr(
+            RAG, "_prepare_index",
+            lambda self, store, key: PreparedIndex(key=key, documents=store, vector_index=rag.retriever.index, nbytes=0),
+        )
+        rag.embedder = rag.query_embedder = rag.retriever.embedder
+        rag.is_ollama_embedder, rag.embedder_signature = False, "test"
+        try:
+            for _ in range(3):
+                rag.prepare_retriever("https://github.com/owner/repo")
+        finally:
+            retriever_registry.clear()
+        # Only the first request loaded the index on the "index" pool
+        assert pools == ["index"]
+        assert rag.transformed_docs is store
+
+
+class TestRAGLookupFile:
+    """Tests for retrieving the chunks of a file through the path index"""
+
+    @pytest.fixture
+    def rag(self, tmp_path):
+        texts = ["from src.util import parse\n\ndef run():\n    return parse()\n", "def stop():\n    pass\n"]
+        texts += [f"def parse():\n    return {row}\n" for row in range(2, 4)]
+        texts += ["from src.app import run\n\ndef test_run():\n    run()\n"]
+        texts += [f"def unrelated_{row}():\n    pass\n" for row in range(5, len(COSINES))]
+        file_paths = ["src/app.py"] * 2 + ["src/util.py"] * 2 + ["tests/test_app.py"]
+        file_paths += [f"src/other_{row}.py" for row in range(5, len(COSINES))]
+        return make_rag(tmp_path, texts, file_paths)
+
+    def test_file_and_related_files_in_one_lookup(self, rag, monkeypatch):
+        path_index = rag.transformed_docs.path_index
+        lookups = []
+        lookup = path_index.lookup
+        monkeypatch.setattr(path_index, "lookup", lambda *args, **kwargs: lookups.append(1) or lookup(*args, **kwargs))
+        result = rag.lookup_file("src/app.py")[0]
+        assert len(lookups) == 1
+        assert result.doc_indices[:2] == [0, 1] and set(result.doc_indices[2:]) == {2, 3, 4}
+        assert [doc.meta_data["file_path"] for doc in result.documents] == [
+            rag.transformed_docs[row].meta_data["file_path"] for row in result.doc_indices
+        ]
+
+    def test_metadata_filters_apply(self, rag):
+        result = rag.lookup_file("src/app.py", metadata_filters={"path_prefix": "src/"})[0]
+        assert 4 not in result.doc_indices and set(result.doc_indices) == {0, 1, 2, 3}
+        assert rag.lookup_file("src/app.py", metadata_filters={"path_prefix": "tests/"}) == []
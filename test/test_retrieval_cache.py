@@ -0,0 +1,50 @@
+#!/usr/bin/env python3
+"""
+Tests for the LRU caches used for query embeddings and retrieval results.
+
+Usage: python -m pytest test/test_retrieval_cache.py
+"""
+
+import os
+import sys
+
+# Add the parent directory to the path to import the api package
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.retrieval_cache import LRUCache, normalize_query
+
+
+class TestRetrievalCache:
+    """Tests for LRUCache and query normalization"""
+
+    def test_normalize_query(self):
+        assert normalize_query("  What does   prepare_db_index DO? ") == "what does prepare_db_index do?"
+        assert normalize_query("Ｆｕｌｌ width") == "full width"
+
+    def test_lru_eviction_order(self):
+        cache = LRUCache(maxsize=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        assert cache.get("a") == 1  # "a" becomes most recently used
+        cache.put("c", 3)
+        assert cache.get("b") is None
+        assert cache.get("a") == 1
+        assert cache.get("c") == 3
+        assert cache.evictions == 1
+
+    def test_hit_rate_stats(self):
+        cache = LRUCache(maxsize=10)
+        cache.put("q", [0.1, 0.2])
+        cache.get("q")
+        cache.get("q")
+        cache.get("missing")
+        stats = cache.stats()
+        assert stats["hits"] == 2
+        assert stats["misses"] == 1
+        assert stats["hit_rate"] == round(2 / 3, 4)
+
+    def test_zero_size_disables_cache(self):
+        cache = LRUCache(maxsize=0)
+        cache.put("a", 1)
+        assert cache.get("a") is None
+        assert len(cache) == 0
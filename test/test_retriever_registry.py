@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+"""
+Tests for the process-wide registry of prepared repository indexes.
+
+Usage: python -m pytest test/test_retriever_registry.py
+"""
+
+import os
+import sys
+import threading
+import time
+
+import numpy as np
+from adalflow.core.types import Document
+
+# Add the parent directory to the path to import the api package
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.index_store import open_index, write_index
+from api.retriever_registry import PreparedIndex, RetrieverRegistry
+from api.vector_index import VectorIndex
+
+
+def make_prepared(key, nbytes=100):
+    documents = [Document(text=f"chunk {i}", meta_data={"file_path": f"src/file_{i % 2}.py"}) for i in range(4)]
+    vector_index = VectorIndex(np.eye(4, dtype=np.float32))
+    return PreparedIndex(key=key, documents=documents, vector_index=vector_index, nbytes=nbytes)
+
+
+class TestRetrieverRegistry:
+    """Tests for RetrieverRegistry"""
+
+    def test_loads_once_and_counts_hits(self):
+        registry = RetrieverRegistry(max_entries=4)
+        loads = []
+        loader = lambda: loads.append(1) or make_prepared("a")
+        first = registry.get_or_load("a", loader)
+        assert registry.get_or_load("a", loader) is first
+        assert len(loads) == 1
+        stats = registry.stats()
+        assert (stats["hits"], stats["misses"], stats["size"]) == (1, 1, 1)
+
+    def test_evicts_least_recently_used(self):
+        registry = RetrieverRegistry(max_entries=2)
+        registry.get_or_load("a", lambda: make_prepared("a"))
+        registry.get_or_load("b", lambda: make_prepared("b"))
+        registry.get_or_load("a", lambda: make_prepared("a"))
+        registry.get_or_load("c", lambda: make_prepared("c"))
+        assert list(registry._entries) == ["a", "c"]
+        assert registry.stats()["evictions"] == 1
+
+    def test_memory_budget(self):
+        registry = RetrieverRegistry(max_entries=10, max_memory_mb=250 / 1024 / 1024)
+        registry.get_or_load("a", lambda: make_prepared("a", nbytes=100))
+        registry.get_or_load("b", lambda: make_prepared("b", nbytes=100))
+        registry.get_or_load("c", lambda: make_prepared("c", nbytes=100))
+        assert list(registry._entries) == ["b", "c"]
+        # An index larger than the whole budget is still kept, alone
+        registry.get_or_load("d", lambda: make_prepared("d", nbytes=1000))
+        assert list(registry._entries) == ["d"]
+        assert registry.stats()["memory_bytes"] == 1000
+
+    def test_concurrent_misses_share_one_load(self):
+        registry = RetrieverRegistry()
+        loads = []
+
+        def loader():
+            loads.append(1)
+            time.sleep(0.05)
+            return make_prepared("a")
+
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(registry.get_or_load("a", loader))) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert len(loads) == 1
+        assert all(result is results[0] for result in results)
+
+    def test_failed_load_is_retried(self):
+        registry = RetrieverRegistry()
+
+        def failing():
+            raise ValueError("no index")
+
+        try:
+            registry.get_or_load("a", failing)
+        except ValueError:
+            pass
+        assert registry.get_or_load("a", lambda: make_prepared("a")).key == "a"
+
+    def test_filter_masks_are_cached(self):
+        prepared = make_prepared("a")
+        filters = {"use_inclusion": True, "included_dirs": [], "included_files": ["file_0.py"], "excluded_dirs": [], "excluded_files": []}
+        mask = prepared.filter_mask(filters)
+        assert mask.tolist() == [True, False, True, False]
+        assert prepared.filter_mask(dict(filters)) is mask
+
+    def test_waiters_keep_the_load_and_count_as_hits(self):
+        registry = RetrieverRegistry()
+        loads = []
+        started = threading.Event()
+
+        def loader():
+            loads.append(1)
+            started.set()
+            time.sleep(0.05)
+            return make_prepared("a")
+
+        first = threading.Thread(target=registry.get_or_load, args=("a", loader))
+        first.start()
+        started.wait(5)
+        waiters = [threading.Thread(target=registry.get_or_load, args=("a", loader)) for _ in range(3)]
+        for thread in waiters:
+            thread.start()
+        for thread in [first] + waiters:
+            thread.join()
+        assert len(loads) == 1
+        stats = registry.stats()
+        assert (stats["hits"], stats["misses"]) == (3, 1)
+        assert registry._loading == {}
+
+    def test_memory_counts_lookup_structures_and_masks(self, tmp_path):
+        chunks = [
+            Document(
+                text=f"def handler_{i}():\n    return {i}\n",
+                meta_data={"file_path": f"src/file_{i % 2}.py", "type": "py", "is_code": True},
+                vector=np.eye(4, dtype=np.float32)[i % 4].tolist(),
+            )
+            for i in range(8)
+        ]
+        write_index(chunks, str(tmp_path / "repo.index"))
+        store = open_index(str(tmp_path / "repo.index"))
+        prepared = PreparedIndex(key="a", documents=store, vector_index=VectorIndex(np.eye(4, dtype=np.float32)), nbytes=64)
+        assert prepared.memory_bytes == 64
+
+        store.lexical_index, store.path_index, store.file_vectors, store.metadata_columns
+        loaded = prepared.memory_bytes
+        assert loaded > 64 + store.lexical_index.nbytes + store.path_index.nbytes + store.file_vectors.nbytes
+        prepared.filter_mask(None, {"code_only": True})
+        assert prepared.memory_bytes == loaded + len(store)
+
+        # Structures loaded after the index was registered count against the budget on the next lookup
+        registry = RetrieverRegistry(max_entries=10, max_memory_mb=(loaded + 100) / 1024 / 1024)
+        registry.put(make_prepared("b", nbytes=100))
+        registry.put(prepared)
+        assert list(registry._entries) == ["a"]
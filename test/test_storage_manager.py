@@ -0,0 +1,147 @@
+#!/usr/bin/env python3
+"""
+Tests for quota-aware eviction of cloned repositories, indexes and wiki caches.
+
+Usage: python -m pytest test/test_storage_manager.py
+"""
+
+import json
+import os
+import sys
+import tempfile
+import time
+
+# Add the parent directory to the path to import the api package
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.index_catalog import IndexCatalog
+from api.retriever_registry import PreparedIndex, retriever_registry
+from api.storage_manager import STAGING_TIMEOUT, StorageManager
+
+
+def _write(path, size):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(b"x" * size)
+
+
+class TestStorageManager:
+    """Tests for StorageManager"""
+
+    def setup_method(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.repo = os.path.join(self.root, "repos", "owner_repo")
+        self.index = os.path.join(self.root, "databases", "owner_repo-abc.index")
+        self.wiki = os.path.join(self.root, "wikicache", "deepwiki_cache_github_owner_repo_en.json")
+        _write(os.path.join(self.repo, "main.py"), 1000)
+        _write(os.path.join(self.index, "text.bin"), 1000)
+        _write(self.wiki, 1000)
+        IndexCatalog(os.path.join(self.root, "databases")).register("abc", {"path": "owner_repo-abc.index"})
+
+    def teardown_method(self):
+        self.tmp.cleanup()
+
+    def _set_access(self, times):
+        with open(os.path.join(self.root, "storage_access.json"), "w") as f:
+            json.dump(times, f)
+
+    def test_usage_counts_each_kind(self):
+        usage = StorageManager(self.root, quota_mb=1).usage()
+        assert usage["total_bytes"] == 3000
+        assert usage["by_kind"] == {
+            "orphan": {"count": 0, "size_bytes": 0},
+            "legacy": {"count": 0, "size_bytes": 0},
+            "repo": {"count": 1, "size_bytes": 1000},
+            "index": {"count": 1, "size_bytes": 1000},
+            "wiki": {"count": 1, "size_bytes": 1000},
+        }
+        # The catalog itself is not an artifact
+        assert [artifact["kind"] for artifact in usage["artifacts"]] == ["repo", "index", "wiki"]
+
+    def test_leftovers_are_evicted_first_and_writes_in_progress_skipped(self):
+        databases = os.path.join(self.root, "databases")
+        orphan = os.path.join(databases, "owner_repo-def.index.0f1e.tmp")
+        writing = os.path.join(databases, "owner_repo-abc.index.9a8b.tmp")
+        pickle = os.path.join(databases, "owner_repo.pkl")
+        _write(os.path.join(orphan, "text.bin"), 1000)
+        _write(os.path.join(writing, "text.bin"), 1000)
+        _write(pickle, 1000)
+        stale = time.time() - 2 * STAGING_TIMEOUT
+        for path in (orphan, os.path.join(orphan, "text.bin")):
+            os.utime(path, (stale, stale))
+
+        manager = StorageManager(self.root)
+        kinds = {artifact.path: artifact.kind for artifact in manager.list_artifacts()}
+        assert kinds[orphan] == "orphan" and kinds[pickle] == "legacy" and writing not in kinds
+        manager.quota_bytes = 3000
+        assert [artifact.kind for artifact in manager.enforce_quota()] == ["orphan", "legacy"]
+        assert os.path.exists(writing) and os.path.exists(self.repo)
+
+    def test_no_quota_evicts_nothing(self):
+        manager = StorageManager(self.root)
+        assert manager.enforce_quota() == []
+        assert os.path.exists(self.repo)
+
+    def test_evicts_repositories_before_indexes_and_wikis(self):
+        manager = StorageManager(self.root, quota_mb=2500 / 1024 / 1024)
+        evicted = manager.enforce_quota()
+        assert [artifact.kind for artifact in evicted] == ["repo"]
+        assert not os.path.exists(self.repo)
+        assert os.path.exists(self.index) and os.path.exists(self.wiki)
+
+        manager.quota_bytes = 1500
+        assert [artifact.kind for artifact in manager.enforce_quota()] == ["index"]
+        assert IndexCatalog(manager.databases_dir).get("abc") is None
+        assert os.path.exists(self.wiki)
+
+    def test_least_recently_used_goes_first(self):
+        other = os.path.join(self.root, "repos", "owner_other")
+        _write(os.path.join(other, "main.py"), 1000)
+        self._set_access({self.repo: 200.0, other: 100.0})
+        manager = StorageManager(self.root)
+        manager.quota_bytes = 3500
+        evicted = manager.enforce_quota()
+        assert [artifact.path for artifact in evicted] == [other]
+
+    def test_protected_paths_are_kept(self):
+        manager = StorageManager(self.root)
+        manager.quota_bytes = 1500
+        evicted = manager.enforce_quota(protect=[self.repo])
+        assert [artifact.kind for artifact in evicted] == ["index", "wiki"]
+        assert os.path.exists(self.repo)
+        assert manager.usage()["evictions"] == 2
+
+    def test_touch_updates_last_access(self):
+        manager = StorageManager(self.root)
+        manager.touch(self.index)
+        artifacts = {artifact.kind: artifact for artifact in manager.list_artifacts()}
+        assert artifacts["index"].last_access >= artifacts["repo"].last_access
+
+    def test_artifacts_in_use_are_kept(self):
+        manager = StorageManager(self.root)
+        manager.quota_bytes = 500
+        with manager.in_use(self.wiki):
+            # Artifacts touched while in use, such as the checkout and index being built, stay pinned
+            manager.touch(self.repo)
+            with manager.in_use():
+                manager.touch(self.index)
+                assert manager.enforce_quota() == []
+            assert manager.in_use_paths() == {self.repo, self.wiki}
+            assert [artifact.kind for artifact in manager.enforce_quota()] == ["index"]
+        assert manager.in_use_paths() == set()
+        assert [artifact.kind for artifact in manager.enforce_quota()] == ["repo", "wiki"]
+
+    def test_loaded_indexes_are_kept(self):
+        class Store(list):
+            index_dir = self.index
+
+        manager = StorageManager(self.root)
+        manager.quota_bytes = 500
+        retriever_registry.put(PreparedIndex(key="abc", documents=Store(), vector_index=None, nbytes=0))
+        try:
+            evicted = manager.enforce_quota()
+        finally:
+            retriever_registry.clear()
+        assert [artifact.kind for artifact in evicted] == ["repo", "wiki"]
+        assert os.path.exists(self.index)
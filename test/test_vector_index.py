@@ -0,0 +1,135 @@
+#!/usr/bin/env python3
+"""
+Tests for the compact vector index used by the RAG retriever.
+
+Usage: python -m pytest test/test_vector_index.py
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+
+# Add the parent directory to the path to import the api package
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.vector_index import (
+    FULL_VECTORS_FILE,
+    VectorIndex,
+    dequantize_vectors,
+    load_full_vectors,
+    normalize_rows,
+    quantize_vectors,
+)
+
+
+class TestVectorIndex:
+    """Tests for quantized storage, search and rescoring"""
+
+    def setup_method(self):
+        """Create a reproducible set of embeddings."""
+        rng = np.random.default_rng(42)
+        self.vectors = rng.normal(size=(500, 64)).astype(np.float32)
+        self.queries = rng.normal(size=(20, 64)).astype(np.float32)
+
+    def test_int8_roundtrip_is_close(self):
+        vectors = normalize_rows(self.vectors)
+        codes, scales = quantize_vectors(vectors, "int8")
+        assert codes.dtype == np.int8
+        assert scales.shape == (len(vectors),)
+        restored = dequantize_vectors(codes, scales)
+        assert np.abs(restored - vectors).max() < 0.01
+
+    def test_unsupported_dtype_raises(self):
+        with pytest.raises(ValueError):
+            quantize_vectors(self.vectors, "int4")
+
+    @pytest.mark.parametrize("dtype", ["float32", "float16", "int8"])
+    def test_search_matches_exact_top1(self, tmp_path, dtype):
+        index = VectorIndex.build(self.vectors, str(tmp_path / "vectors"), dtype=dtype)
+        scores, indices = index.search(self.vectors[:10], top_k=5)
+        assert indices.shape == (10, 5)
+        assert list(indices[:, 0]) == list(range(10))
+        assert np.all(np.diff(scores, axis=1) <= 1e-6)
+
+    def test_compact_storage_is_smaller(self, tmp_path):
+        float32_index = VectorIndex.build(self.vectors, str(tmp_path / "f32"), dtype="float32")
+        int8_index = VectorIndex.build(self.vectors, str(tmp_path / "i8"), dtype="int8")
+        assert int8_index.nbytes * 3 < float32_index.nbytes
+
+    def test_rescoring_recall(self, tmp_path):
+        index = VectorIndex.build(self.vectors, str(tmp_path / "vectors"), dtype="int8", rescore=True)
+        assert index.rescore
+        assert index.measure_recall(self.queries, top_k=10) >= 0.95
+
+    def test_load_reuses_saved_files(self, tmp_path):
+        index_dir = str(tmp_path / "vectors")
+        VectorIndex.build(self.vectors, index_dir, dtype="float16")
+        manifest = VectorIndex.read_manifest(index_dir)
+        assert manifest["count"] == 500
+        assert manifest["dimensions"] == 64
+        assert manifest["dtype"] == "float16"
+
+        loaded = VectorIndex.load(index_dir)
+        assert len(loaded) == 500
+        assert loaded.dtype == "float16"
+        assert loaded.version == manifest["version"]
+
+    def test_load_memory_maps_vectors(self, tmp_path):
+        index_dir = str(tmp_path / "vectors")
+        built = VectorIndex.build(self.vectors, index_dir, dtype="int8")
+        assert isinstance(built.codes, np.memmap) and isinstance(built.scales, np.memmap)
+
+        in_memory = VectorIndex.load(index_dir, mmap=False)
+        assert not isinstance(in_memory.codes, np.memmap)
+        mapped_scores, mapped_indices = built.search(self.queries, top_k=5)
+        scores, indices = in_memory.search(self.queries, top_k=5)
+        np.testing.assert_array_equal(mapped_indices, indices)
+        np.testing.assert_allclose(mapped_scores, scores)
+
+    def test_top_k_larger_than_index(self, tmp_path):
+        index = VectorIndex.build(self.vectors[:3], str(tmp_path / "vectors"), dtype="int8")
+        scores, indices = index.search(self.queries[0], top_k=10)
+        assert indices.shape == (1, 3)
+        assert sorted(indices[0].tolist()) == [0, 1, 2]
+
+    @pytest.mark.parametrize("dtype", ["float32", "int8"])
+    def test_mask_restricts_results(self, tmp_path, dtype):
+        index = VectorIndex.build(self.vectors, str(tmp_path / "vectors"), dtype=dtype)
+        mask = np.zeros(len(self.vectors), dtype=bool)
+        mask[100:110] = True
+        scores, indices = index.search(self.vectors[:5], top_k=20, mask=mask)
+        assert indices.shape == (5, 10)
+        assert set(indices.ravel().tolist()) <= set(range(100, 110))
+        assert np.all(np.isfinite(scores))
+
+        _, indices = index.search(self.vectors[105], top_k=3, mask=mask)
+        assert indices[0, 0] == 105
+
+    @pytest.mark.parametrize("dtype", ["float32", "int8"])
+    def test_sparse_mask_scores_only_masked_rows(self, tmp_path, dtype):
+        index = VectorIndex.build(self.vectors, str(tmp_path / "vectors"), dtype=dtype)
+        mask = np.random.default_rng(7).random(len(self.vectors)) < 0.1
+        scores, indices = index.search(self.queries, top_k=5, mask=mask)
+        allowed = np.flatnonzero(mask)
+        exact = normalize_rows(self.queries) @ normalize_rows(self.vectors[allowed]).T
+        expected = allowed[np.argsort(-exact, axis=1)[:, :5]]
+        assert indices.tolist() == expected.tolist()
+
+    def test_disk_usage_stays_below_float32(self, tmp_path):
+        def size(index_dir):
+            return sum(os.path.getsize(os.path.join(index_dir, name)) for name in os.listdir(index_dir))
+
+        float32_dir, int8_dir, float16_dir = (str(tmp_path / name) for name in ("f32", "i8", "f16"))
+        VectorIndex.build(self.vectors, float32_dir, dtype="float32")
+        int8_index = VectorIndex.build(self.vectors, int8_dir, dtype="int8")
+        VectorIndex.build(self.vectors, float16_dir, dtype="float16")
+        # int8 codes are rescored against float16 full vectors; no float32 copy is written
+        assert not os.path.exists(os.path.join(int8_dir, FULL_VECTORS_FILE))
+        assert int8_index.rescore and int8_index.full_vectors.dtype == np.float16
+        assert size(int8_dir) < size(float32_dir) and size(float16_dir) < size(float32_dir)
+        assert load_full_vectors(float16_dir).dtype == np.float16
+
+        kept = VectorIndex.build(self.vectors, str(tmp_path / "kept"), dtype="float16", full_vectors_dtype="float32")
+        assert kept.rescore and kept.full_vectors.dtype == np.float32
@@ -0,0 +1,64 @@
+#!/usr/bin/env python3
+"""
+Tests for batched string queries in the vector retriever.
+
+Usage: python -m pytest test/test_vector_retriever.py
+"""
+
+import os
+import sys
+
+import numpy as np
+import pytest
+from adalflow.core.types import Embedding, EmbedderOutput
+
+# Add the parent directory to the path to import the api package
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+
+from api.retrieval_cache import query_embedding_cache
+from api.vector_index import VectorIndex
+from api.vector_retriever import VectorRetriever
+
+
+class CountingEmbedder:
+    """Embeds each query as a row of the index, counting calls"""
+
+    def __init__(self, vectors, rows):
+        self.vectors = vectors
+        self.rows = rows
+        self.calls = []
+
+    def __call__(self, input):
+        self.calls.append(list(input))
+        return EmbedderOutput(
+            data=[Embedding(embedding=self.vectors[self.rows[query]].tolist(), index=i) for i, query in enumerate(input)]
+        )
+
+
+class TestVectorRetriever:
+    """Tests for retrieving many string queries at once"""
+
+    @pytest.fixture(autouse=True)
+    def setup_index(self, tmp_path):
+        query_embedding_cache.clear()
+        rng = np.random.default_rng(11)
+        self.vectors = rng.normal(size=(50, 16)).astype(np.float32)
+        self.index = VectorIndex.build(self.vectors, str(tmp_path / "vectors"), dtype="float32")
+        self.embedder = CountingEmbedder(self.vectors, {"first": 3, "second": 17, "third": 42})
+
+    def test_queries_are_embedded_in_one_call(self):
+        retriever = VectorRetriever(self.index, self.embedder, top_k=3, embedder_key="test-model")
+        output = retriever(["first", "second", "first", "third"])
+        assert [result.doc_indices[0] for result in output] == [3, 17, 3, 42]
+        assert [result.query for result in output] == ["first", "second", "first", "third"]
+        assert self.embedder.calls == [["first", "second", "third"]]
+
+        # Cached embeddings are not requested again
+        retriever(["third", "second"])
+        assert len(self.embedder.calls) == 1
+
+    def test_empty_queries_get_empty_results(self):
+        retriever = VectorRetriever(self.index, self.embedder, top_k=3)
+        output = retriever(["", "second"])
+        assert output[0].doc_indices == [] and output[1].doc_indices[0] == 17
+        assert self.embedder.calls == [["second"]]